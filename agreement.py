@@ -0,0 +1,709 @@
+import functools
+import itertools
+import json
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from annotation_store import ANNOTATION_COLUMNS, AnnotationJournal
+from taxonomy import decode_factors
+
+# -----------------------
+# Configuration
+# -----------------------
+ANNOTATION_GLOB = "annotations/*.csv"
+
+# Categorical fields compared with Cohen's / Fleiss' kappa
+KAPPA_FIELDS = ["label", "entity_reflection"]
+
+# Running tallies behind the admin dashboard, so a restart only re-reads the
+# annotator files that changed since they were written
+TALLY_SNAPSHOT_PATH = "agreement_tallies.json"
+TALLY_FIELDS = ["label", "entity_reflection", "contextual_factors"]
+
+# "Agree" in contextual_factors means the annotator accepted the LLM's factor;
+# it takes part in the factor agreement as a set of its own
+AGREE_FACTOR = "agree"
+
+
+# -----------------------
+# Loading
+# -----------------------
+def annotation_paths(targets=None):
+    targets = targets or [ANNOTATION_GLOB]
+    paths = []
+    for target in targets:
+        target = Path(target)
+        if target.is_dir():
+            paths.extend(sorted(target.glob("*.csv")))
+        elif any(c in str(target) for c in "*?["):
+            paths.extend(sorted(Path().glob(str(target))))
+        else:
+            paths.append(target)
+    return paths
+
+
+def annotator_files(directory):
+    # Every annotator CSV in directory, including a new annotator's whose saves
+    # still sit in a journal because no compaction has written the CSV yet
+    directory = Path(directory)
+    paths = [*directory.glob("*.csv"), *directory.glob("*.journal.*")]
+    return sorted({path.with_name(path.name.split(".")[0] + ".csv") for path in paths})
+
+
+def factor_set(value):
+    # Stored contextual_factors -> frozenset of codes; None when Task 2 was not answered
+    if value == "Agree":
+        return frozenset([AGREE_FACTOR])
+    codes = decode_factors(value)
+    return frozenset(codes) if codes else None
+
+
+def read_annotator_file(path):
+    journal = AnnotationJournal(path)
+    if journal.journal_path.exists() or journal.compacting_path.exists():
+        # Saves not yet folded into the CSV
+        return journal.load().to_frame()
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def load_annotations(paths):
+    """
+    Every annotator file (plus any unsynced journal next to it) as one long
+    table with one row per (id, annotator). Ids are dataset ids, so rounds never
+    collide; when the same (id, annotator) appears in several files, the file
+    read last wins.
+    """
+    frames = [read_annotator_file(path) for path in paths]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=ANNOTATION_COLUMNS)
+    # Older files lack newer columns (e.g. entity_reflection); those cells stay empty
+    data = pd.concat(frames, ignore_index=True).reindex(columns=ANNOTATION_COLUMNS)
+    data["id"] = pd.to_numeric(data["id"], errors="coerce")
+    data = data.dropna(subset=["id"]).astype({"id": "int64"})
+    data = data.drop_duplicates(subset=["id", "annotator"], keep="last")
+    data["contextual_factors"] = data["contextual_factors"].map(factor_set)
+    return data.reset_index(drop=True)
+
+
+# -----------------------
+# Item x annotator matrices
+# -----------------------
+def rating_matrix(data, field):
+    """
+    -> (matrix, annotators, categories): matrix[item, annotator] is the index
+    of the category the annotator chose, or -1 where they gave no value.
+    """
+    values = data[field]
+    present = values.notna() & (values != "")
+    categories, codes = np.unique(values[present].to_numpy(dtype=object), return_inverse=True)
+    items, item_index = np.unique(data.loc[present, "id"].to_numpy(), return_inverse=True)
+    annotators, annotator_index = np.unique(data.loc[present, "annotator"].to_numpy(dtype=object), return_inverse=True)
+
+    matrix = np.full((len(items), len(annotators)), -1, dtype=np.int64)
+    matrix[item_index, annotator_index] = codes
+    return matrix, list(annotators), list(categories)
+
+
+def category_counts(matrix, n_categories):
+    # counts[item, category]: how many annotators chose category for item
+    rated = matrix >= 0
+    rows = np.broadcast_to(np.arange(matrix.shape[0])[:, None], matrix.shape)[rated]
+    counts = np.zeros((matrix.shape[0], n_categories), dtype=np.int64)
+    np.add.at(counts, (rows, matrix[rated]), 1)
+    return counts
+
+
+# -----------------------
+# Kappa
+# -----------------------
+def pairwise_cohen_kappa(matrix, n_categories):
+    """
+    Cohen's kappa for every pair of annotators over the items both rated, from
+    one confusion tensor: confusion[a, b, k, l] = items a rated k and b rated l.
+    -> (kappa, n_items), both annotators x annotators (NaN where undefined).
+    """
+    onehot = (matrix[:, :, None] == np.arange(n_categories)).astype(np.float64)
+    confusion = np.einsum("iak,ibl->abkl", onehot, onehot)
+    n = confusion.sum(axis=(2, 3))
+    observed = np.trace(confusion, axis1=2, axis2=3)
+    rows = confusion.sum(axis=3)
+    cols = confusion.sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p_observed = observed / n
+        p_expected = (rows * cols).sum(axis=2) / n ** 2
+        kappa = (p_observed - p_expected) / (1 - p_expected)
+    # Both annotators gave the same single category throughout: perfect agreement
+    kappa = np.where((p_expected == 1) & (p_observed == 1), 1.0, kappa)
+    np.fill_diagonal(kappa, np.nan)
+    return kappa, n.astype(np.int64)
+
+
+def fleiss_kappa(counts):
+    """
+    Fleiss' kappa over the items at least two annotators rated; the number of
+    annotators may differ between items.
+    """
+    raters = counts.sum(axis=1)
+    counts = counts[raters >= 2]
+    raters = raters[raters >= 2]
+    if len(counts) == 0:
+        return np.nan
+    p_item = ((counts ** 2).sum(axis=1) - raters) / (raters * (raters - 1))
+    p_category = counts.sum(axis=0) / raters.sum()
+    p_observed = p_item.mean()
+    p_expected = (p_category ** 2).sum()
+    if p_expected == 1:
+        return 1.0 if p_observed == 1 else np.nan
+    return (p_observed - p_expected) / (1 - p_expected)
+
+
+# -----------------------
+# Krippendorff's alpha
+# -----------------------
+def masi_distance_matrix(sets):
+    """
+    MASI distance between every pair of sets: 1 - Jaccard * M, where M is 1 for
+    equal sets, 2/3 when one contains the other, 1/3 when they only overlap
+    and 0 when they are disjoint.
+    """
+    tokens = sorted(set().union(*sets)) if sets else []
+    membership = np.array([[t in s for t in tokens] for s in sets], dtype=np.int64).reshape(len(sets), len(tokens))
+    sizes = membership.sum(axis=1)
+    intersection = membership @ membership.T
+    union = sizes[:, None] + sizes[None, :] - intersection
+    with np.errstate(invalid="ignore", divide="ignore"):
+        jaccard = np.where(union > 0, intersection / union, 1.0)
+    equal = (intersection == sizes[:, None]) & (intersection == sizes[None, :])
+    subset = (intersection == sizes[:, None]) | (intersection == sizes[None, :])
+    monotonicity = np.select([equal, subset, intersection > 0], [1.0, 2 / 3, 1 / 3], default=0.0)
+    return 1 - jaccard * monotonicity
+
+
+def krippendorff_alpha(counts, distance):
+    """
+    counts[item, value]: annotators who gave value to item; distance[value, value].
+    Items with fewer than two values are not pairable and are left out.
+    """
+    per_item = counts.sum(axis=1)
+    counts = counts[per_item >= 2].astype(np.float64)
+    per_item = per_item[per_item >= 2]
+    n = per_item.sum()
+    if n < 2:
+        return np.nan
+    observed = (((counts @ distance) * counts).sum(axis=1) / (per_item - 1)).sum() / n
+    totals = counts.sum(axis=0)
+    expected = (totals @ distance @ totals) / (n * (n - 1))
+    if expected == 0:
+        return 1.0 if observed == 0 else np.nan
+    return 1 - observed / expected
+
+
+def factor_alpha(data):
+    # Krippendorff's alpha with MASI distance on the contextual_factors sets
+    answered = data[data["contextual_factors"].notna()]
+    if answered.empty:
+        return np.nan, 0
+    value_index, values = pd.factorize(answered["contextual_factors"])
+    items, item_index = np.unique(answered["id"].to_numpy(), return_inverse=True)
+    counts = np.zeros((len(items), len(values)), dtype=np.int64)
+    np.add.at(counts, (item_index, value_index), 1)
+    distance = masi_distance_matrix(list(values))
+    return krippendorff_alpha(counts, distance), int((counts.sum(axis=1) >= 2).sum())
+
+
+# -----------------------
+# Report
+# -----------------------
+def field_agreement(data, field):
+    matrix, annotators, categories = rating_matrix(data, field)
+    counts = category_counts(matrix, len(categories))
+    kappa, overlap = pairwise_cohen_kappa(matrix, len(categories))
+    pairs = pd.DataFrame([
+        {"annotator_1": annotators[a], "annotator_2": annotators[b], "items": int(overlap[a, b]), "kappa": kappa[a, b]}
+        for a, b in zip(*np.triu_indices(len(annotators), k=1))
+        if overlap[a, b] > 0
+    ], columns=["annotator_1", "annotator_2", "items", "kappa"])
+    nominal = 1 - np.eye(len(categories))
+    return {
+        "field": field,
+        "items": int((counts.sum(axis=1) >= 2).sum()),
+        "annotators": len(annotators),
+        "fleiss_kappa": fleiss_kappa(counts),
+        "mean_cohen_kappa": pairs["kappa"].mean() if len(pairs) else np.nan,
+        "krippendorff_alpha": krippendorff_alpha(counts, nominal),
+        "pairs": pairs,
+    }
+
+
+def agreement_report(data):
+    report = [field_agreement(data, field) for field in KAPPA_FIELDS]
+    alpha, items = factor_alpha(data)
+    report.append({
+        "field": "contextual_factors",
+        "items": items,
+        "annotators": data.loc[data["contextual_factors"].notna(), "annotator"].nunique(),
+        "krippendorff_alpha_masi": alpha,
+    })
+    return report
+
+
+# -----------------------
+# Running tallies
+# -----------------------
+@functools.lru_cache(maxsize=65536)
+def masi_distance(a, b):
+    # Scalar form of masi_distance_matrix for two sets; the same few sets recur endlessly
+    intersection = len(a & b)
+    union = len(a | b)
+    jaccard = intersection / union if union else 1.0
+    if a == b:
+        monotonicity = 1.0
+    elif intersection in (len(a), len(b)):
+        monotonicity = 2 / 3
+    else:
+        monotonicity = 1 / 3 if intersection else 0.0
+    return 1 - jaccard * monotonicity
+
+
+def nominal_distance(a, b):
+    return 0.0 if a == b else 1.0
+
+
+def cohen_kappa(confusion):
+    # confusion: Counter((value_1, value_2)) over the items two annotators both rated
+    n = sum(confusion.values())
+    rows, cols = Counter(), Counter()
+    for (k, l), c in confusion.items():
+        rows[k] += c
+        cols[l] += c
+    p_observed = sum(c for (k, l), c in confusion.items() if k == l) / n
+    p_expected = sum(rows[k] * cols[k] for k in rows) / n ** 2
+    if p_expected == 1:
+        return 1.0 if p_observed == 1 else np.nan
+    return (p_observed - p_expected) / (1 - p_expected)
+
+
+class FieldTally:
+    """
+    Agreement on one field, kept up to date one rating at a time. Each item's
+    share of the statistics (its value counts, observed disagreement and
+    Fleiss P_i) is taken out and put back when one of its ratings changes, and
+    every annotator pair keeps a confusion table, so nothing is rescanned.
+    """
+
+    def __init__(self, distance=nominal_distance, pairwise=True):
+        self.distance = distance
+        self.pairwise = pairwise
+        self.values = {}            # id -> {annotator: value}
+        self.by_annotator = {}      # annotator -> Counter(value)
+        self.decided = Counter()    # value -> items where it holds a strict plurality
+        self.totals = Counter()     # value -> times given, over items with 2+ ratings
+        self.pairable = 0           # ratings on items with 2+ ratings
+        self.items = 0              # items with 2+ ratings
+        self.observed = 0.0         # sum of the items' observed disagreement
+        self.agreement = 0.0        # sum of the items' Fleiss P_i
+        self.pairs = {}             # (annotator, annotator) -> Counter((value, value))
+
+    def item_terms(self, ratings):
+        if not ratings:
+            return None
+        if len(ratings) == 1:
+            # Most items while a round is under way: nothing to pair yet
+            (value,) = ratings.values()
+            return {value: 1}, value, 1, 0.0, 0.0
+        counts = Counter(ratings.values())
+        top = counts.most_common(2)
+        plurality = top[0][0] if len(top) == 1 or top[0][1] > top[1][1] else None
+        m = len(ratings)
+        pairs = itertools.permutations(counts.items(), 2)
+        disagreement = sum(ca * cb * self.distance(a, b) for (a, ca), (b, cb) in pairs) / (m - 1)
+        p_item = (sum(c * c for c in counts.values()) - m) / (m * (m - 1))
+        return counts, plurality, m, disagreement, p_item
+
+    def apply(self, terms, sign):
+        if terms is None:
+            return
+        counts, plurality, m, disagreement, p_item = terms
+        if plurality is not None:
+            self.decided[plurality] += sign
+        if m < 2:
+            return
+        for value, c in counts.items():
+            self.totals[value] += sign * c
+        self.pairable += sign * m
+        self.items += sign
+        self.observed += sign * disagreement
+        self.agreement += sign * p_item
+
+    def put_many(self, rows):
+        # rows: [(id, annotator, value)], value None removing the rating; each touched item's terms are taken
+        # out and put back once, however many of its ratings change
+        touched = {example_id for example_id, _, _ in rows}
+        for example_id in touched:
+            self.apply(self.item_terms(self.values.get(example_id)), -1)
+        for example_id, annotator, value in rows:
+            self.set_value(example_id, annotator, value)
+        for example_id in touched:
+            self.apply(self.item_terms(self.values.get(example_id)), 1)
+
+    def set_value(self, example_id, annotator, value):
+        ratings = self.values.get(example_id, {})
+        old = ratings.get(annotator)
+        if old == value:
+            return
+        if self.pairwise:
+            for other, other_value in ratings.items():
+                if other == annotator:
+                    continue
+                key, flip = ((annotator, other), False) if annotator < other else ((other, annotator), True)
+                confusion = self.pairs.get(key)
+                if confusion is None:
+                    confusion = self.pairs[key] = Counter()
+                for v, sign in ((old, -1), (value, 1)):
+                    if v is not None:
+                        confusion[(other_value, v) if flip else (v, other_value)] += sign
+
+        counts = self.by_annotator.get(annotator)
+        if counts is None:
+            counts = self.by_annotator[annotator] = Counter()
+        if old is not None:
+            counts[old] -= 1
+        if value is None:
+            ratings.pop(annotator, None)
+        else:
+            ratings[annotator] = value
+            counts[value] += 1
+        if ratings:
+            self.values[example_id] = ratings
+        else:
+            self.values.pop(example_id, None)
+
+    def state(self):
+        # The running aggregates as JSON; values are rebuilt from the ratings on restore
+        return {
+            "by_annotator": {a: [[encode_value(v), c] for v, c in counts.items() if c] for a, counts in self.by_annotator.items()},
+            "decided": [[encode_value(v), c] for v, c in self.decided.items() if c],
+            "totals": [[encode_value(v), c] for v, c in self.totals.items() if c],
+            "pairable": self.pairable,
+            "items": self.items,
+            "observed": self.observed,
+            "agreement": self.agreement,
+            "pairs": [
+                [a, b, [[encode_value(k), encode_value(l), c] for (k, l), c in confusion.items() if c]]
+                for (a, b), confusion in self.pairs.items()
+            ],
+        }
+
+    def restore(self, state, rows):
+        # rows: [(id, annotator, value)] the aggregates in state were built from
+        for example_id, annotator, value in rows:
+            if value is not None:
+                self.values.setdefault(example_id, {})[annotator] = value
+        self.by_annotator = {
+            a: Counter({decode_value(v): c for v, c in counts}) for a, counts in state["by_annotator"].items()
+        }
+        self.decided = Counter({decode_value(v): c for v, c in state["decided"]})
+        self.totals = Counter({decode_value(v): c for v, c in state["totals"]})
+        self.pairable = state["pairable"]
+        self.items = state["items"]
+        self.observed = state["observed"]
+        self.agreement = state["agreement"]
+        self.pairs = {
+            (a, b): Counter({(decode_value(k), decode_value(l)): c for k, l, c in confusion})
+            for a, b, confusion in state["pairs"]
+        }
+
+    def fleiss_kappa(self):
+        if not self.items:
+            return np.nan
+        p_observed = self.agreement / self.items
+        p_expected = sum((c / self.pairable) ** 2 for c in self.totals.values())
+        if p_expected == 1:
+            return 1.0 if p_observed == 1 else np.nan
+        return (p_observed - p_expected) / (1 - p_expected)
+
+    def krippendorff_alpha(self):
+        if self.pairable < 2:
+            return np.nan
+        values = [v for v, c in self.totals.items() if c]
+        totals = np.array([self.totals[v] for v in values], dtype=np.float64)
+        if self.distance is masi_distance:
+            distance = masi_distance_matrix(values)
+        else:
+            distance = 1 - np.eye(len(values))
+        observed = self.observed / self.pairable
+        expected = (totals @ distance @ totals) / (self.pairable * (self.pairable - 1))
+        if expected == 0:
+            return 1.0 if observed == 0 else np.nan
+        return 1 - observed / expected
+
+    def pair_kappas(self):
+        return pd.DataFrame([
+            {"annotator_1": a, "annotator_2": b, "items": sum(confusion.values()), "kappa": cohen_kappa(confusion)}
+            for (a, b), confusion in sorted(self.pairs.items())
+            if sum(confusion.values()) > 0
+        ], columns=["annotator_1", "annotator_2", "items", "kappa"])
+
+
+def encode_value(value):
+    # Factor sets are stored as sorted lists of codes
+    return sorted(value) if isinstance(value, frozenset) else value
+
+
+def decode_value(value):
+    return frozenset(value) if isinstance(value, list) else value
+
+
+def item_id(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def record_ratings(record):
+    # Annotation row -> (label, entity_reflection, factor set), None where unanswered
+    label = record.get("label") or None
+    entity = record.get("entity_reflection") or None
+    factors = record.get("contextual_factors")
+    return (
+        label if isinstance(label, str) else None,
+        entity if isinstance(entity, str) else None,
+        factor_set(factors) if isinstance(factors, str) and factors else None,
+    )
+
+
+class AgreementTracker:
+    """
+    Running progress and agreement over every annotator file, for the admin
+    dashboard. Each save is applied to the tallies as it happens (record_save);
+    files changed behind our back (another process, a git pull) are re-read one
+    by one on refresh(), found by their journal signature as in
+    AnnotationRepository. Nothing is read until the first refresh().
+    listeners are called as listener(tracker, ids) after the ratings of ids
+    changed, under the tracker's lock.
+    """
+
+    def __init__(self, annotation_dir, snapshot_path=TALLY_SNAPSHOT_PATH):
+        self.annotation_dir = Path(annotation_dir)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.signatures = {}        # source file -> journal signature
+        self.ratings = {}           # source file -> {(id, annotator): record_ratings()}
+        self.owners = {}            # (id, annotator) -> source file
+        self.annotated = Counter()  # annotator -> items annotated
+        self.raters = Counter()     # id -> annotators who annotated it
+        self.fields = {
+            "label": FieldTally(),
+            "entity_reflection": FieldTally(),
+            "contextual_factors": FieldTally(masi_distance, pairwise=False),
+        }
+        self.listeners = []
+
+    def put_many(self, rows_by_source):
+        # {source: [(id, annotator, record_ratings())]} read from, or saved to, each source
+        changes = {field: [] for field in TALLY_FIELDS}
+        for source, rows in rows_by_source.items():
+            ratings = self.ratings.setdefault(source, {})
+            for example_id, annotator, values in rows:
+                key = (example_id, annotator)
+                if key not in self.owners:
+                    self.annotated[annotator] += 1
+                    self.raters[example_id] += 1
+                self.owners[key] = source
+                ratings[key] = values
+                for field, value in zip(TALLY_FIELDS, values):
+                    changes[field].append((example_id, annotator, value))
+        for field, rows in changes.items():
+            self.fields[field].put_many(rows)
+        self.notify(example_id for example_id, _, _ in changes["label"])
+
+    def remove_source(self, source):
+        removed = [key for key in self.ratings.pop(source, {}) if self.owners.get(key) == source]
+        for example_id, annotator in removed:
+            del self.owners[(example_id, annotator)]
+            self.annotated[annotator] -= 1
+            self.raters[example_id] -= 1
+            if not self.raters[example_id]:
+                del self.raters[example_id]
+        for field in TALLY_FIELDS:
+            self.fields[field].put_many([(example_id, annotator, None) for example_id, annotator in removed])
+        self.signatures.pop(source, None)
+        self.notify(example_id for example_id, _ in removed)
+
+    def notify(self, ids):
+        ids = set(ids)
+        if ids:
+            for listener in self.listeners:
+                listener(self, ids)
+
+    def read_source(self, path):
+        frame = read_annotator_file(path).reindex(columns=ANNOTATION_COLUMNS).fillna("")
+        columns = ["id", "annotator", "label", "entity_reflection", "contextual_factors"]
+        rows = []
+        for values in frame[columns].astype(str).itertuples(index=False):
+            record = dict(zip(columns, values))
+            example_id = item_id(record["id"])
+            if example_id is not None and record["annotator"]:
+                rows.append((example_id, record["annotator"], record_ratings(record)))
+        return rows
+
+    # -----------------------
+    # Keeping up
+    # -----------------------
+    def refresh(self):
+        # Re-read only the files whose signature moved since we last saw them
+        with self.lock:
+            if not self.loaded:
+                self.restore_snapshot()
+                self.loaded = True
+            paths = {path.as_posix(): path for path in annotator_files(self.annotation_dir)}
+            for source in [s for s in self.ratings if s not in paths]:
+                self.remove_source(source)
+            loaded, signatures = {}, {}
+            for source, path in paths.items():
+                signature = AnnotationJournal(path).signature()
+                if self.signatures.get(source) == signature:
+                    continue
+                loaded[source] = self.read_source(path)
+                signatures[source] = signature
+            # Every changed file in one batch, so each item is re-tallied once
+            for source in loaded:
+                self.remove_source(source)
+            self.put_many(loaded)
+            self.signatures.update(signatures)
+
+    def record_save(self, record, csv_path):
+        # Called after AnnotationRepository.save wrote the record to the journal
+        with self.lock:
+            if not self.loaded:
+                return
+            source = Path(csv_path).as_posix()
+            example_id = item_id(record.get("id"))
+            if example_id is not None:
+                self.put_many({source: [(example_id, record["annotator"], record_ratings(record))]})
+            self.signatures[source] = AnnotationJournal(csv_path).signature()
+
+    def mark_current(self, csv_path):
+        # After a compaction: the file changed on disk, its content did not
+        with self.lock:
+            source = Path(csv_path).as_posix()
+            if self.loaded and source in self.signatures:
+                self.signatures[source] = AnnotationJournal(csv_path).signature()
+
+    # -----------------------
+    # Snapshot
+    # -----------------------
+    def save_snapshot(self):
+        if self.snapshot_path is None:
+            return
+        with self.lock:
+            if not self.loaded:
+                return
+            state = {
+                "sources": {
+                    source: {
+                        "signature": self.signatures.get(source),
+                        # Only the ratings this file holds the current version of
+                        "ratings": [
+                            [example_id, annotator, *(encode_value(v) for v in values)]
+                            for (example_id, annotator), values in ratings.items()
+                            if self.owners.get((example_id, annotator)) == source
+                        ],
+                    }
+                    for source, ratings in self.ratings.items()
+                },
+                "fields": {field: tally.state() for field, tally in self.fields.items()},
+            }
+        tmp_path = self.snapshot_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(state))
+        tmp_path.replace(self.snapshot_path)
+
+    def restore_snapshot(self):
+        # Tallies as of the last snapshot; refresh() then re-reads the files changed since
+        if self.snapshot_path is None or not self.snapshot_path.exists():
+            return
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            sources, fields = state["sources"], state["fields"]
+        except (OSError, ValueError, KeyError):
+            return
+        rows = []
+        for source, cached in sources.items():
+            self.signatures[source] = tuple(tuple(s) if s is not None else None for s in cached["signature"] or ())
+            ratings = self.ratings[source] = {}
+            for example_id, annotator, *values in cached["ratings"]:
+                key = (example_id, annotator)
+                values = tuple(decode_value(v) for v in values)
+                ratings[key] = values
+                self.owners[key] = source
+                self.annotated[annotator] += 1
+                self.raters[example_id] += 1
+                rows.append((example_id, annotator, values))
+        for i, (field, tally) in enumerate(self.fields.items()):
+            tally.restore(fields[field], [(example_id, annotator, values[i]) for example_id, annotator, values in rows])
+        self.notify(example_id for example_id, _, _ in rows)
+
+    # -----------------------
+    # Reading
+    # -----------------------
+    def summary(self):
+        with self.lock:
+            label = self.fields["label"]
+            progress = pd.DataFrame([
+                {
+                    "annotator": annotator,
+                    "annotated": n,
+                    "correct": label.by_annotator.get(annotator, Counter())["correct"],
+                    "incorrect": label.by_annotator.get(annotator, Counter())["incorrect"],
+                }
+                for annotator, n in sorted(self.annotated.items())
+                if n > 0
+            ], columns=["annotator", "annotated", "correct", "incorrect"])
+            judged = progress["correct"] + progress["incorrect"]
+            progress["llm_precision"] = (progress["correct"] / judged).where(judged > 0)
+
+            fields = pd.DataFrame([
+                {
+                    "field": field,
+                    "items": tally.items,
+                    "fleiss_kappa": tally.fleiss_kappa() if tally.pairwise else np.nan,
+                    "krippendorff_alpha": tally.krippendorff_alpha(),
+                }
+                for field, tally in self.fields.items()
+            ])
+            correct, incorrect = progress["correct"].sum(), progress["incorrect"].sum()
+            decided = label.decided["correct"] + label.decided["incorrect"]
+            return {
+                "items": len(self.raters),
+                "progress": progress,
+                "fields": fields,
+                "pairs": {field: tally.pair_kappas() for field, tally in self.fields.items() if tally.pairwise},
+                # Share of "LLM is correct" over every judgement, and over items by majority
+                "llm_precision": correct / (correct + incorrect) if correct + incorrect else np.nan,
+                "llm_precision_majority": label.decided["correct"] / decided if decided else np.nan,
+            }
+
+
+if __name__ == "__main__":
+    # python agreement.py [csv, directory or glob ...]   (default: annotations/*.csv)
+    paths = annotation_paths(sys.argv[1:])
+    data = load_annotations(paths)
+    print(f"{len(data)} annotations of {data['id'].nunique()} items by {data['annotator'].nunique()} annotators")
+    for result in agreement_report(data):
+        print()
+        print(f"{result['field']}: {result['items']} items rated by 2+ of {result['annotators']} annotators")
+        for name in ("fleiss_kappa", "mean_cohen_kappa", "krippendorff_alpha", "krippendorff_alpha_masi"):
+            if name in result:
+                print(f"  {name}: {result[name]:.3f}")
+        if "pairs" in result and len(result["pairs"]):
+            print(result["pairs"].to_string(index=False, float_format="%.3f"))
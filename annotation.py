@@ -2,16 +2,68 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
-import re
 import os
+import time
+import uuid
 GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]
 REPO_NAME = st.secrets["REPO_NAME"]
-from github import Github
 import base64
-import ast
+from data_store import (
+    DATA_STORE_PATH,
+    load_window,
+    build_example_index,
+    PreparedExamples,
+    AbstractStore,
+    abstracts_path,
+)
+from assignments import assignment_window, lease_scope
+from instrumentation import PhaseTimings, TIMINGS_FLUSH_EVERY
+from annotation_store import AnnotationRepository
+from agreement import AgreementTracker
+from priority import PriorityIndex, read_features
+from leases import LeaseStore, HEARTBEAT_SECONDS
+from consolidate import ADJUDICATION_DIR, STATE_PATH as CONSOLIDATION_STATE_PATH, conflict_index, load_state
+from github_sync import PushQueue, GitHubFiles
+from taxonomy import (
+    CONTEXTUAL_FACTORS,
+    AMBIGUOUS_REFERENT_OPTIONS,
+    AMBIGUOUS_REFERENT_BY_CODE,
+    decode_factors,
+    decode_ambiguous_referents,
+    encode_factors,
+    encode_ambiguous_referents,
+    factor_label,
+    factor_texts,
+    ambiguous_referent_texts,
+)
 
 GITHUB_TOKEN = st.secrets["GITHUB_TOKEN"]  # replace with a secret in Streamlit secrets
 REPO_NAME = "MengfeiLan/Annotation_Drug_Disease_Con"
+# Point at a local fake_github.py server when testing pushes offline
+GITHUB_API_URL = st.secrets.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_BRANCH = st.secrets.get("GITHUB_BRANCH", "main")
+GITHUB_BATCH_COMMITS = st.secrets.get("GITHUB_BATCH_COMMITS", True)
+# Users who can open the timing overlay and the agreement dashboard
+ADMINS = set(st.secrets.get("ADMINS", ["visitor"]))
+# Users who can resolve conflicting annotations in the adjudicator view; nobody unless configured
+ADJUDICATORS = set(st.secrets.get("ADJUDICATORS", []))
+
+
+# Rolling per-phase timings of every session (and the push worker), exported to timings.jsonl
+@st.cache_resource
+def get_phase_timings():
+    return PhaseTimings(flush_every=st.secrets.get("TIMINGS_FLUSH_EVERY", TIMINGS_FLUSH_EVERY))
+
+timings = get_phase_timings()
+script_started = time.perf_counter()
+
+
+# One client (and SHA cache) per server process, shared by all sessions
+@st.cache_resource
+def get_github_files():
+    return GitHubFiles(GITHUB_TOKEN, REPO_NAME, GITHUB_API_URL, GITHUB_BRANCH)
+
+github_files = get_github_files()
 st.set_page_config(
     page_title="Drug–Disease Annotation",   # The tab title
     page_icon="💊",                          # Can be an emoji, or a local image file path
@@ -27,14 +79,11 @@ hide_streamlit_style = """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 
-def load_annotations_from_github():
-    g = Github(GITHUB_TOKEN)
-    repo = g.get_repo(REPO_NAME)
+def load_annotations_from_github(github_file_path):
+    # e.g. another annotator's "annotations/joe.csv"; unchanged files cost a 304 and no parsing
     try:
-        file = repo.get_contents(GITHUB_FILE_PATH)
-        content = file.decoded_content.decode()
-        return pd.read_csv(pd.compat.StringIO(content))
-    except:
+        return github_files.read_csv(github_file_path)
+    except Exception:
         return pd.DataFrame()
 
 
@@ -57,20 +106,7 @@ LABELS = {
     "LLM is incorrect: there's no contradiction in the drug-disease association across the claims": "incorrect",
 }
 
-CONTEXTUAL_FACTORS = [
-    "a. Species: The claims are based on different species that one claim is based on animal while another is based on another kind of animal or human.",
-    "b. Population: The claims target different human subpopulations, such as differences in age, sex, genetic background, comorbidities, ethnicity, or risk profiles.",
-    "c. Physiological context: The intervention is evaluated under different transient physiological or environmental conditions (e.g., exertion state, hypoxia, fasting status, or acute stress), even within the same species and population.",
-    "d. Dosage or exposure duration: The same intervention is administered at different doses, frequencies, or durations.",
-    "e. Route or mode of administration: The intervention is delivered via different routes (e.g., oral, intravenous, topical, sublingual, localized).",
-    "f. Combined drug effects: The reported effect of a drug depends on its use in combination with other drugs or therapies.",
-    "g. Evolving scientific evidence: The claims reflect different stages of scientific understanding.",
-    "h. Known controversy or self-qualified claims: One or both claims explicitly acknowledge uncertainty.",
-    "i. Study design: contradictions may arise from differences in trial methodology, such as parallel vs. crossover design, superiority vs. non-inferiority frameworks, blinding status, comparator type (placebo vs. active control), or randomization procedures.",
-    "j. Outcome measures: contradictions may arise because the studies measure different outcomes.", 
-    "k. Ambiguous referent: One claim lacks a clear specification of species, population, dosage and exposure duration, or route of administration, resulting in uncertainty about the basis of comparison.",
-    "l. Other: None of the listed factors explain the contradiction.",
-]
+# CONTEXTUAL_FACTORS and AMBIGUOUS_REFERENT_OPTIONS live in taxonomy.py
 
 # -----------------------
 # Login
@@ -98,36 +134,69 @@ if not st.session_state.logged_in:
 ANNOTATION_DIR = Path("annotations")
 ANNOTATION_DIR.mkdir(exist_ok=True)
 
+
+# One in-memory copy of the annotator files per server process
+@st.cache_resource
+def get_annotation_repository():
+    return AnnotationRepository(ANNOTATION_DIR)
+
+annotation_repository = get_annotation_repository()
+
+
+# Adjudicator decisions, kept apart from the annotations they resolve
+@st.cache_resource
+def get_adjudication_repository():
+    return AnnotationRepository(ADJUDICATION_DIR)
+
+adjudication_repository = get_adjudication_repository()
+
+
+# Running progress and agreement over every annotator, updated on each save
+@st.cache_resource
+def get_agreement_tracker():
+    return AgreementTracker(ANNOTATION_DIR)
+
+agreement_tracker = get_agreement_tracker()
+
 USER_CSV = ANNOTATION_DIR / f"{st.session_state.username}.csv"
 
-if USER_CSV.exists():
-    annotations = pd.read_csv(USER_CSV)
-else:
-    annotations = pd.DataFrame(columns=[
-        "id",
-        "label",
-        "contextual_agreement",
-        "contextual_factors",
-        "contextual_explanation",
-        "ambiguous_referent_type",
-        "annotator"
-    ])
-
-def push_annotations_to_github(local_file_path, commit_msg="Update annotations"):
-    g = Github(GITHUB_TOKEN)
-    repo = g.get_repo(REPO_NAME)
-    local_file_path = local_file_path.as_posix()
-    # Read local CSV content
-    with open(local_file_path, "r", encoding="utf-8") as f:
-        content = f.read()
-    print(local_file_path)
-    try:
-        # Try to get the file from repo
-        file = repo.get_contents(local_file_path)
-        repo.update_file(file.path, commit_msg, content, file.sha)
-    except:
-        # If file doesn't exist, create it
-        repo.create_file(local_file_path, commit_msg, content)
+
+def push_annotations_to_github(local_file_paths, commit_msg="Update annotations"):
+    files = {}
+    for local_file_path in local_file_paths:
+        local_file_path = Path(local_file_path).as_posix()
+        # Read local CSV content
+        with open(local_file_path, "r", encoding="utf-8") as f:
+            files[local_file_path] = f.read()
+    # Batch mode: one Git Data API commit for every changed file.
+    # Otherwise one contents-API commit per file (SHA refetched only on a conflict).
+    github_files.write_files(files, commit_msg, batch=GITHUB_BATCH_COMMITS)
+
+
+def push_annotation_journals(files):
+    # Runs on the push worker: fold each pending journal into its CSV snapshot,
+    # then push every file together. files: {path: (repository, annotator)}
+    with timings.phase("compact", files=len(files)):
+        paths = [repository.compact(annotator) for repository, annotator in files.values()]
+    for path in paths:
+        agreement_tracker.mark_current(path)
+    with timings.phase("push", files=len(paths)):
+        push_annotations_to_github(paths, f"Update annotations ({len(paths)} file(s))")
+    agreement_tracker.save_snapshot()
+
+
+# One background pusher per server process, shared by all sessions. It starts
+# with whatever a previous process saved but never pushed; what is still
+# pending when this process exits is pushed then (github_sync.flush_all)
+@st.cache_resource
+def get_push_queue():
+    queue = PushQueue(push_annotation_journals)
+    for repository in (annotation_repository, adjudication_repository):
+        for annotator in repository.pending_annotators():
+            queue.submit(repository.csv_path(annotator).as_posix(), (repository, annotator))
+    return queue
+
+push_queue = get_push_queue()
 
 # -----------------------
 # Helpers
@@ -139,38 +208,65 @@ def scroll_to_top():
 # Load data
 # -----------------------
 
-
-# Backward compatibility
-for col in [
-    "id",
-    "label",
-    "contextual_agreement",
-    "contextual_factors",
-    "contextual_explanation",
-]:
-    if col not in annotations.columns:
-        annotations[col] = ""
-
-if "ambiguous_referent_type" not in annotations.columns:
-    annotations["ambiguous_referent_type"] = ""
-    
-@st.cache_data
-def load_data():
-    return pd.read_csv(DATA_PATH)[50:100].reset_index(drop=False)
-
-df = load_data()
+# Rows assigned to this annotator in the current round, see assignments.toml
+ASSIGNMENT_WINDOW = assignment_window(st.session_state.username)
+# Leases keep two sessions of this annotator (or, in a split round, two
+# annotators) from having the same example open
+LEASE_SCOPE, LEASE_SPLIT = lease_scope(st.session_state.username)
+
+# Shared read-only across sessions (one copy per window), so reruns don't pay for a copy of the frame.
+# Bounded: one window per annotator plus the adjudication queue's, which changes with every consolidation
+WINDOW_CACHE_ENTRIES = len(USERS) + 1
+
+@st.cache_resource(max_entries=WINDOW_CACHE_ENTRIES)
+def load_data(window):
+    # Only the assigned rows are read from the pre-parsed Parquet store;
+    # the CSV is only re-ingested when it changes
+    return load_window(window, DATA_PATH).reset_index(drop=False)
+
+@st.cache_resource(max_entries=WINDOW_CACHE_ENTRIES)
+def load_example_index(window):
+    return build_example_index(load_data(window))
+
+# Information-gain priorities for the Next button's priority mode; kept up to
+# date by the agreement tracker as annotations arrive, built on first use
+@st.cache_resource
+def get_priority_index():
+    priority_index = PriorityIndex(read_features(DATA_PATH))
+    agreement_tracker.refresh()
+    priority_index.attach(agreement_tracker)
+    return priority_index
+
+@st.cache_resource(max_entries=WINDOW_CACHE_ENTRIES)
+def load_priority_window(window):
+    return get_priority_index().positions(load_example_index(window))
+
+# Display-ready examples, prepared ahead of navigation on a background thread,
+# which is stopped when the window drops out of the cache
+@st.cache_resource(max_entries=WINDOW_CACHE_ENTRIES, on_release=PreparedExamples.close)
+def load_prepared_examples(window):
+    return PreparedExamples(load_data(window))
+
+# Full abstracts, looked up by PMID when an abstract expander is opened
+@st.cache_resource
+def load_abstracts():
+    return AbstractStore(abstracts_path(DATA_STORE_PATH))
+
+with timings.phase("load_data"):
+    df = load_data(ASSIGNMENT_WINDOW)
+    abstract_store = load_abstracts()
+    example_index = load_example_index(ASSIGNMENT_WINDOW)
+    prepared_examples = load_prepared_examples(ASSIGNMENT_WINDOW)
 
 # -----------------------
 # Load per-user annotations
 # -----------------------
 USER_CSV = ANNOTATION_DIR / f"{st.session_state.username}.csv"
-if USER_CSV.exists():
-    annotations = pd.read_csv(USER_CSV)
-else:
-    annotations = pd.DataFrame(columns=[
-        "id", "label", "contextual_agreement", "contextual_factors",
-        "contextual_explanation", "annotator"
-    ])
+
+# Index keyed by (id, annotator), shared by every session of the server process.
+# Files are read once; save_annotation writes through to annotations/<user>.journal.jsonl
+with timings.phase("annotation_index"):
+    annotation_index = annotation_repository.index(st.session_state.username)
 
 # -----------------------
 # Sidebar: Progress & Traceback
@@ -178,21 +274,33 @@ else:
 # -----------------------
 # Sidebar: Progress & Traceback
 # -----------------------
-with st.sidebar:
+# Fragment: picking another example to preview only reruns the sidebar
+@st.fragment
+@timings.timed("render_sidebar")
+def render_sidebar():
     st.header("📌 Annotation Trace-back")
 
-    # Filter only current user's annotations
-    user_annotations = annotations[
-        annotations["annotator"] == st.session_state.username
-    ]
-
     total = len(df)
-    done = user_annotations["id"].nunique()
+    # Only the assigned examples count, not those saved in earlier rounds
+    done = annotation_index.count(st.session_state.username, within=example_index)
     st.metric("Progress", f"{done} / {total}")
+    st.toggle(
+        "🎯 Next: most informative first",
+        key="priority_next",
+        help="Next jumps to the unannotated example where a label helps most: "
+             "annotators disagree, its prediction / contextual factor is rarely "
+             "annotated, or similar examples were LLM errors.",
+    )
+
+    waiting = push_queue.depth()
+    if waiting:
+        st.caption(f"⏳ {waiting} save(s) waiting to sync to GitHub")
+    if push_queue.last_error is not None:
+        st.warning(f"GitHub sync is retrying: {push_queue.last_error}")
 
     st.markdown("---")
 
-    annotated_ids = sorted(user_annotations["id"].unique().tolist())
+    annotated_ids = annotation_index.annotated_ids(st.session_state.username, within=example_index)
 
     if annotated_ids:
 
@@ -203,24 +311,29 @@ with st.sidebar:
         )
 
         if st.button("🔎 Go to selected example"):
-            matches = df.index[df["id"] == selected_id].tolist()
-            if matches:
-                st.session_state.current_idx = matches[0]
+            position = example_index.get(selected_id)
+            if position is not None:
+                st.session_state.current_idx = position
                 st.session_state.loaded_id = None
                 st.rerun()
 
         # Preview (only essential fields)
-        r = user_annotations[user_annotations["id"] == selected_id].iloc[0]
+        r = annotation_index.get(selected_id, st.session_state.username)
 
         st.markdown("### 🧾 Saved Annotation Preview")
         st.write(f"**Label:** {r.get('label','')}")
         st.write(f"**Contextual agreement:** {r.get('contextual_agreement', "")}")
 
         if r.get("contextual_agreement") == "Disagree":
-            st.write(f"**Contextual factors:** {r.get('contextual_factors', "")}")
+            factors = ", ".join(factor_label(c) for c in decode_factors(r.get("contextual_factors", "")))
+            st.write(f"**Contextual factors:** {factors}")
 
             if r.get("ambiguous_referent_type"):
-                st.write(f"**Ambiguous subtype:** {r.get('ambiguous_referent_type')}")
+                subtypes = ", ".join(
+                    AMBIGUOUS_REFERENT_BY_CODE.get(c, c)
+                    for c in decode_ambiguous_referents(r.get("ambiguous_referent_type"))
+                )
+                st.write(f"**Ambiguous subtype:** {subtypes}")
 
             if r.get("contextual_explanation"):
                 st.write(f"**Other explanation:** {r.get('contextual_explanation')}")
@@ -229,6 +342,338 @@ with st.sidebar:
         st.info("No annotations yet.")
 
 
+with st.sidebar:
+    render_sidebar()
+
+
+# -----------------------
+# Claim panel
+# -----------------------
+# Claims and the LLM output don't change while the example is open;
+# toggling an abstract expander only reruns this panel
+@st.fragment
+@timings.timed("render_claim_panel")
+def render_claim_panel(example):
+    st.markdown("### Structured Claim Summary")
+    st.divider()
+    
+    col_se_l, col_se_r = st.columns([1.2, 1])
+    
+    # ---------- LEFT COLUMN ----------
+    with col_se_l:
+    
+        # ---------- PubTator ----------
+        with st.container(border=True):
+            st.markdown("#### PubTator Standardized Entities")
+    
+            st.markdown(f"**💊 Drug:** {example['drug_pub']}")
+            st.markdown(f"**🦠 Disease:** {example['disease_pub']}")
+    
+        st.markdown("")  # spacing
+    
+        # ---------- Original Text ----------
+        with st.container(border=True):
+            st.markdown("#### Original Text Entities")
+
+            st.markdown(f"**💊 Drug:** {example['drug_text']}")
+            st.markdown(f"**🦠 Disease:** {example['disease_text']}")
+    
+    
+    # ---------- RIGHT COLUMN ----------
+    with col_se_r:
+    
+        with st.container(border=True):
+            st.markdown("#### 🔗 Claim Relations")
+    
+            st.markdown("**Claim 1 Relation**")
+            st.code(example["claim_1_dd_relation"], language="text")
+    
+            st.markdown("**Claim 2 Relation**")
+            st.code(example["claim_2_dd_relation"], language="text")
+    
+        
+    # # =====================================================
+    # # 1. Structured Extraction
+    # # =====================================================
+    # st.markdown("### Structured Claim Summary")
+
+    # col_se_l, col_se_r = st.columns(2)
+
+    # with col_se_l:
+    #     st.markdown("#### PubTator Standardized Entities")
+    #     entities = row.get("shared_entities", {}) or {}
+    #     st.write(f"**Drug:** {entities.get('Chemical', 'N/A')}")
+    #     st.write(f"**Disease:** {entities.get('Disease', 'N/A')}")
+
+    #     st.markdown("#### Original Text Entities")
+    #     entities = row.get("shared_text", {}) or {}
+    #     st.write(f"**Drug:** {entities.get('Chemical', 'N/A')}")
+    #     st.write(f"**Disease:** {entities.get('Disease', 'N/A')}")
+    # with col_se_r:
+    #     st.markdown("**Claim 1 Relation:**")
+    #     st.code(str(row.get("claim_1_dd_relation", "")))
+    #     st.markdown("**Claim 2 Relation:**")
+    #     st.code(str(row.get("claim_2_dd_relation", "")))
+
+    st.markdown("---")
+
+    # =====================================================
+    # 2. Claims
+    # =====================================================
+    st.markdown("### Claims Under Comparison")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("**Claim 1**")
+        with st.container(border=True):
+            st.markdown(example["claim_1"])
+        # Opening the expander reruns the panel, which only then resolves the abstract
+        with st.expander("Claim 1 – Full Abstract", key="abstract_1_open", on_change="rerun") as abstract_1:
+            st.write(f"**PMID:** {example['pmid_1']}")
+            if abstract_1.open:
+                st.write(abstract_store.resolve(example["pmid_1"], example["claims_abs_1"]))
+
+    with col2:
+        st.markdown("**Claim 2**")
+        with st.container(border=True):
+            st.markdown(example["claim_2"])
+        with st.expander("Claim 2 – Full Abstract", key="abstract_2_open", on_change="rerun") as abstract_2:
+            st.write(f"**PMID:** {example['pmid_2']}")
+            if abstract_2.open:
+                st.write(abstract_store.resolve(example["pmid_2"], example["claims_abs_2"]))
+
+    st.markdown("---")
+
+
+# -----------------------
+# Agreement dashboard (admins only)
+# -----------------------
+@st.fragment
+@timings.timed("render_dashboard")
+def render_dashboard():
+    # Only files changed behind our back are re-read; saves are already tallied
+    agreement_tracker.refresh()
+    summary = agreement_tracker.summary()
+
+    st.title("📊 Annotation dashboard")
+    col_items, col_precision, col_majority = st.columns(3)
+    col_items.metric("Items annotated", summary["items"])
+    col_precision.metric("LLM precision (all judgements)", f"{summary['llm_precision']:.1%}")
+    col_majority.metric("LLM precision (majority per item)", f"{summary['llm_precision_majority']:.1%}")
+
+    st.subheader("Progress")
+    st.dataframe(summary["progress"].set_index("annotator"))
+
+    st.subheader("Agreement")
+    st.caption("Over items rated by at least two annotators; contextual factors use MASI distance.")
+    st.dataframe(summary["fields"].set_index("field"))
+
+    for field, pairs in summary["pairs"].items():
+        st.subheader(f"Pairwise Cohen's kappa: {field}")
+        if pairs.empty:
+            st.caption("No items rated by two annotators yet.")
+        else:
+            st.dataframe(pairs.pivot(index="annotator_1", columns="annotator_2", values="kappa"))
+
+
+# -----------------------
+# Adjudicator mode
+# -----------------------
+ENTITY_OPTIONS = [
+    "Yes, the claims reflect the entities.",
+    "No, the claims do not reflect the entities.",
+]
+
+
+def consolidation_signature():
+    # Changes whenever `python consolidate.py` rewrites its state; None before the first run
+    try:
+        stat = Path(CONSOLIDATION_STATE_PATH).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Conflicts come from the state of the last `python consolidate.py` run, read
+# once per run of it; the app never writes the gold file, the queue or the state
+@st.cache_resource(max_entries=1)
+def load_conflict_index(signature):
+    state = load_state(CONSOLIDATION_STATE_PATH) if signature is not None else None
+    return None if state is None else conflict_index(state)
+
+
+def describe_annotation(r):
+    factors = ", ".join(factor_label(c) for c in decode_factors(r["contextual_factors"]))
+    referents = ", ".join(
+        AMBIGUOUS_REFERENT_BY_CODE.get(c, c) for c in decode_ambiguous_referents(r["ambiguous_referent_type"])
+    )
+    return {
+        "entity_reflection": r["entity_reflection"],
+        "label": r["label"],
+        "contextual_agreement": r["contextual_agreement"],
+        "contextual_factors": factors,
+        "ambiguous_referent_type": referents,
+        "explanation": " | ".join(
+            t for t in (r["contextual_explanation"], r["ambiguous_referent_other_text"]) if t
+        ),
+    }
+
+
+def option_index(options, value):
+    return options.index(value) if value in options else None
+
+
+def render_decision_form(example_id, saved):
+    # Widgets are keyed per item, so every conflict opens with its own saved decision
+    saved = saved or {}
+    record = {"id": example_id, "annotator": st.session_state.username}
+
+    record["entity_reflection"] = st.radio(
+        "Do the extracted claims reflect the drug and disease entities?",
+        ENTITY_OPTIONS,
+        index=option_index(ENTITY_OPTIONS, saved.get("entity_reflection")),
+        key=f"adj_entity_{example_id}",
+    )
+    if record["entity_reflection"] != ENTITY_OPTIONS[0]:
+        return record
+
+    label_options = list(LABELS)
+    saved_label = next((k for k, v in LABELS.items() if v == saved.get("label")), None)
+    label = st.radio(
+        "Is the LLM's contradiction judgement correct?",
+        label_options,
+        index=option_index(label_options, saved_label),
+        key=f"adj_label_{example_id}",
+    )
+    record["label"] = LABELS.get(label)
+    if record["label"] != "correct":
+        return record
+
+    record["contextual_agreement"] = st.radio(
+        "Do you agree with the LLM's contextual factors?",
+        ["Agree", "Disagree"],
+        index=option_index(["Agree", "Disagree"], saved.get("contextual_agreement")),
+        key=f"adj_agreement_{example_id}",
+    )
+    if record["contextual_agreement"] == "Agree":
+        record["contextual_factors"] = "Agree"
+    if record["contextual_agreement"] != "Disagree":
+        return record
+
+    factors = st.multiselect(
+        "Contextual factors",
+        CONTEXTUAL_FACTORS,
+        default=factor_texts(saved.get("contextual_factors", "")),
+        key=f"adj_factors_{example_id}",
+    )
+    record["contextual_factors"] = encode_factors(factors)
+    if any(f.startswith("k. Ambiguous referent") for f in factors):
+        referents = st.multiselect(
+            "Ambiguous referent type",
+            AMBIGUOUS_REFERENT_OPTIONS,
+            default=ambiguous_referent_texts(saved.get("ambiguous_referent_type", "")),
+            key=f"adj_referents_{example_id}",
+        )
+        record["ambiguous_referent_type"] = encode_ambiguous_referents(referents)
+        if "Other" in referents:
+            record["ambiguous_referent_other_text"] = st.text_input(
+                "Other ambiguous referent",
+                value=saved.get("ambiguous_referent_other_text", ""),
+                key=f"adj_referent_other_{example_id}",
+            ).strip()
+    if any(f.startswith("l. Other") for f in factors):
+        record["contextual_explanation"] = st.text_area(
+            "Explain the 'Other' contextual factor",
+            value=saved.get("contextual_explanation", ""),
+            key=f"adj_explanation_{example_id}",
+        ).strip()
+    return record
+
+
+def decision_complete(record):
+    if not record.get("entity_reflection"):
+        return False
+    if record["entity_reflection"] == ENTITY_OPTIONS[0]:
+        if not record.get("label"):
+            return False
+        if record["label"] == "correct" and not record.get("contextual_factors"):
+            return False
+    return True
+
+
+@timings.timed("render_adjudication")
+def render_adjudication():
+    st.title("⚖️ Adjudication")
+    conflicts = load_conflict_index(consolidation_signature())
+    decisions = adjudication_repository.index(st.session_state.username)
+
+    if conflicts is None:
+        st.info("No adjudication queue yet: run `python consolidate.py` to build it.")
+        return
+    if not conflicts:
+        st.info("No conflicting annotations to adjudicate.")
+        return
+    ids = list(conflicts)
+    decided = {i for i in ids if decisions.get(i, st.session_state.username) is not None}
+    # Decided items leave the queue on the next `python consolidate.py` run
+    st.metric("Decided", f"{len(decided)} / {len(ids)}")
+
+    # Set by Save: a widget's value can't be changed once it is drawn in a run
+    if "adjudication_next" in st.session_state:
+        st.session_state.adjudication_id = st.session_state.pop("adjudication_next")
+    example_id = st.selectbox(
+        "Conflicting item",
+        ids,
+        key="adjudication_id",
+        format_func=lambda i: f"{i}: {', '.join(conflicts[i]['conflicts'])}" + (" ✅" if i in decided else ""),
+    )
+
+    # The claims, from the rows of the conflicting items only
+    window = ("ids", tuple(ids))
+    position = load_example_index(window).get(example_id)
+    if position is None:
+        st.warning(f"Item {example_id} is not in the dataset.")
+    else:
+        example, _ = load_prepared_examples(window).get(position)
+        render_claim_panel(example)
+
+    st.markdown("### Annotations")
+    st.dataframe(pd.DataFrame.from_dict(
+        {a: describe_annotation(r) for a, r in sorted(conflicts[example_id]["ratings"].items())}, orient="index"
+    ))
+
+    st.markdown("### Decision")
+    record = render_decision_form(example_id, decisions.get(example_id, st.session_state.username))
+    if st.button("💾 Save decision"):
+        if not decision_complete(record):
+            st.warning("Please complete the decision before saving.")
+            return
+        adjudication_repository.save(record)
+        push_queue.submit(
+            adjudication_repository.csv_path(st.session_state.username).as_posix(),
+            (adjudication_repository, st.session_state.username),
+        )
+        remaining = [i for i in ids if i not in decided and i != example_id]
+        if remaining:
+            st.session_state.adjudication_next = remaining[0]
+        st.rerun()
+
+
+views = ["Annotate"]
+if st.session_state.username in ADJUDICATORS:
+    views.append("Adjudicate")
+if st.session_state.username in ADMINS:
+    views.append("Dashboard")
+view = st.sidebar.radio("View", views, key="view", horizontal=True) if len(views) > 1 else "Annotate"
+if view == "Dashboard":
+    render_dashboard()
+    st.stop()
+if view == "Adjudicate":
+    render_adjudication()
+    st.stop()
+
+
 
 # # -----------------------
 # # Load / initialize annotations
@@ -256,24 +701,27 @@ if "label_radio" not in st.session_state:
 if "selected_label" not in st.session_state:
     st.session_state.selected_label = None
 
+if "contextual_agreement" not in st.session_state:
+    st.session_state.contextual_agreement = None
+
 if "contextual_factors" not in st.session_state:
     st.session_state.contextual_factors = []
 
 if "contextual_explanation" not in st.session_state:
     st.session_state.contextual_explanation = ""
 
+if "ambiguous_referent_type" not in st.session_state:
+    st.session_state.ambiguous_referent_type = []
+
 # -----------------------
 # Load annotation for current example
 # -----------------------
+@timings.timed("load_existing_annotation")
 def load_existing_annotation(example_id):
 
-    match = annotations[
-        (annotations["id"] == example_id) &
-        (annotations["annotator"] == st.session_state.username)
-    ]
+    r = annotation_index.get(example_id, st.session_state.username)
 
-    if not match.empty:
-        r = match.iloc[0]
+    if r is not None:
         
         st.session_state.selected_label = r["label"]
 
@@ -288,19 +736,12 @@ def load_existing_annotation(example_id):
             else None
         )
 
-        if r["contextual_factors"] == "Agree":
-            st.session_state.contextual_factors = []
-        elif pd.notna(r["contextual_factors"]) and r["contextual_factors"]:
-            st.session_state.contextual_factors = r["contextual_factors"].split("; ")
-        else:
-            st.session_state.contextual_factors = []
+        # Stored as codes ("b;d"); the widgets work with the full option texts
+        st.session_state.contextual_factors = factor_texts(r["contextual_factors"])
 
-        saved_types = r.get("ambiguous_referent_type", "")
-        
-        if isinstance(saved_types, str) and saved_types.strip():
-            st.session_state.ambiguous_referent_type = saved_types.split("; ")
-        else:
-            st.session_state.ambiguous_referent_type = []
+        st.session_state.ambiguous_referent_type = ambiguous_referent_texts(
+            r.get("ambiguous_referent_type", "")
+        )
 
         st.session_state.contextual_explanation = (
             r.get("contextual_explanation") or ""
@@ -333,6 +774,57 @@ if st.session_state.get("loaded_id") != row["id"]:
     load_existing_annotation(row["id"])
     st.session_state.loaded_id = row["id"]
 
+# -----------------------
+# Item lease
+# -----------------------
+# One SQLite file shared by every session and server process
+@st.cache_resource
+def get_lease_store():
+    return LeaseStore()
+
+lease_store = get_lease_store()
+
+if "lease_session" not in st.session_state:
+    st.session_state.lease_session = uuid.uuid4().hex
+
+# Every full run takes (or renews) the lease on the open example; another
+# session holding it makes the example read-only here
+with timings.phase("lease"):
+    # Locked here, or our lease lapsed since the last run: whoever held the
+    # example meanwhile may have saved it
+    was_locked = st.session_state.get("item_locked", False)
+    lapsed = (
+        not was_locked
+        and st.session_state.get("lease_item") == row["id"]
+        and not lease_store.heartbeat(st.session_state.lease_session)
+    )
+    item_holder, item_held = lease_store.acquire(
+        LEASE_SCOPE, row["id"], st.session_state.lease_session, st.session_state.username
+    )
+st.session_state.item_locked = not item_held
+st.session_state.lease_item = row["id"]
+if (was_locked or lapsed) and item_held:
+    # Start again from what is saved now
+    load_existing_annotation(row["id"])
+
+
+# Renews the lease while the page stays open; a locked example opens for
+# editing as soon as the other session lets go of it
+@st.fragment(run_every=HEARTBEAT_SECONDS)
+def keep_lease():
+    if not st.session_state.item_locked:
+        if not lease_store.heartbeat(st.session_state.lease_session):
+            # The lease lapsed (e.g. a suspended tab): read-only until the full
+            # run takes it back and reloads the example
+            st.session_state.item_locked = True
+            st.rerun()
+        return
+    _, held = lease_store.acquire(
+        LEASE_SCOPE, row["id"], st.session_state.lease_session, st.session_state.username
+    )
+    if held:
+        st.rerun()
+
 # -----------------------
 # UI
 # -----------------------
@@ -341,6 +833,14 @@ st.title("📝 Annotation for Drug–Disease Contradiction and Resolution")
 
 
 st.write(f"Example {st.session_state.current_idx + 1} / {len(df)}")
+keep_lease()
+if st.session_state.item_locked:
+    who = "You have" if item_holder == st.session_state.username else f"{item_holder} has"
+    st.warning(f"🔒 {who} this example open in another session. It is read-only here; Next moves on without saving.")
+if st.session_state.pop("lease_lost", False):
+    st.warning("Your hold on this example lapsed, so the save was not written. The example was reloaded with its latest saved annotation.")
+elif lapsed:
+    st.warning("Your hold on this example lapsed while the page was idle. The example was reloaded with its latest saved annotation.")
 
 with st.expander("Annotation Guideline"):
     st.markdown(
@@ -415,304 +915,28 @@ disagree, the annotators are asked to select the taxonomy factors that could exp
 
 
 )
-# -----------------------
-# Configuration
-# -----------------------
-DATA_PATH = "annotation_file_with_new_categories_for_annotation_only.csv"
-
-LABELS = {
-    "LLM is correct: there's a contradiction in the drug-disease association across the claims": "correct",
-    "LLM is incorrect: there's no contradiction in the drug-disease association across the claims": "incorrect",
-}
-
-CONTEXTUAL_FACTORS = [
-    "a. Species: The claims are based on different species that one claim is based on animal while another is based on another kind of animal or human.",
-    "b. Population: The claims target different human subpopulations, such as differences in age, sex, genetic background, comorbidities, ethnicity, or risk profiles.",
-    "c. Physiological context: The intervention is evaluated under different transient physiological or environmental conditions (e.g., exertion state, hypoxia, fasting status, or acute stress), even within the same species and population.",
-    "d. Dosage or exposure duration: The same intervention is administered at different doses, frequencies, or durations.",
-    "e. Route or mode of administration: The intervention is delivered via different routes (e.g., oral, intravenous, topical, sublingual, localized).",
-    "f. Combined drug effects: The reported effect of a drug depends on its use in combination with other drugs or therapies.",
-    "g. Evolving scientific evidence: The claims reflect different stages of scientific understanding.",
-    "h. Known controversy or self-qualified claims: One or both claims explicitly acknowledge uncertainty.",
-    "i. Study design: contradictions may arise from differences in trial methodology, such as parallel vs. crossover design, superiority vs. non-inferiority frameworks, blinding status, comparator type (placebo vs. active control), or randomization procedures.",
-    "j. Outcome measures: contradictions may arise because the studies measure different outcomes.", 
-    "k. Ambiguous referent: One claim lacks a clear specification of species, population, dosage and exposure duration, or route of administration, resulting in uncertainty about the basis of comparison.",
-    "l. Other: None of the listed factors explain the contradiction.",
-]
-
-AMBIGUOUS_REFERENT_OPTIONS = [
-    "One or both abstracts lack species information",
-    "One or both abstracts lack population information",
-    "One or both abstracts lack dosage and exposure duration information",
-    "One or both abstracts lack route of administration information",
-    "Other"
-]
-
-
-
-# -----------------------
-# Helpers
-# -----------------------
-def scroll_to_top():
-    st.markdown("<script>window.scrollTo(0, 0);</script>", unsafe_allow_html=True)
-
-
-# -----------------------
-# Load / initialize annotations
-# -----------------------
-
-if "annotator" not in annotations.columns:
-    annotations["annotator"] = ""
-
-if "ambiguous_referent_type" not in st.session_state:
-    st.session_state.ambiguous_referent_type = []
-
-# -----------------------
-# Backward compatibility (IMPORTANT)
-# -----------------------
-for col in [
-    "id",
-    "label",
-    "contextual_agreement",
-    "contextual_factors",
-    "contextual_explanation",
-]:
-    if col not in annotations.columns:
-        annotations[col] = ""
-
-# -----------------------
-# Session state
-# -----------------------
-if "current_idx" not in st.session_state:
-    st.session_state.current_idx = 0
-
-if "label_radio" not in st.session_state:
-    st.session_state.label_radio = None
-
-if "selected_label" not in st.session_state:
-    st.session_state.selected_label = None
-
-if "contextual_agreement" not in st.session_state:
-    st.session_state.contextual_agreement = None
-
-if "contextual_factors" not in st.session_state:
-    st.session_state.contextual_factors = []
-
-if "contextual_explanation" not in st.session_state:
-    st.session_state.contextual_explanation = ""
-
-if "ambiguous_referent_type" not in annotations.columns:
-    annotations["ambiguous_referent_type"] = ""
-
-if "ambiguous_referent_other_text" not in annotations.columns:
-    annotations["ambiguous_referent_other_text"] = ""
-
-# -----------------------
-# Helper: Load existing annotation
-# -----------------------
-def load_existing_annotation(example_id):
-    global annotations
-
-    # Filter by example and annotator
-    match = annotations[
-        (annotations["id"] == example_id) &
-        (annotations["annotator"] == st.session_state.username)
-    ]
-
-    if not match.empty:
-        r = match.iloc[0]
-        # -----------------------
-        # Load entity reflection
-        # -----------------------
-        saved_entity_reflection = r.get("entity_reflection", "")
-        if saved_entity_reflection:
-            st.session_state.entity_reflection = saved_entity_reflection
-        else:
-            st.session_state.entity_reflection = None
-
-        # -----------------------
-        # Task 1
-        # -----------------------
-        saved_label = r.get("label", "")
-        st.session_state.selected_label = saved_label
-
-        st.session_state.label_radio = next(
-            (k for k, v in LABELS.items() if v == saved_label),
-            None
-        )
-
-        # -----------------------
-        # Task 2 - Contextual agreement
-        # -----------------------
-        saved_agreement = r.get("contextual_agreement", "")
-        st.session_state.contextual_agreement = (
-            saved_agreement if saved_agreement in ["Agree", "Disagree"] else None
-        )
-
-        # -----------------------
-        # Contextual factors
-        # -----------------------
-        saved_factors = r.get("contextual_factors", "")
-
-        if saved_factors == "Agree":
-            # If previously agreed, no factors selected
-            st.session_state.contextual_factors = []
-        elif isinstance(saved_factors, str) and saved_factors.strip():
-            st.session_state.contextual_factors = saved_factors.split("; ")
-        else:
-            st.session_state.contextual_factors = []
-
-        # -----------------------
-        # Ambiguous referent subtype
-        # -----------------------
-        st.session_state.ambiguous_referent_type = r.get(
-            "ambiguous_referent_type", None
-        ) or None
-
-        # -----------------------
-        # Other explanation
-        # -----------------------
-        explanation = r.get("contextual_explanation", "")
-        st.session_state.contextual_explanation = (
-            explanation if isinstance(explanation, str) else ""
-        )
-
-    else:
-        # Reset all states if no annotation exists
-        st.session_state.label_radio = None
-        st.session_state.selected_label = None
-        st.session_state.contextual_agreement = None
-        st.session_state.contextual_factors = []
-        st.session_state.contextual_explanation = ""
-        st.session_state.ambiguous_referent_type = []
-        st.session_state.entity_reflection = None
-
-
-# Clamp index
-st.session_state.current_idx = max(0, min(st.session_state.current_idx, len(df) - 1))
-df["shared_entities"] = df["shared_entities"].apply(ast.literal_eval)
-df["shared_text"] = df["shared_text"].apply(ast.literal_eval)
-
-row = df.iloc[st.session_state.current_idx]
 
+prepare_started = time.perf_counter()
+example, was_prefetched = prepared_examples.get(st.session_state.current_idx)
+timings.record("prepare_example", time.perf_counter() - prepare_started, prefetched=was_prefetched)
 
 # -----------------------
 # 🤖 Task 1: Annotation for Contradiction Detection
 # -----------------------
 st.subheader("🤖 Task 1: Annotation for Contradiction Detection")
 
-with st.container(border=True):
-
-    st.markdown("### Structured Claim Summary")
-    st.divider()
-    
-    col_se_l, col_se_r = st.columns([1.2, 1])
-    
-    # ---------- LEFT COLUMN ----------
-    with col_se_l:
-    
-        # ---------- PubTator ----------
-        with st.container(border=True):
-            st.markdown("#### PubTator Standardized Entities")
-    
-            pub_entities = row.get("shared_entities", {}) or {}
-    
-            drug_pub = ", ".join(pub_entities.get("Chemical", [])) or "N/A"
-            disease_pub = ", ".join(pub_entities.get("Disease", [])) or "N/A"
-    
-            st.markdown(f"**💊 Drug:** {drug_pub}")
-            st.markdown(f"**🦠 Disease:** {disease_pub}")
-    
-        st.markdown("")  # spacing
-    
-        # ---------- Original Text ----------
-        with st.container(border=True):
-            st.markdown("#### Original Text Entities")
-
-            text_entities = row.get("shared_text", {}) or {}
-            if isinstance(text_entities, str):
-                try:
-                    text_entities = ast.literal_eval(text_entities)
-                except:
-                    text_entities = {}
-    
-            drug_text = ", ".join(text_entities.get("Chemical", [])) or "N/A"
-            disease_text = ", ".join(text_entities.get("Disease", [])) or "N/A"
-    
-            st.markdown(f"**💊 Drug:** {drug_text}")
-            st.markdown(f"**🦠 Disease:** {disease_text}")
-    
-    
-    # ---------- RIGHT COLUMN ----------
-    with col_se_r:
-    
-        with st.container(border=True):
-            st.markdown("#### 🔗 Claim Relations")
-    
-            st.markdown("**Claim 1 Relation**")
-            st.code(str(row.get("claim_1_dd_relation", "N/A")), language="text")
-    
-            st.markdown("**Claim 2 Relation**")
-            st.code(str(row.get("claim_2_dd_relation", "N/A")), language="text")
-    
-        
-    # # =====================================================
-    # # 1. Structured Extraction
-    # # =====================================================
-    # st.markdown("### Structured Claim Summary")
-
-    # col_se_l, col_se_r = st.columns(2)
-
-    # with col_se_l:
-    #     st.markdown("#### PubTator Standardized Entities")
-    #     entities = row.get("shared_entities", {}) or {}
-    #     st.write(f"**Drug:** {entities.get('Chemical', 'N/A')}")
-    #     st.write(f"**Disease:** {entities.get('Disease', 'N/A')}")
-
-    #     st.markdown("#### Original Text Entities")
-    #     entities = row.get("shared_text", {}) or {}
-    #     st.write(f"**Drug:** {entities.get('Chemical', 'N/A')}")
-    #     st.write(f"**Disease:** {entities.get('Disease', 'N/A')}")
-    # with col_se_r:
-    #     st.markdown("**Claim 1 Relation:**")
-    #     st.code(str(row.get("claim_1_dd_relation", "")))
-    #     st.markdown("**Claim 2 Relation:**")
-    #     st.code(str(row.get("claim_2_dd_relation", "")))
+def task2_open():
+    return (
+        st.session_state.selected_label == "correct"
+        and st.session_state.entity_reflection == "Yes, the claims reflect the entities."
+    )
 
-    st.markdown("---")
 
+# Fragment: the entity check and the label radio only rerun Task 1
+@st.fragment
+@timings.timed("render_task1")
+def render_task1():
     # =====================================================
-    # 2. Claims
-    # =====================================================
-    st.markdown("### Claims Under Comparison")
-
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown("**Claim 1**")
-        with st.container(border=True):
-            st.markdown(
-                re.sub(r"\.(?=[A-Z])", ". ", row["claim_1"])
-            )
-        with st.expander("Claim 1 – Full Abstract"):
-            st.write(f"**PMID:** {row['pmid_1']}")
-            st.write(row["claims_abs_1"])
-
-    with col2:
-        st.markdown("**Claim 2**")
-        with st.container(border=True):
-            st.markdown(
-                re.sub(r"\.(?=[A-Z])", ". ", row["claim_2"])
-            )
-        with st.expander("Claim 2 – Full Abstract"):
-            st.write(f"**PMID:** {row['pmid_2']}")
-            st.write(
-                re.sub(r"\.(?=[A-Z])", ". ", row["claims_abs_2"])
-            )
-
-    st.markdown("---")
-
-        # =====================================================
     # 3. Entity–Claim Consistency Check
     # =====================================================
     
@@ -752,14 +976,8 @@ with st.container(border=True):
 
         st.markdown("### Model Contradiction Reasoning")
         
-        raw_explanation = str(row.get("reasoning", "")).strip()
-        
-        cleaned_explanation = (
-            raw_explanation
-            .replace("Task(1):", "")
-            .replace("Task(2):", "")
-            .strip()
-        )
+        # Escaped at ingest: the LLM output is shown as text, not markup
+        cleaned_explanation = example["reasoning_html"]
         
         with st.container(border=True):
             st.markdown(
@@ -786,7 +1004,7 @@ with st.container(border=True):
         # 4. LLM Decision
         # =====================================================
         st.markdown("### LLM Decision")
-        st.write(f"**{row.get('prediction', 'N/A')}**")
+        st.write(f"**{example['prediction']}**")
 
     
         # -----------------------
@@ -796,16 +1014,90 @@ with st.container(border=True):
         st.radio("", options=list(LABELS.keys()), key="label_radio")
         st.session_state.selected_label = LABELS.get(st.session_state.label_radio)
 
+    # Task 2 is laid out by the full script: open or close it with a full rerun
+    if task2_open() != st.session_state.task2_open:
+        st.rerun()
+
+
+st.session_state.task2_open = task2_open()
+
+with st.container(border=True):
+    render_claim_panel(example)
+    render_task1()
+
+
+# Fragment: agreement, factors and explanations only rerun Task 2
+@st.fragment
+@timings.timed("render_task2")
+def render_task2():
+    st.markdown("<p style='color:red; font-size:22px; font-weight:600;'>Do you agree with the LLM’s contextual judgment?</p>", unsafe_allow_html=True)
+    st.radio("", options=["Agree", "Disagree"], key="contextual_agreement", horizontal=True)
+
+    if st.session_state.contextual_agreement == "Disagree":
+    
+        st.multiselect(
+            "Which contextual factors explain the contradiction?",
+            options=CONTEXTUAL_FACTORS,
+            key="contextual_factors"
+        )
+    
+        # -----------------------
+
+        # -----------------------
+        # Ambiguous Referent Dropdown
+        # -----------------------
+        if any(f.startswith("k. Ambiguous referent") 
+               for f in st.session_state.contextual_factors):
+        
+            st.multiselect(
+                "Specify the type of ambiguous referent:",
+                options=AMBIGUOUS_REFERENT_OPTIONS,
+                key="ambiguous_referent_type"
+            )
+        
+            # Show textbox ONLY if "Other" is selected
+            if "Other" in st.session_state.ambiguous_referent_type:
+                st.text_area(
+                    "Please specify the other ambiguous referent:",
+                    key="ambiguous_referent_other_text",
+                    height=100
+                )
+            else:
+                st.session_state.ambiguous_referent_other_text = ""
+        
+        else:
+            st.session_state.ambiguous_referent_type = []
+            st.session_state.ambiguous_referent_other_text = ""
+
+    
+        # -----------------------
+        # Other Explanation Box
+        # -----------------------
+        if any(f.startswith("l. Other") 
+               for f in st.session_state.contextual_factors):
+    
+            st.text_area(
+                "Please explain the other contextual factor:",
+                key="contextual_explanation",
+                height=120
+            )
+        else:
+            # Clear stale value if unselected
+            st.session_state.contextual_explanation = ""
+        
+    elif st.session_state.contextual_agreement == "Agree":
+        st.session_state.contextual_factors = []
+        st.session_state.contextual_explanation = ""
 
 
-if st.session_state.selected_label == "correct" and st.session_state.entity_reflection == "Yes, the claims reflect the entities.":
+if st.session_state.task2_open:
     st.markdown("---")
     st.subheader("🧩 Task 2: Contextual Resolution")
     st.markdown("### 🤖 LLM Contextual Judgment")
     
-    st.write(f"**The LLM identifies the following contextual conditions that may explain the apparent contradiction:** {row.get('contextual_factor', 'N/A')}")
+    st.write(f"**The LLM identifies the following contextual conditions that may explain the apparent contradiction:** {example['contextual_factor']}")
     
-    if row.get("contextual_factor_explanation"):
+    if example["contextual_factor_explanation"]:
         st.markdown(
             f"""
             <div style="
@@ -818,7 +1110,7 @@ if st.session_state.selected_label == "correct" and st.session_state.entity_refl
                 background-color: transparent;
                 white-space: pre-wrap;
             ">
-                {row["contextual_factor_explanation"]}
+                {example["contextual_factor_explanation_html"]}
             </div>
             """,
             unsafe_allow_html=True
@@ -966,64 +1258,7 @@ if st.session_state.selected_label == "correct" and st.session_state.entity_refl
     with st.expander("❓ Other", expanded=False):
         st.markdown("""None of the listed factors explain the contradiction. If choosing 'Other', explain the other potiential contextual factors that may apply to the scenario.""")
 
-    st.markdown("<p style='color:red; font-size:22px; font-weight:600;'>Do you agree with the LLM’s contextual judgment?</p>", unsafe_allow_html=True)
-    st.radio("", options=["Agree", "Disagree"], key="contextual_agreement", horizontal=True)
-
-    if st.session_state.contextual_agreement == "Disagree":
-    
-        st.multiselect(
-            "Which contextual factors explain the contradiction?",
-            options=CONTEXTUAL_FACTORS,
-            key="contextual_factors"
-        )
-    
-        # -----------------------
-
-        # -----------------------
-        # Ambiguous Referent Dropdown
-        # -----------------------
-        if any(f.startswith("k. Ambiguous referent") 
-               for f in st.session_state.contextual_factors):
-        
-            st.multiselect(
-                "Specify the type of ambiguous referent:",
-                options=AMBIGUOUS_REFERENT_OPTIONS,
-                key="ambiguous_referent_type"
-            )
-        
-            # Show textbox ONLY if "Other" is selected
-            if "Other" in st.session_state.ambiguous_referent_type:
-                st.text_area(
-                    "Please specify the other ambiguous referent:",
-                    key="ambiguous_referent_other_text",
-                    height=100
-                )
-            else:
-                st.session_state.ambiguous_referent_other_text = ""
-        
-        else:
-            st.session_state.ambiguous_referent_type = []
-            st.session_state.ambiguous_referent_other_text = ""
-
-    
-        # -----------------------
-        # Other Explanation Box
-        # -----------------------
-        if any(f.startswith("l. Other") 
-               for f in st.session_state.contextual_factors):
-    
-            st.text_area(
-                "Please explain the other contextual factor:",
-                key="contextual_explanation",
-                height=120
-            )
-        else:
-            # Clear stale value if unselected
-            st.session_state.contextual_explanation = ""
-        
-    elif st.session_state.contextual_agreement == "Agree":
-        st.session_state.contextual_factors = []
-        st.session_state.contextual_explanation = ""
+    render_task2()
 
         
 # -----------------------
@@ -1045,8 +1280,15 @@ if st.session_state.selected_label == "correct" and st.session_state.entity_refl
 #     annotations = pd.concat([annotations, pd.DataFrame([new_row])], ignore_index=True)
 #     annotations.to_csv(USER_CSV, index=False)
 
+@timings.timed("save")
 def save_annotation():
-    global annotations
+
+    # A lapsed lease means another session may have taken the example and
+    # saved it since: refuse rather than overwrite what it wrote
+    if not lease_store.heartbeat(st.session_state.lease_session):
+        st.session_state.item_locked = True
+        st.session_state.lease_lost = True
+        st.rerun()
 
     new_row = {
         "id": row["id"],
@@ -1064,7 +1306,8 @@ def save_annotation():
 
         if st.session_state.contextual_agreement == "Disagree":
 
-            new_row["contextual_factors"] = "; ".join(
+            # Stored as letter codes, e.g. "b;d"
+            new_row["contextual_factors"] = encode_factors(
                 st.session_state.contextual_factors
             )
 
@@ -1076,7 +1319,7 @@ def save_annotation():
                     t for t in st.session_state.ambiguous_referent_type
                 ]
             
-                new_row["ambiguous_referent_type"] = "; ".join(selected_types)
+                new_row["ambiguous_referent_type"] = encode_ambiguous_referents(selected_types)
             
                 # Save "Other" explanation in its own column
                 if "Other" in st.session_state.ambiguous_referent_type:
@@ -1103,24 +1346,16 @@ def save_annotation():
             new_row["contextual_factors"] = "Agree"
 
     # -----------------------
-    # Remove previous annotation
+    # Replace previous annotation
     # -----------------------
-    annotations = annotations[
-        ~(
-            (annotations["id"] == row["id"]) &
-            (annotations["annotator"] == st.session_state.username)
-        )
-    ]
-
-    annotations = pd.concat(
-        [annotations, pd.DataFrame([new_row])],
-        ignore_index=True
-    )
-
-    USER_CSV.parent.mkdir(exist_ok=True)
-    annotations.to_csv(USER_CSV, index=False)
-
-    push_annotations_to_github(USER_CSV)
+    # O(1) append; compaction and the GitHub push happen on the background queue,
+    # coalesced into one commit per PUSH_INTERVAL seconds or PUSH_EVERY saves
+    annotation_repository.save(new_row)
+    agreement_tracker.record_save(new_row, USER_CSV)
+    if LEASE_SPLIT:
+        # Nobody else in the round takes this example up again
+        lease_store.complete(LEASE_SCOPE, row["id"], st.session_state.lease_session, st.session_state.username)
+    push_queue.submit(USER_CSV.as_posix(), (annotation_repository, st.session_state.username))
 # -----------------------
 # Navigation + Save buttons
 # -----------------------
@@ -1190,22 +1425,97 @@ def validate_and_save():
 # Navigation + Save buttons
 # -----------------------
 st.markdown("---")
-col_prev, col_save, col_next = st.columns([1, 2, 1])
 
-with col_prev:
-    if st.button("⬅ Previous", disabled=st.session_state.current_idx == 0):
-        if validate_and_save():
-            st.session_state.current_idx -= 1
-            st.rerun()
 
-with col_save:
-    if st.button("💾 Save annotation"):
-        if validate_and_save():
-            st.success("Annotation saved.")
+def next_position():
+    # The next free example in order, or in priority mode the most informative
+    # one this annotator hasn't saved yet; examples other sessions hold are skipped
+    taken = lease_store.taken(LEASE_SCOPE, st.session_state.lease_session, st.session_state.username)
+    # Nothing is saved when Next leaves a read-only example
+    saved = "" if st.session_state.item_locked else "Annotation saved. "
+    if not st.session_state.get("priority_next"):
+        position = st.session_state.current_idx + 1
+        while position < len(df) and df["id"].iat[position] in taken:
+            position += 1
+        if position == len(df):
+            st.session_state.save_message = saved + "Every example after this one is open in another session."
+            return st.session_state.current_idx
+        return position
+    with timings.phase("priority_next"):
+        priority_index = get_priority_index()
+        # Picks up annotations other server processes wrote since the last look
+        agreement_tracker.refresh()
+        next_id = priority_index.next_item(
+            (ASSIGNMENT_WINDOW, st.session_state.username),
+            load_priority_window(ASSIGNMENT_WINDOW),
+            done=annotation_index.ids_by_annotator.get(st.session_state.username, set()),
+            skip=taken,
+        )
+    if next_id is None:
+        st.session_state.save_message = saved + "Every assigned example is annotated or open in another session."
+        return st.session_state.current_idx
+    return example_index[next_id]
+
+
+# Fragment: a failed validation only reruns the buttons; a save, Previous and
+# Next rerun the whole page so the sidebar progress and the example follow
+@st.fragment
+@timings.timed("render_navigation")
+def render_navigation():
+    col_prev, col_save, col_next = st.columns([1, 2, 1])
+
+    with col_prev:
+        if st.button("⬅ Previous", disabled=st.session_state.current_idx == 0):
+            if st.session_state.item_locked or validate_and_save():
+                st.session_state.current_idx -= 1
+                st.rerun()
+
+    with col_save:
+        if st.button("💾 Save annotation", disabled=st.session_state.item_locked):
+            if validate_and_save():
+                st.session_state.save_message = "Annotation saved."
+                st.rerun()
+        if st.session_state.get("save_message"):
+            st.success(st.session_state.pop("save_message"))
+
+    with col_next:
+        last = st.session_state.current_idx == len(df) - 1
+        if st.button("Next ➡", disabled=last and not st.session_state.get("priority_next")):
+            if st.session_state.item_locked or validate_and_save():
+                st.session_state.current_idx = next_position()
+                st.rerun()
 
-with col_next:
-    if st.button("Next ➡", disabled=st.session_state.current_idx == len(df) - 1):
-        if validate_and_save():
-            st.session_state.current_idx += 1
-            st.rerun()
 
+render_navigation()
+
+# -----------------------
+# Prefetch neighbours while the annotator reads
+# -----------------------
+prepared_examples.prefetch([
+    st.session_state.current_idx + 1,
+    st.session_state.current_idx - 1,
+])
+
+# Full reruns that reach the end; fragment reruns are timed per fragment above
+timings.record("script", time.perf_counter() - script_started)
+
+# -----------------------
+# Timing overlay (admins only)
+# -----------------------
+def render_timings():
+    if not st.toggle("⏱ Show timings", key="show_timings"):
+        return
+    summary = timings.summary()
+    if not summary:
+        st.caption("No timings recorded yet.")
+        return
+    st.dataframe(pd.DataFrame(summary).set_index("phase"))
+    phase = st.selectbox("Histogram", [r["phase"] for r in summary], key="timings_phase")
+    st.bar_chart(pd.Series(timings.histogram(phase), name="reruns"), sort=False)
+    # Generated on click, not on every rerun of the admin sidebar
+    st.download_button("Download timings.jsonl", timings.export, file_name="timings.jsonl")
+
+
+if st.session_state.username in ADMINS:
+    with st.sidebar:
+        render_timings()
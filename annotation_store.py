@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+# -----------------------
+# Configuration
+# -----------------------
+ANNOTATION_COLUMNS = [
+    "id",
+    "label",
+    "contextual_agreement",
+    "contextual_factors",
+    "contextual_explanation",
+    "annotator",
+    "ambiguous_referent_type",
+    "ambiguous_referent_other_text",
+    "entity_reflection",
+]
+
+
+def clean_record(record):
+    # Missing CSV cells come back as NaN, which is truthy; normalise them to ""
+    clean = {col: "" for col in ANNOTATION_COLUMNS}
+    for key, value in record.items():
+        clean[key] = "" if pd.isna(value) else value
+    return clean
+
+
+# -----------------------
+# Annotation index keyed by (id, annotator)
+# -----------------------
+class AnnotationIndex:
+
+    def __init__(self, annotations=None):
+        self.records = {}
+        self.ids_by_annotator = {}
+        if annotations is not None:
+            for record in annotations.to_dict("records"):
+                self.put(record)
+
+    def put(self, record):
+        record = clean_record(record)
+        key = (record["id"], record["annotator"])
+        self.records[key] = record
+        self.ids_by_annotator.setdefault(record["annotator"], set()).add(record["id"])
+        return record
+
+    def get(self, example_id, annotator):
+        return self.records.get((example_id, annotator))
+
+    def annotated_ids(self, annotator, within=None):
+        # within: only ids in this collection (e.g. the annotator's assigned ids)
+        ids = self.ids_by_annotator.get(annotator, set())
+        if within is not None:
+            ids = {example_id for example_id in ids if example_id in within}
+        return sorted(ids)
+
+    def count(self, annotator, within=None):
+        ids = self.ids_by_annotator.get(annotator, set())
+        if within is None:
+            return len(ids)
+        return sum(1 for example_id in ids if example_id in within)
+
+    def to_frame(self):
+        return pd.DataFrame(list(self.records.values()), columns=ANNOTATION_COLUMNS)
+
+
+# -----------------------
+# Append-only journal
+# -----------------------
+def json_default(value):
+    # numpy scalars (e.g. ids taken from the dataset frame)
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class AnnotationJournal:
+    """
+    One JSON line per save next to the annotator's CSV snapshot.
+    Replaying snapshot + journal in order gives last-writer-wins per (id, annotator).
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = Path(csv_path)
+        self.journal_path = self.csv_path.with_suffix(".journal.jsonl")
+        # Journal being folded into the snapshot; left behind if a compaction crashed
+        self.compacting_path = self.csv_path.with_suffix(".journal.compacting")
+
+    def pending(self):
+        # Saves not yet folded into the snapshot (nor, with it, pushed)
+        return any(
+            path.exists() and path.stat().st_size > 0
+            for path in (self.compacting_path, self.journal_path)
+        )
+
+    def signature(self):
+        # Cheap change detector: (mtime, size) of every file that makes up the state
+        signature = []
+        for path in (self.csv_path, self.compacting_path, self.journal_path):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def read_snapshot(self):
+        if self.csv_path.exists():
+            return pd.read_csv(self.csv_path)
+        return pd.DataFrame(columns=ANNOTATION_COLUMNS)
+
+    def replay(self, index, path):
+        if not path.exists():
+            return 0
+        n = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    index.put(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write
+                    continue
+                n += 1
+        return n
+
+    def load(self):
+        index = AnnotationIndex(self.read_snapshot())
+        self.replay(index, self.compacting_path)
+        self.replay(index, self.journal_path)
+        return index
+
+    def append(self, record):
+        self.csv_path.parent.mkdir(exist_ok=True)
+        line = json.dumps(clean_record(record), default=json_default)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self):
+        # Move the live journal aside first so concurrent saves start a fresh one
+        if self.journal_path.exists() and not self.compacting_path.exists():
+            self.journal_path.replace(self.compacting_path)
+
+        index = AnnotationIndex(self.read_snapshot())
+        self.replay(index, self.compacting_path)
+
+        tmp_path = self.csv_path.with_suffix(".csv.tmp")
+        index.to_frame().to_csv(tmp_path, index=False)
+        tmp_path.replace(self.csv_path)
+
+        if self.compacting_path.exists():
+            self.compacting_path.unlink()
+        return index
+
+
+# -----------------------
+# Process-wide annotation repository
+# -----------------------
+class AnnotationRepository:
+    """
+    Keeps every annotator's records in memory, shared by all sessions.
+    Saves update the index and write through to the journal; files are only
+    re-read when their on-disk signature changes behind our back
+    (another server process, a manual edit, a git pull).
+    """
+
+    def __init__(self, annotation_dir):
+        self.annotation_dir = Path(annotation_dir)
+        self.lock = threading.RLock()
+        self.journals = {}
+        self.indexes = {}
+        self.signatures = {}
+
+    def csv_path(self, annotator):
+        return self.annotation_dir / f"{annotator}.csv"
+
+    def journal(self, annotator):
+        if annotator not in self.journals:
+            self.journals[annotator] = AnnotationJournal(self.csv_path(annotator))
+        return self.journals[annotator]
+
+    def index(self, annotator):
+        with self.lock:
+            journal = self.journal(annotator)
+            if self.signatures.get(annotator) != journal.signature():
+                self.reload(annotator)
+            return self.indexes[annotator]
+
+    def reload(self, annotator):
+        with self.lock:
+            journal = self.journal(annotator)
+            self.indexes[annotator] = journal.load()
+            self.signatures[annotator] = journal.signature()
+            return self.indexes[annotator]
+
+    def save(self, record):
+        annotator = record["annotator"]
+        with self.lock:
+            index = self.index(annotator)
+            journal = self.journal(annotator)
+            journal.append(record)
+            index.put(record)
+            self.signatures[annotator] = journal.signature()
+
+    def pending_annotators(self):
+        # Annotators with saves still in a journal, e.g. left by a server process that stopped
+        names = {path.name.split(".")[0] for path in self.annotation_dir.glob("*.journal.*")}
+        return sorted(name for name in names if self.journal(name).pending())
+
+    def compact(self, annotator):
+        # Compaction rewrites files but not their content, so keep the in-memory index
+        with self.lock:
+            journal = self.journal(annotator)
+            if self.signatures.get(annotator) != journal.signature():
+                self.reload(annotator)
+            journal.compact()
+            self.signatures[annotator] = journal.signature()
+            return journal.csv_path
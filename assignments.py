@@ -0,0 +1,86 @@
+import csv
+import functools
+import os
+import sys
+import tomllib
+from pathlib import Path
+
+# -----------------------
+# Configuration
+# -----------------------
+ASSIGNMENTS_PATH = "assignments.toml"
+
+
+def load_assignments(path=ASSIGNMENTS_PATH):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+@functools.lru_cache(maxsize=8)
+def read_schedule(path, mtime_ns):
+    # annotator -> ids in schedule order; keyed on mtime, so a rescheduled round is picked up
+    schedule = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            schedule.setdefault(row["annotator"], []).append(int(row["id"]))
+    return {annotator: tuple(ids) for annotator, ids in schedule.items()}
+
+
+def load_schedule(path):
+    # The materialized output of scheduler.py, read once per change of the file
+    return read_schedule(path, os.stat(path).st_mtime_ns)
+
+
+def window_from_config(config):
+    # -> ("range", start, end) or ("ids", (id, ...)); hashable, so it can key st.cache_resource
+    if "ids" in config:
+        return ("ids", tuple(config["ids"]))
+    return ("range", int(config.get("start", 0)), config.get("end"))
+
+
+def assignment_window(username, round_name=None, path=ASSIGNMENTS_PATH):
+    """
+    The window of dataset rows assigned to username in round_name (default: the
+    configured current_round). Without an assignments file everyone gets every row.
+    A round with a schedule gives each scheduled annotator their own ids; anyone
+    else falls back to the round's window.
+    """
+    assignments = load_assignments(path)
+    round_name = round_name or assignments.get("current_round")
+    rounds = assignments.get("rounds", {})
+    if round_name is None:
+        return ("range", 0, None)
+    if round_name not in rounds:
+        raise KeyError(f"Round {round_name!r} is not defined in {path}")
+
+    round_config = rounds[round_name]
+    annotator_config = round_config.get("annotators", {}).get(username)
+    if annotator_config is None and "schedule" in round_config:
+        ids = load_schedule(round_config["schedule"]).get(username)
+        if ids:
+            return ("ids", ids)
+    return window_from_config(annotator_config or round_config)
+
+
+def lease_scope(username, round_name=None, path=ASSIGNMENTS_PATH):
+    """
+    What item leases are taken in: the annotator's own work, so two sessions
+    of one annotator don't open the same item, or with split = true (everyone
+    shares the round's window and divides it up) the whole round, so no two
+    annotators do. -> (scope, split)
+    """
+    assignments = load_assignments(path)
+    round_name = round_name or assignments.get("current_round")
+    if assignments.get("rounds", {}).get(round_name, {}).get("split"):
+        return f"round:{round_name}", True
+    return f"annotator:{username}", False
+
+
+if __name__ == "__main__":
+    # python assignments.py <username> [round]
+    username = sys.argv[1]
+    round_name = sys.argv[2] if len(sys.argv) > 2 else None
+    print(assignment_window(username, round_name))
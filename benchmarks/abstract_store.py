@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from synthetic import make_dataset
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from data_store import (
+    STORE_ROW_GROUP_SIZE,
+    AbstractStore,
+    abstracts_path,
+    append_to_store,
+    prepare_chunk,
+    read_source,
+    to_arrow,
+)
+
+# File size and memory of the example store with abstracts inline in every
+# pair versus kept once per PMID (data_store.split_abstracts):
+#
+#   python benchmarks/abstract_store.py [pairs]
+PAIRS = 50_000
+
+
+def mb(n):
+    return f"{n / 1e6:8.1f} MB"
+
+
+def write_inline(csv_path, store_path):
+    # The previous layout: every pair carries both abstracts
+    writer = None
+    for raw in read_source(csv_path):
+        table = to_arrow(prepare_chunk(raw)[0])
+        if writer is None:
+            writer = pq.ParquetWriter(store_path, table.schema)
+        writer.write_table(table, row_group_size=STORE_ROW_GROUP_SIZE)
+    writer.close()
+
+
+def main(pairs=PAIRS):
+    workdir = Path(tempfile.mkdtemp(prefix="abstract_store_"))
+    try:
+        csv_path = make_dataset(pairs, workdir / "pairs.csv")
+        inline_path = workdir / "inline.parquet"
+        store_path = workdir / "annotation_data.parquet"
+
+        write_inline(csv_path, inline_path)
+        counts = append_to_store(csv_path, store_path, rebuild=True)
+
+        inline = pd.read_parquet(inline_path)
+        deduplicated = pd.read_parquet(store_path)
+        abstract_store = AbstractStore(abstracts_path(store_path))
+
+        started = time.perf_counter()
+        abstract_store.get(deduplicated["pmid_1"].iloc[0])
+        first_lookup = time.perf_counter() - started
+        started = time.perf_counter()
+        for pmid in deduplicated["pmid_2"].iloc[:200]:
+            abstract_store.get(pmid)
+        lookup = (time.perf_counter() - started) / 200
+
+        inline_memory = inline.memory_usage(deep=True).sum()
+        pairs_memory = deduplicated.memory_usage(deep=True).sum()
+        inline_size = os.path.getsize(inline_path)
+        pairs_size = os.path.getsize(store_path)
+        abstracts_size = os.path.getsize(abstracts_path(store_path))
+
+        print(f"{pairs} pairs, {counts['abstracts']} distinct abstracts")
+        print(f"source CSV                    {mb(os.path.getsize(csv_path))}")
+        print(f"inline store (file)           {mb(inline_size)}")
+        print(f"PMID-keyed store (file)       {mb(pairs_size + abstracts_size)}"
+              f"  (pairs {mb(pairs_size).strip()}, abstracts {mb(abstracts_size).strip()})")
+        print(f"inline frame (memory)         {mb(inline_memory)}")
+        print(f"pairs frame (memory)          {mb(pairs_memory)}"
+              f"  ({1 - pairs_memory / inline_memory:.0%} less; abstracts stay on disk)")
+        print(f"first abstract lookup         {first_lookup * 1000:8.1f} ms  (builds the PMID index)")
+        print(f"abstract lookup               {lookup * 1000:8.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else PAIRS)
@@ -0,0 +1,291 @@
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+
+from rerun_cpu import APP_FILES, ROOT, CORRECT, INCORRECT, YES, share_script_cache
+from suite import read_timings
+from synthetic import ENTITY_NO, make_dataset
+
+sys.path.insert(0, str(ROOT))
+from data_store import DATA_PATH
+from instrumentation import percentile
+from taxonomy import CONTEXTUAL_FACTORS, encode_factors
+
+# Several annotators clicking through Task 1 / Task 2 on one server process at
+# once, pushing to a local fake GitHub with added latency and a rate limit:
+#
+#   python benchmarks/load_test.py [--users halil,mengfei,shiwei,joe,visitor,visitor]
+#       [--saves 20] [--latency 0.1] [--rate-limit 60 --rate-window 10] [--out results.jsonl]
+#
+# Every session runs in its own thread and shares the process-wide caches and
+# push queue, as browser sessions do on one Streamlit server. AppTest keeps
+# global state per run, so script runs take turns (the GIL serializes their CPU
+# on a real server too): a click's latency includes the time it queued behind
+# other sessions. Reports click throughput and latency, how long GitHub takes
+# to catch up, and every annotation that did not reach GitHub as it was last
+# saved. A username listed twice is two browser sessions of one annotator.
+USERS = ["halil", "mengfei", "shiwei", "joe", "visitor", "visitor"]
+SAVES = 20
+DATA_ROWS = 200
+LATENCY = 0.1
+RATE_LIMIT = 60
+RATE_WINDOW = 10.0
+THINK = 0.0                 # seconds an annotator pauses before each click
+SYNC_TIMEOUT = 300
+
+# AppTest installs (and afterwards clears) a global Runtime for every run
+RUN_LOCK = threading.Lock()
+
+# Factors without a follow-up question, so one multiselect completes Task 2
+PLAIN_FACTORS = [f for f in CONTEXTUAL_FACTORS if not f.startswith(("k.", "l."))]
+
+
+# -----------------------
+# One browser session
+# -----------------------
+class Session:
+
+    def __init__(self, workdir, username, seed, think=THINK):
+        self.username = username
+        self.rng = random.Random(seed)
+        self.think = think
+        self.at = AppTest.from_file(str(workdir / "annotation.py"), default_timeout=120)
+        self.at.session_state["logged_in"] = True
+        self.at.session_state["username"] = username
+        self.latencies = {}     # action -> [seconds]
+        self.queued = []        # seconds each click waited for another session's run
+        self.finished = None
+        self.saves = []         # (finished at, id, expected record)
+        self.error = None
+
+    def click(self, action, element=None, value=None):
+        if self.think:
+            time.sleep(self.rng.uniform(0, 2 * self.think))
+        if element is not None:
+            element.set_value(value)
+        started = time.perf_counter()
+        with RUN_LOCK:
+            self.queued.append(time.perf_counter() - started)
+            self.at.run()
+            # Runs are serialized, so this orders every save across sessions
+            self.finished = time.monotonic()
+        self.latencies.setdefault(action, []).append(time.perf_counter() - started)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].value)
+
+    def annotate(self):
+        # A random but complete annotation; returns the fields the saved row should hold
+        at = self.at
+        roll = self.rng.random()
+        if roll < 0.15:
+            self.click("task 1", at.radio(key="entity_reflection"), ENTITY_NO)
+            # The label radio is hidden, so a label loaded from an earlier save is kept
+            return {"entity_reflection": ENTITY_NO}
+        self.click("task 1", at.radio(key="entity_reflection"), YES)
+        if roll < 0.4:
+            self.click("task 1", at.radio(key="label_radio"), INCORRECT)
+            return {"entity_reflection": YES, "label": "incorrect", "contextual_factors": ""}
+        self.click("task 1", at.radio(key="label_radio"), CORRECT)
+        if roll < 0.6:
+            self.click("task 2", at.radio(key="contextual_agreement"), "Agree")
+            return {"entity_reflection": YES, "label": "correct", "contextual_factors": "Agree"}
+        self.click("task 2", at.radio(key="contextual_agreement"), "Disagree")
+        factors = self.rng.sample(PLAIN_FACTORS, self.rng.randint(1, 3))
+        self.click("task 2", at.multiselect(key="contextual_factors"), factors)
+        return {"entity_reflection": YES, "label": "correct", "contextual_factors": encode_factors(factors)}
+
+    def run(self, saves):
+        try:
+            self.click("open")
+            for _ in range(saves):
+                example_id = int(self.at.session_state["loaded_id"])
+                next_button = [b for b in self.at.button if b.label.startswith("Next")][0]
+                if self.at.session_state["item_locked"]:
+                    # Another session of this annotator has it open: Next moves on without saving
+                    next_button.click()
+                    self.click("skip locked")
+                    continue
+                expected = self.annotate()
+                next_button = [b for b in self.at.button if b.label.startswith("Next")][0]
+                next_button.click()
+                self.click("save + next")
+                self.saves.append((self.finished, example_id, expected))
+        except Exception as e:
+            self.error = e
+
+
+# -----------------------
+# Checking what reached GitHub
+# -----------------------
+def pushed_csv(server, path):
+    with server.lock:
+        contents = [content for (_, p), content in server.files.items() if p == path]
+    if not contents:
+        return pd.DataFrame(columns=["id"])
+    return pd.read_csv(io.BytesIO(contents[0]), dtype=str, keep_default_na=False)
+
+
+def check(server, sessions):
+    # Last save wins per (annotator, id); anything else on GitHub was lost
+    last = {}
+    savers = {}
+    for session in sessions:
+        for finished, example_id, expected in session.saves:
+            key = (session.username, example_id)
+            savers.setdefault(key, set()).add(id(session))
+            if key not in last or finished > last[key][0]:
+                last[key] = (finished, expected)
+
+    missing = stale = 0
+    files = {}
+    for (username, example_id), (_, expected) in last.items():
+        if username not in files:
+            frame = pushed_csv(server, f"annotations/{username}.csv")
+            files[username] = {int(r["id"]): r for r in frame.to_dict("records")}
+        row = files[username].get(example_id)
+        if row is None:
+            missing += 1
+        elif any(row.get(field, "") != value for field, value in expected.items()):
+            stale += 1
+    # Items saved by two sessions of the same annotator: one silently replaced the other
+    overwritten = sum(1 for s in savers.values() if len(s) > 1)
+    return {"saved_items": len(last), "missing": missing, "stale": stale, "overwritten": overwritten}
+
+
+def wait_for_github(server, sessions, timeout=SYNC_TIMEOUT):
+    # Until GitHub holds every last save (pushes that GitHub refused are retried)
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check(server, sessions)
+        caught_up = result["missing"] == result["stale"] == 0
+        if caught_up or time.monotonic() >= deadline:
+            return caught_up, result
+        time.sleep(0.5)
+
+
+# -----------------------
+# Run
+# -----------------------
+def summarize(seconds):
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 1),
+        "p95_ms": round(percentile(values, 95), 1),
+        "p99_ms": round(percentile(values, 99), 1),
+        "max_ms": round(values[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default=",".join(USERS))
+    parser.add_argument("--saves", type=int, default=SAVES, help="saves per session")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="seconds added to every GitHub request")
+    parser.add_argument("--rate-limit", type=int, default=RATE_LIMIT, help="GitHub requests per --rate-window")
+    parser.add_argument("--rate-window", type=float, default=RATE_WINDOW, help="seconds")
+    parser.add_argument("--think", type=float, default=THINK, help="mean seconds between clicks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="append a JSON summary here")
+    args = parser.parse_args()
+    users = args.users.split(",")
+
+    workdir = Path(tempfile.mkdtemp(prefix="load_test_"))
+    for name in APP_FILES:
+        shutil.copy(ROOT / name, workdir / name)
+    make_dataset(DATA_ROWS, workdir / DATA_PATH)
+    os.chdir(workdir)
+    share_script_cache()
+
+    from fake_github import FakeGitHub
+    server = FakeGitHub(latency=args.latency, rate_limit=args.rate_limit, rate_window=args.rate_window).start()
+    # Shared by every session up front: AppTest swaps st.secrets per run, which races across threads
+    st.secrets = Secrets()
+    st.secrets._secrets = {
+        "GITHUB_TOKEN": "load-test",
+        "REPO_NAME": "load-test/annotations",
+        "GITHUB_API_URL": server.url,
+        "TIMINGS_FLUSH_EVERY": 1,
+    }
+    try:
+        # Warm the process-wide caches first, as a server that has been up a while would be
+        Session(workdir, "warmup", args.seed).click("open")
+
+        sessions = [Session(workdir, user, args.seed + i, args.think) for i, user in enumerate(users)]
+        threads = [threading.Thread(target=s.run, args=(args.saves,)) for s in sessions]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        clicked = time.monotonic() - started
+        synced, outcome = wait_for_github(server, sessions)
+        sync_lag = time.monotonic() - started - clicked
+        errors = [f"{s.username}: {s.error}" for s in sessions if s.error]
+
+        latencies = {}
+        for session in sessions:
+            for action, seconds in session.latencies.items():
+                latencies.setdefault(action, []).extend(seconds)
+        saves = sum(len(s.saves) for s in sessions)
+        # Includes refused attempts, which the push queue retried
+        pushes = read_timings(workdir / "timings.jsonl").get("push", [])
+        result = {
+            "sessions": len(sessions),
+            "saves": saves,
+            "latency_s": args.latency,
+            "rate_limit": f"{args.rate_limit}/{args.rate_window:g}s",
+            "wall_s": round(clicked, 2),
+            "saves_per_s": round(saves / clicked, 2),
+            "clicks": {action: summarize(seconds) for action, seconds in latencies.items()},
+            "queued": summarize([q for s in sessions for q in s.queued]),
+            "synced": synced,
+            "sync_lag_s": round(sync_lag, 2),
+            "pushes": len(pushes),
+            "push_p50_ms": round(statistics.median(pushes), 1) if pushes else None,
+            "github_requests": len(server.calls),
+            "rate_limited": server.rate_limited,
+            **outcome,
+            "errors": errors,
+        }
+    finally:
+        server.stop()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(sessions)} sessions, {saves} saves in {result['wall_s']} s ({result['saves_per_s']} saves/s)")
+    print(f"{'click':14} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for action, s in [*result["clicks"].items(), ("(queued)", result["queued"])]:
+        print(f"{action:14} {s['count']:6} {s['p50_ms']:8.1f} {s['p95_ms']:8.1f} {s['p99_ms']:8.1f} {s['max_ms']:8.1f}")
+    print(
+        f"GitHub: {result['pushes']} push attempts, {result['github_requests']} requests, "
+        f"{result['rate_limited']} rate limited; caught up {result['sync_lag_s']} s after the last click"
+        + ("" if synced else " (timed out)")
+    )
+    print(
+        f"Annotations: {result['saved_items']} saved, {result['missing']} missing on GitHub, "
+        f"{result['stale']} stale on GitHub, {result['overwritten']} saved by two sessions"
+    )
+    for error in errors:
+        print(f"error: {error}")
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import functools
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+import streamlit.testing.v1.app_test as app_test
+import streamlit.testing.v1.local_script_runner as local_script_runner
+
+from synthetic import make_dataset
+
+# Server CPU per widget click: every click rerunning the whole script (what the
+# app did before it was split into fragments) versus rerunning only the fragment
+# that owns the widget, as the browser requests it.
+#
+#   python benchmarks/rerun_cpu.py [rounds]
+#
+# Runs against a copy of the app in a temporary directory, with synthetic data
+# and a local fake GitHub, so nothing in the checkout is touched.
+ROOT = Path(__file__).resolve().parent.parent
+APP_FILES = [
+    "annotation.py", "data_store.py", "annotation_store.py", "github_sync.py", "taxonomy.py",
+    "assignments.py", "assignments.toml", "instrumentation.py", "agreement.py", "consolidate.py",
+    "priority.py", "leases.py", "fake_github.py",
+]
+DATA_ROWS = 200
+ROUNDS = 10
+
+YES = "Yes, the claims reflect the entities."
+CORRECT = "LLM is correct: there's a contradiction in the drug-disease association across the claims"
+INCORRECT = "LLM is incorrect: there's no contradiction in the drug-disease association across the claims"
+FACTOR_D = "d. Dosage or exposure duration: The same intervention is administered at different doses, frequencies, or durations."
+FACTOR_E = "e. Route or mode of administration: The intervention is delivered via different routes (e.g., oral, intravenous, topical, sublingual, localized)."
+
+
+# -----------------------
+# Fragment reruns through AppTest
+# -----------------------
+def fragment_ids(at):
+    # render_task1 -> fragment id, read from the closures AppTest keeps for the session
+    ids = {}
+    for fragment_id, fragment in at._fragment_storage._fragments.items():
+        for cell in fragment.__closure__ or ():
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                continue
+            name = getattr(value, "__name__", "")
+            if callable(value) and name.startswith("render_"):
+                ids[name] = fragment_id
+    return ids
+
+
+def run_fragment(at, fragment):
+    # AppTest always requests a full rerun; queue the fragment like the browser does
+    rerun_data = local_script_runner.RerunData
+    fragment_id = fragment_ids(at)[fragment]
+    local_script_runner.RerunData = functools.partial(rerun_data, fragment_id_queue=[fragment_id])
+    try:
+        at.run()
+    finally:
+        local_script_runner.RerunData = rerun_data
+
+
+# -----------------------
+# Clicks
+# -----------------------
+def widget(at, kind, key):
+    return getattr(at, kind)(key=key)
+
+
+def clicks():
+    # (name, owning fragment, element kind, key, value)
+    return [
+        ("entity reflection", "render_task1", "radio", "entity_reflection", YES),
+        ("label: incorrect", "render_task1", "radio", "label_radio", INCORRECT),
+        ("label: correct (opens Task 2)", "render_task1", "radio", "label_radio", CORRECT),
+        ("contextual agreement", "render_task2", "radio", "contextual_agreement", "Disagree"),
+        ("contextual factors", "render_task2", "multiselect", "contextual_factors", [FACTOR_D]),
+        ("contextual factors (2nd)", "render_task2", "multiselect", "contextual_factors", [FACTOR_D, FACTOR_E]),
+        ("sidebar preview", "render_sidebar", "selectbox", "sidebar_selected_id", None),
+    ]
+
+
+# CPU spent on the script thread (the server's share of a click), summed over the
+# script runs a click causes: a fragment that calls st.rerun() adds a full run
+script_cpu = []
+
+
+def count_script_cpu(run_script):
+    @functools.wraps(run_script)
+    def wrapper(self, rerun_data):
+        started = time.thread_time()
+        try:
+            return run_script(self, rerun_data)
+        finally:
+            script_cpu.append(time.thread_time() - started)
+    return wrapper
+
+
+def timed(run):
+    script_cpu.clear()
+    wall = time.perf_counter()
+    run()
+    return sum(script_cpu) * 1000, (time.perf_counter() - wall) * 1000
+
+
+def measure(at, fragments, rounds):
+    samples = {}
+    for _ in range(rounds):
+        for name, fragment, kind, key, value in clicks():
+            element = widget(at, kind, key)
+            if value is None:
+                # Preview a different annotated example
+                options = [o for o in element.options if o != str(element.value)]
+                if not options:
+                    continue
+                value = type(element.value)(options[0])
+            element.set_value(value)
+            if fragments:
+                cost = timed(lambda: run_fragment(at, fragment))
+                # Untimed: bring AppTest's element tree back in line with the page
+                at.run()
+            else:
+                cost = timed(at.run)
+            assert not at.exception, at.exception
+            samples.setdefault(name, []).append(cost)
+
+        # Save and move on (a full rerun in both modes)
+        [b for b in at.button if b.label.startswith("Next")][0].click().run()
+    return samples
+
+
+def share_script_cache():
+    # A server compiles the script once; AppTest would recompile it on every run
+    script_cache = app_test.ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+
+def make_app(workdir, github_url):
+    at = AppTest.from_file(str(workdir / "annotation.py"), default_timeout=60)
+    at.secrets["GITHUB_TOKEN"] = "benchmark"
+    at.secrets["REPO_NAME"] = "benchmark/annotations"
+    at.secrets["GITHUB_API_URL"] = github_url
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "benchmark"
+    at.run()
+    return at
+
+
+def main(rounds=ROUNDS):
+    workdir = Path(tempfile.mkdtemp(prefix="rerun_cpu_"))
+    for name in APP_FILES:
+        shutil.copy(ROOT / name, workdir / name)
+    make_dataset(DATA_ROWS, workdir / "annotation_file_with_new_categories_for_annotation_only.csv")
+    os.chdir(workdir)
+    sys.path.insert(0, str(workdir))
+    runner = local_script_runner.LocalScriptRunner
+    runner._run_script = count_script_cpu(runner._run_script)
+    share_script_cache()
+
+    from fake_github import FakeGitHub
+    server = FakeGitHub().start()
+    try:
+        results = {}
+        for mode, fragments in (("full", False), ("fragment", True)):
+            shutil.rmtree(workdir / "annotations", ignore_errors=True)
+            at = make_app(workdir, server.url)
+            # One save so the sidebar has something to preview
+            at.radio(key="entity_reflection").set_value("No, the claims do not reflect the entities.").run()
+            [b for b in at.button if b.label.startswith("Next")][0].click().run()
+            results[mode] = measure(at, fragments, rounds)
+    finally:
+        # Push what is pending now, not at exit once the workdir is gone
+        from github_sync import flush_all
+        flush_all()
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'click':32} {'full cpu ms':>12} {'fragment cpu ms':>16} {'full wall ms':>13} {'fragment wall ms':>17}")
+    totals = {"full": [], "fragment": []}
+    for name in results["full"]:
+        row = []
+        for mode in ("full", "fragment"):
+            samples = results[mode].get(name, [])
+            totals[mode].extend(samples)
+            row.append(statistics.median(s[0] for s in samples) if samples else float("nan"))
+            row.append(statistics.median(s[1] for s in samples) if samples else float("nan"))
+        print(f"{name:32} {row[0]:12.1f} {row[2]:16.1f} {row[1]:13.1f} {row[3]:17.1f}")
+    full = statistics.mean(s[0] for s in totals["full"])
+    fragment = statistics.mean(s[0] for s in totals["fragment"])
+    print(f"{'mean over all clicks':32} {full:12.1f} {fragment:16.1f}")
+    print(f"CPU per click: {fragment / full:.0%} of a full rerun")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS)
@@ -0,0 +1,191 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from rerun_cpu import APP_FILES, ROOT
+from synthetic import ANNOTATORS, ENTITY_NO, make_dataset, write_histories
+
+sys.path.insert(0, str(ROOT))
+from data_store import DATA_PATH, ensure_store
+from instrumentation import percentile
+
+# Load, render, save and sync timings of annotation.py on synthetic data:
+#
+#   python benchmarks/suite.py [--sizes 615,10000,100000,250000] [--saves 20] [--out results.jsonl]
+#
+# For every dataset size the app runs headlessly through AppTest against a copy
+# in a temporary directory, with synthetic annotator histories and a local fake
+# GitHub. The timings are the app's own phases (instrumentation.py); each line
+# of output is one JSON object per (size, window, phase), so runs can be diffed
+# or loaded with pandas.read_json(..., lines=True).
+SIZES = [615, 10_000, 100_000, 250_000]
+SAVES = 20                  # a multiple of github_sync.PUSH_EVERY, so every save is pushed without waiting
+HISTORY_FRACTION = 0.2      # share of the dataset each synthetic annotator has already annotated
+USERNAME = "mengfei"
+PUSH_TIMEOUT = 60
+
+# "round": the rows of the current round in assignments.toml; "all": no
+# assignments file, so the annotator gets the whole dataset
+WINDOWS = ["round", "all"]
+
+REPORTED_PHASES = [
+    "ingest", "load_data", "annotation_index", "prepare_example", "load_existing_annotation",
+    "save", "compact", "push", "script",
+    "render_sidebar", "render_claim_panel", "render_task1", "render_navigation",
+]
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_timings(path):
+    samples = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                samples.setdefault(record["phase"], []).append(record["ms"])
+    return samples
+
+
+def wait_for_push(workdir, timeout=PUSH_TIMEOUT):
+    # The push worker has caught up once every journal is folded into its CSV
+    # and every compaction has a matching push
+    deadline = time.monotonic() + timeout
+    annotations = workdir / "annotations"
+    while time.monotonic() < deadline:
+        samples = read_timings(workdir / "timings.jsonl")
+        journals = list(annotations.glob("*.journal.*"))
+        if not journals and len(samples.get("push", [])) == len(samples.get("compact", [])) > 0:
+            return True
+        time.sleep(0.2)
+    return False
+
+
+# -----------------------
+# One run
+# -----------------------
+def make_app(workdir, github_url):
+    at = AppTest.from_file(str(workdir / "annotation.py"), default_timeout=600)
+    at.secrets["GITHUB_TOKEN"] = "benchmark"
+    at.secrets["REPO_NAME"] = "benchmark/annotations"
+    at.secrets["GITHUB_API_URL"] = github_url
+    # Every sample straight to timings.jsonl, where this script reads them
+    at.secrets["TIMINGS_FLUSH_EVERY"] = 1
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = USERNAME
+    return at
+
+
+def run_window(workdir, github_url, saves):
+    # A fresh server process as far as the app can tell: no cached data, index or timings
+    st.cache_resource.clear()
+    (workdir / "timings.jsonl").unlink(missing_ok=True)
+
+    at = make_app(workdir, github_url)
+    at.run()
+    assert not at.exception, at.exception
+    for _ in range(saves):
+        # Task 1 only: the cheapest valid annotation, so the save path dominates
+        at.radio(key="entity_reflection").set_value(ENTITY_NO).run()
+        [b for b in at.button if b.label.startswith("Next")][0].click().run()
+        assert not at.exception, at.exception
+    pushed = wait_for_push(workdir)
+    return read_timings(workdir / "timings.jsonl"), pushed
+
+
+def summarize(samples):
+    # The first sample of a phase is the cold one (caches empty); the rest are warm
+    cold = samples[0]
+    warm = sorted(samples[1:])
+    return {
+        "count": len(samples),
+        "cold_ms": round(cold, 3),
+        "p50_ms": round(percentile(warm, 50), 3) if warm else None,
+        "p95_ms": round(percentile(warm, 95), 3) if warm else None,
+        "max_ms": round(warm[-1], 3) if warm else None,
+    }
+
+
+def run_size(size, saves, windows, github_url):
+    workdir = Path(tempfile.mkdtemp(prefix=f"suite_{size}_"))
+    try:
+        for name in APP_FILES:
+            shutil.copy(ROOT / name, workdir / name)
+        os.chdir(workdir)
+
+        make_dataset(size, workdir / DATA_PATH)
+        started = time.perf_counter()
+        ensure_store()
+        ingest_ms = (time.perf_counter() - started) * 1000
+
+        results = []
+        for window in windows:
+            shutil.rmtree(workdir / "annotations", ignore_errors=True)
+            write_histories(range(1, size + 1), workdir / "annotations", ANNOTATORS, fraction=HISTORY_FRACTION)
+            if window == "all":
+                (workdir / "assignments.toml").unlink(missing_ok=True)
+
+            samples, pushed = run_window(workdir, github_url, saves)
+            samples["ingest"] = [ingest_ms]
+            for phase in REPORTED_PHASES:
+                if phase in samples:
+                    results.append({
+                        "size": size, "window": window, "phase": phase,
+                        "pushed": pushed, **summarize(samples[phase]),
+                    })
+        return results
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(str(n) for n in SIZES))
+    parser.add_argument("--windows", default=",".join(WINDOWS))
+    parser.add_argument("--saves", type=int, default=SAVES)
+    parser.add_argument("--out", help="append results here instead of printing them")
+    args = parser.parse_args()
+
+    from fake_github import FakeGitHub
+    server = FakeGitHub().start()
+    run = {
+        "revision": revision(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+    }
+    out = open(args.out, "a", encoding="utf-8") if args.out else sys.stdout
+    try:
+        # Anything the app prints goes to stderr; stdout carries only results
+        with contextlib.redirect_stdout(sys.stderr):
+            for size in (int(n) for n in args.sizes.split(",")):
+                for result in run_size(size, args.saves, args.windows.split(","), server.url):
+                    out.write(json.dumps({**run, **result}) + "\n")
+                    out.flush()
+    finally:
+        server.stop()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
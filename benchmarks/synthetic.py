@@ -0,0 +1,131 @@
+import itertools
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from annotation_store import ANNOTATION_COLUMNS
+from data_store import SOURCE_COLUMNS
+
+# Synthetic claim pairs shaped like the pipeline output the app reads
+# (annotation_file_with_new_categories_for_annotation_only.csv), and annotator
+# histories shaped like annotations/<user>.csv:
+#   python benchmarks/synthetic.py 615 out.csv
+DRUGS = ["dexamethasone", "caffeine", "misoprostol", "tirilazad", "rifampicin", "gemcitabine", "vitamin D"]
+DISEASES = ["postoperative pain", "fatigue", "ischemic stroke", "malaria", "type 2 diabetes", "tuberculosis"]
+FACTORS = [
+    "a. Species", "b. Population", "d. Dosage or exposure duration",
+    "e. Route or mode of administration", "j. Outcome measures",
+]
+ANNOTATORS = ["halil", "mengfei", "shiwei", "joe"]
+FACTOR_CODES = list("abcdefghijkl")
+ENTITY_YES = "Yes, the claims reflect the entities."
+ENTITY_NO = "No, the claims do not reflect the entities."
+CHUNK_SIZE = 10_000
+
+
+def abstract(rng, drug, disease, sentences=25):
+    # Abstracts in the source data often lack a space after the full stop
+    return ".".join(
+        f"Sentence {i} about {drug} in {disease} with {rng.randint(10, 500)} patients"
+        for i in range(sentences)
+    ) + "."
+
+
+def make_articles(rng, n):
+    # PMID -> (drug, disease, abstract); pairs draw from this pool
+    articles = []
+    for i in range(n):
+        drug = rng.choice(DRUGS)
+        disease = rng.choice(DISEASES)
+        articles.append((10_000_000 + i, drug, disease, abstract(rng, drug, disease)))
+    return articles
+
+
+def make_rows(n, seed=0, start_id=1, articles_per_pair=0.5):
+    # The same abstract shows up in many pairs: popular articles are drawn far more often
+    rng = random.Random(seed)
+    articles = make_articles(rng, max(2, int(n * articles_per_pair)))
+    # Cumulative, so each draw is a bisect rather than a pass over the whole pool
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 0.6 for rank in range(len(articles))))
+    for i in range(n):
+        (pmid_1, drug, disease, abstract_1), (pmid_2, _, _, abstract_2) = rng.choices(
+            articles, cum_weights=cum_weights, k=2
+        )
+        yield {
+            "id": start_id + i,
+            "claim_1": f"{drug.capitalize()} reduced {disease}.The effect was significant.",
+            "claim_2": f"{drug.capitalize()} did not reduce {disease}.No benefit was seen.",
+            "claims_abs_1": abstract_1,
+            "claims_abs_2": abstract_2,
+            "pmid_1": pmid_1,
+            "pmid_2": pmid_2,
+            "shared_entities": str({"Chemical": [drug], "Disease": [disease]}),
+            "shared_text": str({"Chemical": [drug.capitalize()], "Disease": [disease]}),
+            "claim_1_dd_relation": f"{drug} | decreases | {disease}",
+            "claim_2_dd_relation": f"{drug} | no effect | {disease}",
+            "reasoning": f"Task(1): The claims disagree on {drug}.\nTask(2): The doses differ.",
+            "prediction": "Contradiction",
+            "contextual_factor": rng.choice(FACTORS),
+            "contextual_factor_explanation": f"The trials of {drug} differ in dose and population.",
+        }
+
+
+def make_dataset(n, path, seed=0, articles_per_pair=0.5, chunksize=CHUNK_SIZE):
+    # Written in chunks so 250k pairs never sit in one frame
+    rows = make_rows(n, seed, articles_per_pair=articles_per_pair)
+    for start in range(0, max(n, 1), chunksize):
+        chunk = pd.DataFrame(itertools.islice(rows, chunksize), columns=SOURCE_COLUMNS)
+        chunk.to_csv(path, index=False, mode="w" if start == 0 else "a", header=start == 0)
+    return path
+
+
+# -----------------------
+# Annotator histories
+# -----------------------
+def make_annotation(rng, example_id, annotator):
+    # One saved row as annotation.py writes it: factor and referent codes, not texts
+    record = {"id": example_id, "annotator": annotator}
+    if rng.random() < 0.15:
+        record["entity_reflection"] = ENTITY_NO
+        return record
+    record["entity_reflection"] = ENTITY_YES
+    record["label"] = "correct" if rng.random() < 0.7 else "incorrect"
+    if record["label"] == "incorrect":
+        return record
+    if rng.random() < 0.4:
+        record["contextual_agreement"] = "Agree"
+        record["contextual_factors"] = "Agree"
+        return record
+    record["contextual_agreement"] = "Disagree"
+    codes = sorted(rng.sample(FACTOR_CODES, rng.randint(1, 3)))
+    record["contextual_factors"] = ";".join(codes)
+    if "k" in codes:
+        record["ambiguous_referent_type"] = rng.choice(["dosage", "population", "species;route", "other"])
+        if "other" in record["ambiguous_referent_type"]:
+            record["ambiguous_referent_other_text"] = "The comparator arm is not described."
+    if "l" in codes:
+        record["contextual_explanation"] = "The trials were run in different decades."
+    return record
+
+
+def make_annotations(ids, annotator, seed=0, fraction=0.2):
+    # A fraction of ids annotated by one annotator, in the order they were worked through
+    rng = random.Random(f"{seed}-{annotator}")
+    ids = sorted(rng.sample(list(ids), int(len(ids) * fraction)))
+    records = [make_annotation(rng, example_id, annotator) for example_id in ids]
+    return pd.DataFrame(records, columns=ANNOTATION_COLUMNS).fillna("")
+
+
+def write_histories(ids, directory, annotators=ANNOTATORS, seed=0, fraction=0.2):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for annotator in annotators:
+        make_annotations(ids, annotator, seed, fraction).to_csv(directory / f"{annotator}.csv", index=False)
+    return directory
+
+
+if __name__ == "__main__":
+    make_dataset(int(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,353 @@
+import argparse
+import hashlib
+import json
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from agreement import annotator_files, item_id
+from annotation_store import AnnotationIndex, AnnotationJournal
+from taxonomy import (
+    decode_factors,
+    encode_factors,
+    decode_ambiguous_referents,
+    encode_ambiguous_referents,
+)
+
+# Consolidates annotations/*.csv into one gold annotations.csv plus a queue of
+# the items the rules could not resolve; decisions saved in the app's
+# adjudicator mode (adjudications/*.csv) override the vote for their items:
+#
+#   python consolidate.py [--dir annotations] [--factors union|threshold]
+#       [--threshold 0.5] [--min-votes 2] [--full]
+#
+# Runs are incremental: a file whose hash is unchanged since the last run is
+# not read again, and of a changed file only the items whose rows changed
+# (by row version) are resolved again. --full ignores the saved state.
+
+# -----------------------
+# Configuration
+# -----------------------
+ANNOTATION_DIR = "annotations"
+ADJUDICATION_DIR = "adjudications"
+GOLD_PATH = "annotations.csv"
+QUEUE_PATH = "adjudication_queue.csv"
+STATE_PATH = "consolidation_state.json"
+CHUNK_ROWS = 10_000
+
+DEFAULT_RULES = {
+    "min_votes": 2,             # annotators an item needs before it is resolved at all
+    "factors": "union",         # "union" or "threshold"
+    "factor_threshold": 0.5,    # share of the Disagree votes a factor needs under "threshold"
+}
+
+ENTITY_NO = "No, the claims do not reflect the entities."
+
+# The fields of a row that take part in resolution; a row's version is their hash
+RATING_COLUMNS = [
+    "label",
+    "entity_reflection",
+    "contextual_agreement",
+    "contextual_factors",
+    "contextual_explanation",
+    "ambiguous_referent_type",
+    "ambiguous_referent_other_text",
+]
+
+GOLD_COLUMNS = ["id", *RATING_COLUMNS, "annotators", "adjudicator"]
+QUEUE_COLUMNS = ["id", "conflicts", "annotators", "entity_reflection_votes", "label_votes", "contextual_votes"]
+
+
+# -----------------------
+# Reading
+# -----------------------
+def source_hash(path):
+    # Content hash of the CSV and any journal not yet folded into it
+    journal = AnnotationJournal(path)
+    digest = hashlib.sha256()
+    for part in (journal.csv_path, journal.compacting_path, journal.journal_path):
+        if part.exists():
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def iter_frames(path, chunksize=CHUNK_ROWS):
+    # The CSV in chunks, then any saves not yet folded into it, in save order
+    try:
+        yield from pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        pass
+    journal = AnnotationJournal(path)
+    pending = AnnotationIndex()
+    journal.replay(pending, journal.compacting_path)
+    journal.replay(pending, journal.journal_path)
+    if pending.records:
+        yield pending.to_frame()
+
+
+def row_version(values):
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()[:16]
+
+
+def read_source(path):
+    # -> {"id|annotator": [version, *RATING_COLUMNS values]}; a later row replaces an earlier one
+    rows = {}
+    for frame in iter_frames(path):
+        frame = frame.reindex(columns=["id", "annotator", *RATING_COLUMNS]).fillna("").astype(str)
+        for raw_id, annotator, *values in frame.to_numpy(dtype=object).tolist():
+            example_id = item_id(raw_id)
+            if example_id is None or not annotator:
+                continue
+            rows[f"{example_id}|{annotator}"] = [row_version(values), *values]
+    return rows
+
+
+# -----------------------
+# Resolution rules
+# -----------------------
+def majority(votes):
+    # votes: {annotator: value}; -> the value more than half of them gave, or None
+    counts = Counter(v for v in votes.values() if v)
+    if not counts:
+        return None
+    value, n = counts.most_common(1)[0]
+    return value if 2 * n > sum(counts.values()) else None
+
+
+def describe(votes):
+    # {annotator: value} -> "halil=a;k | joe=b"; values may hold ";"-separated codes
+    return " | ".join(f"{annotator}={value or '-'}" for annotator, value in sorted(votes.items()))
+
+
+def joined(values):
+    return " | ".join(dict.fromkeys(v for v in values if v))
+
+
+def resolve_factors(votes, rules):
+    # votes: {annotator: [codes]} of the annotators who disagreed with the LLM
+    counts = Counter(code for codes in votes.values() for code in set(codes))
+    if rules["factors"] == "threshold":
+        needed = max(1, rules["factor_threshold"] * len(votes))
+        return sorted(code for code, n in counts.items() if n >= needed)
+    return sorted(counts)
+
+
+def resolve_item(example_id, ratings, rules, decision=None):
+    """
+    ratings: {annotator: {column: value}} for one item; decision: (adjudicator,
+    {column: value}) when the item was adjudicated.
+    -> ("gold", row), ("queue", row) or ("pending", None) while the item has
+    fewer than min_votes annotators.
+    """
+    gold = {col: "" for col in GOLD_COLUMNS}
+    gold["id"] = example_id
+    gold["annotators"] = ";".join(sorted(ratings))
+    if decision is not None:
+        adjudicator, values = decision
+        return "gold", {**gold, **values, "adjudicator": adjudicator}
+    if len(ratings) < rules["min_votes"]:
+        return "pending", None
+    conflicts = []
+
+    entity_votes = {a: r["entity_reflection"] for a, r in ratings.items()}
+    entity = majority(entity_votes)
+    if entity is None and any(entity_votes.values()):
+        conflicts.append("entity_reflection")
+    gold["entity_reflection"] = entity or ""
+
+    # A label is only asked for when the claims reflect the entities (files
+    # from before entity_reflection existed have it blank)
+    label_votes = {a: r["label"] for a, r in ratings.items() if r["entity_reflection"] != ENTITY_NO}
+    contextual_votes = {}
+    if entity != ENTITY_NO:
+        label = majority(label_votes)
+        if label is None and any(label_votes.values()):
+            conflicts.append("label")
+        gold["label"] = label or ""
+
+        if label == "correct":
+            voters = {a: r for a, r in ratings.items() if label_votes.get(a) == "correct"}
+            contextual_votes = {a: encode_factors(r["contextual_factors"]) or r["contextual_agreement"] for a, r in voters.items()}
+            agreement_votes = {a: r["contextual_agreement"] for a, r in voters.items()}
+            agreement = majority(agreement_votes)
+            if agreement is None and any(agreement_votes.values()):
+                conflicts.append("contextual_agreement")
+            gold["contextual_agreement"] = agreement or ""
+
+            if agreement == "Agree":
+                gold["contextual_factors"] = "Agree"
+            elif agreement == "Disagree":
+                disagreed = {a: r for a, r in voters.items() if r["contextual_agreement"] == "Disagree"}
+                codes = resolve_factors({a: decode_factors(r["contextual_factors"]) for a, r in disagreed.items()}, rules)
+                if not codes:
+                    conflicts.append("contextual_factors")
+                gold["contextual_factors"] = encode_factors(codes)
+                if "k" in codes:
+                    referents = sorted({t for r in disagreed.values() for t in decode_ambiguous_referents(r["ambiguous_referent_type"])})
+                    gold["ambiguous_referent_type"] = encode_ambiguous_referents(referents)
+                    gold["ambiguous_referent_other_text"] = joined(r["ambiguous_referent_other_text"] for r in disagreed.values())
+                if "l" in codes:
+                    gold["contextual_explanation"] = joined(r["contextual_explanation"] for r in disagreed.values())
+
+    if not conflicts:
+        return "gold", gold
+    return "queue", {
+        "id": example_id,
+        "conflicts": ";".join(conflicts),
+        "annotators": gold["annotators"],
+        "entity_reflection_votes": describe(entity_votes),
+        "label_votes": describe(label_votes),
+        "contextual_votes": describe(contextual_votes),
+    }
+
+
+# -----------------------
+# Incremental run
+# -----------------------
+def load_state(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_csv(rows, columns, path):
+    tmp_path = Path(path).with_suffix(".csv.tmp")
+    pd.DataFrame(rows, columns=columns).to_csv(tmp_path, index=False)
+    tmp_path.replace(path)
+
+
+def consolidate(annotation_dir=ANNOTATION_DIR, gold_path=GOLD_PATH, queue_path=QUEUE_PATH,
+                state_path=STATE_PATH, rules=None, full=False, adjudication_dir=ADJUDICATION_DIR):
+    """
+    Brings the gold file and the queue up to date with the annotator files.
+    -> (stats, state); conflict_index(state) lists what is left to adjudicate.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+    state = None if full else load_state(state_path)
+    if state is None or state.get("rules") != rules:
+        # New rules change every outcome
+        state = {"rules": rules, "sources": {}, "items": {}}
+
+    # Which items have a changed, new or removed row since the last run
+    dirty = set()
+    sources = {}
+    reread = 0
+    paths = [(path, False) for path in annotator_files(annotation_dir)]
+    paths += [(path, True) for path in annotator_files(adjudication_dir)]
+    for path, adjudication in paths:
+        source = path.as_posix()
+        digest = source_hash(path)
+        cached = state["sources"].pop(source, None)
+        if cached is not None and cached["hash"] == digest:
+            sources[source] = cached
+            continue
+        reread += 1
+        old_rows = cached["rows"] if cached else {}
+        rows = read_source(path)
+        dirty.update(key for key, row in rows.items() if old_rows.get(key, [None])[0] != row[0])
+        dirty.update(old_rows.keys() - rows.keys())
+        sources[source] = {"hash": digest, "rows": rows, "adjudication": adjudication}
+    for removed in state["sources"].values():
+        dirty.update(removed["rows"])
+    state["sources"] = sources
+    dirty = {key.split("|", 1)[0] for key in dirty}
+
+    # Every annotator's current row for the dirty items, and any decision on
+    # them; the file read last wins
+    ratings = {example_id: {} for example_id in dirty}
+    decisions = {}
+    for source in sorted(sources):
+        adjudication = sources[source].get("adjudication", False)
+        for key, row in sources[source]["rows"].items():
+            example_id, annotator = key.split("|", 1)
+            if example_id not in ratings:
+                continue
+            values = dict(zip(RATING_COLUMNS, row[1:]))
+            if adjudication:
+                decisions[example_id] = (annotator, values)
+            else:
+                ratings[example_id][annotator] = values
+
+    items = state["items"]
+    for example_id, item_ratings in ratings.items():
+        if item_ratings or example_id in decisions:
+            items[example_id] = resolve_item(int(example_id), item_ratings, rules, decisions.get(example_id))
+        else:
+            items.pop(example_id, None)
+
+    outcomes = Counter(status for status, _ in items.values())
+    if dirty or not Path(gold_path).exists() or not Path(queue_path).exists():
+        ordered = sorted(items.items(), key=lambda item: int(item[0]))
+        write_csv([row for _, (status, row) in ordered if status == "gold"], GOLD_COLUMNS, gold_path)
+        write_csv([row for _, (status, row) in ordered if status == "queue"], QUEUE_COLUMNS, queue_path)
+
+    if dirty or reread or not Path(state_path).exists():
+        tmp_path = Path(state_path).with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # dumps() takes the C encoder; dump() to a file does not
+            f.write(json.dumps(state))
+        tmp_path.replace(state_path)
+
+    stats = {
+        "files": len(sources),
+        "files_reread": reread,
+        "items_resolved": len(dirty),
+        "gold": outcomes["gold"],
+        "queue": outcomes["queue"],
+        "pending": outcomes["pending"],
+    }
+    return stats, state
+
+
+def conflict_index(state):
+    """
+    Every queued item of a consolidation state with each annotator's row, so
+    an adjudicator can page through conflicts without the files being read:
+    {id: {"conflicts": [field, ...], "ratings": {annotator: {column: value}}}}
+    """
+    index = {
+        int(example_id): {"conflicts": row["conflicts"].split(";"), "ratings": {}}
+        for example_id, (status, row) in state["items"].items()
+        if status == "queue"
+    }
+    for source in sorted(state["sources"]):
+        if state["sources"][source].get("adjudication", False):
+            continue
+        for key, row in state["sources"][source]["rows"].items():
+            example_id, annotator = key.split("|", 1)
+            item = index.get(int(example_id))
+            if item is not None:
+                item["ratings"][annotator] = dict(zip(RATING_COLUMNS, row[1:]))
+    return dict(sorted(index.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=ANNOTATION_DIR, help="directory of annotator CSVs")
+    parser.add_argument("--adjudications", default=ADJUDICATION_DIR, help="directory of adjudicator decisions")
+    parser.add_argument("--gold", default=GOLD_PATH)
+    parser.add_argument("--queue", default=QUEUE_PATH)
+    parser.add_argument("--state", default=STATE_PATH)
+    parser.add_argument("--factors", choices=["union", "threshold"], default=DEFAULT_RULES["factors"])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_RULES["factor_threshold"],
+                        help="share of the Disagree votes a factor needs with --factors threshold")
+    parser.add_argument("--min-votes", type=int, default=DEFAULT_RULES["min_votes"])
+    parser.add_argument("--full", action="store_true", help="ignore the saved state and resolve every item")
+    args = parser.parse_args()
+
+    rules = {"min_votes": args.min_votes, "factors": args.factors, "factor_threshold": args.threshold}
+    stats, _ = consolidate(args.dir, args.gold, args.queue, args.state, rules, args.full, args.adjudications)
+    print(
+        f"{stats['files']} files ({stats['files_reread']} re-read), {stats['items_resolved']} items resolved; "
+        f"{stats['gold']} gold -> {args.gold}, {stats['queue']} to adjudicate -> {args.queue}, "
+        f"{stats['pending']} awaiting more annotators"
+    )
@@ -0,0 +1,701 @@
+import ast
+import html
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# -----------------------
+# Configuration
+# -----------------------
+DATA_PATH = "annotation_file_with_new_categories_for_annotation_only.csv"
+DATA_STORE_PATH = "annotation_data.parquet"
+# Full abstracts are kept once per PMID next to the pairs, in <store>.abstracts.parquet
+
+# Pipeline output columns the app needs; anything else is dropped at ingest
+SOURCE_COLUMNS = [
+    "id",
+    "claim_1",
+    "claim_2",
+    "claims_abs_1",
+    "claims_abs_2",
+    "pmid_1",
+    "pmid_2",
+    "shared_entities",
+    "shared_text",
+    "claim_1_dd_relation",
+    "claim_2_dd_relation",
+    "reasoning",
+    "prediction",
+    "contextual_factor",
+    "contextual_factor_explanation",
+]
+
+# Abstracts are keyed by these, as integer strings ("123")
+PMID_COLUMNS = ["pmid_1", "pmid_2"]
+
+# Columns holding PubTator-style entity dicts, e.g. {'Chemical': [...], 'Disease': [...]}
+ENTITY_COLUMNS = ["shared_entities", "shared_text"]
+ENTITY_TYPES = ["Chemical", "Disease"]
+
+# Text whose sentences lost the space after the full stop ("pain.It works")
+SPACED_TEXT_COLUMNS = ["claim_1", "claim_2", "claims_abs_1", "claims_abs_2"]
+# Text shown inside unsafe_allow_html blocks; stored HTML-escaped as <column>_html
+HTML_COLUMNS = ["reasoning", "contextual_factor_explanation"]
+
+# Bump when ingest output changes, so existing stores are rebuilt
+STORE_VERSION = "6"
+
+# Store metadata listing every source ingested into the store, in order
+SOURCES_KEY = b"sources"
+# Stands for the sources of a store written before they were recorded
+UNKNOWN_SOURCE = "(unrecorded)"
+
+# Rows per Parquet row group: the unit an assignment window read decodes
+STORE_ROW_GROUP_SIZE = 2048
+
+# Source rows read (and held in memory) at a time while ingesting
+INGEST_CHUNK_SIZE = 10_000
+
+# Abstracts are read one row group at a time when shown, so keep the groups small
+ABSTRACT_ROW_GROUP_SIZE = 256
+ABSTRACT_CACHE_SIZE = 512
+
+# How long an ingest waits for another process's ingest of the same store
+INGEST_LOCK_SECONDS = 600
+
+# Prepared (display-ready) examples kept in memory per server process
+PREPARED_CACHE_SIZE = 256
+
+
+def entity_column(column, entity_type):
+    # shared_entities + Chemical -> shared_entities_chemical
+    return f"{column}_{entity_type.lower()}"
+
+
+# -----------------------
+# Parsing
+# -----------------------
+def parse_entities(value):
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return {}
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def split_entity_columns(data):
+    # Replace each entity dict column with one list<string> column per entity type
+    data = data.copy()
+    for column in ENTITY_COLUMNS:
+        if column not in data.columns:
+            continue
+        parsed = data[column].apply(parse_entities)
+        for entity_type in ENTITY_TYPES:
+            data[entity_column(column, entity_type)] = parsed.apply(
+                lambda entities: [str(e) for e in entities.get(entity_type, []) or []]
+            )
+        data = data.drop(columns=column)
+    return data
+
+
+def entity_list_columns(data):
+    return [
+        entity_column(c, t) for c in ENTITY_COLUMNS for t in ENTITY_TYPES
+        if entity_column(c, t) in data.columns
+    ]
+
+
+# -----------------------
+# Normalization
+# -----------------------
+def text_column(data, column):
+    # Missing cells (and missing columns) become ""
+    if column not in data.columns:
+        return pd.Series("", index=data.index)
+    return data[column].fillna("").astype(str)
+
+
+def integer_text(value):
+    # A JSONL chunk with one null PMID reads the column as float: 123.0 -> "123"
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        return str(int(value)) if value.is_integer() else str(value)
+    return "" if value is None else str(value)
+
+
+def normalize_columns(data):
+    # Display cleanup, done once per ingest instead of on every rerun
+    data = data.copy()
+    for column in SPACED_TEXT_COLUMNS:
+        data[column] = text_column(data, column).str.replace(r"\.(?=[A-Z])", ". ", regex=True)
+
+    data["reasoning"] = (
+        text_column(data, "reasoning").str.strip()
+        .str.replace("Task(1):", "", regex=False)
+        .str.replace("Task(2):", "", regex=False)
+        .str.strip()
+    )
+    data["contextual_factor_explanation"] = text_column(data, "contextual_factor_explanation")
+
+    for column in HTML_COLUMNS:
+        data[f"{column}_html"] = data[column].map(html.escape)
+    return data
+
+
+def to_arrow(data):
+    # Fixed column types, so every chunk of an ingest writes the same schema
+    # (and empty entity lists aren't inferred as list<null>)
+    list_columns = entity_list_columns(data)
+    fields = []
+    for column in data.columns:
+        if column == "id":
+            fields.append(pa.field(column, pa.int64()))
+        elif column in list_columns:
+            fields.append(pa.field(column, pa.list_(pa.string())))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    schema = pa.schema(fields, metadata={b"store_version": STORE_VERSION.encode()})
+    return pa.Table.from_pandas(data, schema=schema, preserve_index=False)
+
+
+# -----------------------
+# Ingest
+# -----------------------
+def read_source(path, chunksize=INGEST_CHUNK_SIZE):
+    # Pipeline output (CSV, or JSONL for .jsonl/.ndjson files), one chunk at a time
+    path = Path(path)
+    if path.suffix in (".jsonl", ".ndjson"):
+        return pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    # Everything as text: pmids stay "123" whatever the chunk, ids are parsed below
+    return pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False)
+
+
+def prepare_chunk(chunk, source=""):
+    # Validate and convert one chunk of pipeline output into store rows.
+    # Returns (rows, number of rows dropped for a missing or non-integer id)
+    missing = [column for column in SOURCE_COLUMNS if column not in chunk.columns]
+    if missing:
+        raise ValueError(f"{source}: missing column(s) {', '.join(missing)}")
+    chunk = chunk[SOURCE_COLUMNS].copy()
+
+    ids = pd.to_numeric(chunk["id"], errors="coerce")
+    valid = ids.notna() & (ids % 1 == 0)
+    chunk = chunk[valid]
+    chunk["id"] = ids[valid].astype("int64")
+
+    for column in SOURCE_COLUMNS:
+        if column in PMID_COLUMNS:
+            chunk[column] = chunk[column].map(integer_text)
+        elif column != "id" and column not in ENTITY_COLUMNS:
+            chunk[column] = text_column(chunk, column)
+    return normalize_columns(split_entity_columns(chunk)), int((~valid).sum())
+
+
+def split_abstracts(chunk):
+    # -> (pairs, pmid/abstract rows). Abstracts with a PMID move to the PMID-keyed
+    # table and are blanked in the pair; pairs without a PMID keep theirs inline
+    chunk = chunk.copy()
+    parts = []
+    for n in (1, 2):
+        pmid, abstract = chunk[f"pmid_{n}"], chunk[f"claims_abs_{n}"]
+        keyed = pmid != ""
+        parts.append(pd.DataFrame({"pmid": pmid[keyed], "abstract": abstract[keyed]}))
+        chunk.loc[keyed, f"claims_abs_{n}"] = ""
+    abstracts = pd.concat(parts, ignore_index=True)
+    abstracts = abstracts[abstracts["abstract"] != ""].drop_duplicates("pmid")
+    return chunk, abstracts
+
+
+def lock_path(store_path=DATA_STORE_PATH):
+    # annotation_data.parquet -> annotation_data.parquet.lock
+    store_path = Path(store_path)
+    return store_path.with_name(f"{store_path.name}.lock")
+
+
+# Stores whose ingest lock this thread holds, so ensure_store can call append_to_store
+held_locks = threading.local()
+
+
+@contextmanager
+def ingest_lock(store_path, timeout=INGEST_LOCK_SECONDS):
+    """
+    One ingest of a store at a time, across server processes and the CLI: an
+    exclusive transaction on <store>.lock, which SQLite drops if the holder
+    dies. Without it two writers share the staging files, and two appends
+    both start from the same store, so the later one drops the other's rows.
+    """
+    key = Path(store_path).resolve()
+    held = getattr(held_locks, "paths", None)
+    if held is None:
+        held = held_locks.paths = set()
+    if key in held:
+        yield
+        return
+    db = sqlite3.connect(lock_path(store_path), timeout=timeout, isolation_level=None)
+    try:
+        db.execute("BEGIN EXCLUSIVE")
+        held.add(key)
+        yield
+    finally:
+        held.discard(key)
+        db.close()
+
+
+def abstracts_path(store_path=DATA_STORE_PATH):
+    # annotation_data.parquet -> annotation_data.abstracts.parquet
+    store_path = Path(store_path)
+    return store_path.with_name(f"{store_path.stem}.abstracts{store_path.suffix}")
+
+
+def column_values(path, column):
+    # Only the one column is read
+    return set(pq.read_table(path, columns=[column])[column].to_pylist())
+
+
+def store_sources(store_path):
+    # Sources ingested into the store; [UNKNOWN_SOURCE] for a store that doesn't record them
+    metadata = pq.read_schema(store_path).metadata or {}
+    if SOURCES_KEY not in metadata:
+        return [UNKNOWN_SOURCE]
+    return json.loads(metadata[SOURCES_KEY])
+
+
+def source_name(source_path):
+    return Path(source_path).as_posix()
+
+
+def store_is_current(store_path):
+    for path in (Path(store_path), abstracts_path(store_path)):
+        if not path.exists():
+            return False
+        metadata = pq.read_schema(path).metadata or {}
+        if metadata.get(b"store_version") != STORE_VERSION.encode():
+            return False
+    return True
+
+
+class ParquetAppend:
+    """
+    Appends tables to a Parquet file through a side file, so nothing is
+    rewritten unless rows were added, and the result is swapped in whole:
+    a running app never reads a half-written file.
+    """
+
+    def __init__(self, path, keep_existing, row_group_size, metadata=None):
+        self.path = Path(path)
+        self.metadata = metadata or {}
+        self.new_path = self.path.with_suffix(self.path.suffix + ".new")
+        self.tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.keep_existing = keep_existing
+        self.row_group_size = row_group_size
+        self.writer = None
+
+    def write(self, table):
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.new_path, self.with_metadata(table.schema))
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+
+    def with_metadata(self, schema):
+        return schema.with_metadata({**(schema.metadata or {}), **self.metadata})
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.new_path.unlink(missing_ok=True)
+
+    def commit(self, empty):
+        if self.writer is None:
+            if not self.keep_existing:
+                # Nothing in the source: still leave a (current, empty) file behind
+                pq.write_table(empty.replace_schema_metadata(self.with_metadata(empty.schema).metadata), self.tmp_path)
+                self.tmp_path.replace(self.path)
+            return
+        self.writer.close()
+
+        if self.keep_existing:
+            # Existing row groups first, then the new ones, one row group in memory at a time
+            existing, added = pq.ParquetFile(self.path), pq.ParquetFile(self.new_path)
+            with pq.ParquetWriter(self.tmp_path, self.with_metadata(existing.schema_arrow)) as combined:
+                for parquet in (existing, added):
+                    for i in range(parquet.num_row_groups):
+                        combined.write_table(parquet.read_row_group(i))
+            self.new_path.unlink()
+        else:
+            self.new_path.replace(self.tmp_path)
+        self.tmp_path.replace(self.path)
+
+
+def append_to_store(source_path, store_path=DATA_STORE_PATH, chunksize=INGEST_CHUNK_SIZE, rebuild=False):
+    """
+    Stream pipeline output into the store in chunks of chunksize rows, adding
+    only ids the store doesn't have yet (the first occurrence wins within the
+    source), and only abstracts whose PMID it doesn't have yet.
+    With rebuild=True the store is replaced by the source instead. The store's
+    metadata records every source ingested into it (see store_sources).
+    Returns a dict of counts: added, skipped (known ids), invalid (bad ids), abstracts.
+    Ingests of one store are serialized, see ingest_lock.
+    """
+    store_path = Path(store_path)
+    with ingest_lock(store_path):
+        # Checked under the lock: another process may have just rebuilt or appended to the store
+        if not rebuild and store_path.exists() and not store_is_current(store_path):
+            raise ValueError(f"{store_path} was written by an older ingest; rebuild it before appending")
+        keep_existing = not rebuild and store_path.exists()
+
+        seen_ids = column_values(store_path, "id") if keep_existing else set()
+        seen_pmids = column_values(abstracts_path(store_path), "pmid") if keep_existing else set()
+        sources = store_sources(store_path) if keep_existing else []
+        sources = [*(s for s in sources if s != source_name(source_path)), source_name(source_path)]
+        pairs = ParquetAppend(store_path, keep_existing, STORE_ROW_GROUP_SIZE, {SOURCES_KEY: json.dumps(sources)})
+        abstracts = ParquetAppend(abstracts_path(store_path), keep_existing, ABSTRACT_ROW_GROUP_SIZE)
+        counts = {"added": 0, "skipped": 0, "invalid": 0, "abstracts": 0}
+
+        try:
+            for raw in read_source(source_path, chunksize):
+                chunk, invalid = prepare_chunk(raw, source_path)
+                counts["invalid"] += invalid
+                fresh = ~chunk["id"].isin(seen_ids) & ~chunk["id"].duplicated()
+                counts["skipped"] += int((~fresh).sum())
+                if not fresh.any():
+                    continue
+                chunk, chunk_abstracts = split_abstracts(chunk[fresh])
+                chunk_abstracts = chunk_abstracts[~chunk_abstracts["pmid"].isin(seen_pmids)]
+
+                seen_ids.update(chunk["id"].tolist())
+                seen_pmids.update(chunk_abstracts["pmid"].tolist())
+                pairs.write(to_arrow(chunk))
+                if not chunk_abstracts.empty:
+                    abstracts.write(to_arrow(chunk_abstracts))
+                counts["added"] += len(chunk)
+                counts["abstracts"] += len(chunk_abstracts)
+        except Exception:
+            # e.g. a later chunk failed validation: the store is left untouched
+            pairs.abort()
+            abstracts.abort()
+            raise
+
+        empty_pairs, empty_abstracts = split_abstracts(prepare_chunk(pd.DataFrame(columns=SOURCE_COLUMNS))[0])
+        # Abstracts first, so pairs never reference a PMID the abstracts table lacks
+        abstracts.commit(to_arrow(empty_abstracts))
+        pairs.commit(to_arrow(empty_pairs))
+        return counts
+
+
+def ingest_dataset(csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    # Full rebuild of the store from the CSV the app is configured with
+    return append_to_store(csv_path, store_path, rebuild=True)["added"]
+
+
+def store_is_stale(csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    csv_path, store_path = Path(csv_path), Path(store_path)
+    if not store_is_current(store_path):
+        return True
+    if not csv_path.exists():
+        return False
+    return csv_path.stat().st_mtime > store_path.stat().st_mtime
+
+
+def other_sources(csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    # Sources besides csv_path the store holds rows from (python data_store.py --append)
+    if not Path(store_path).exists():
+        return []
+    return [s for s in store_sources(store_path) if s != source_name(csv_path)]
+
+
+def ensure_store(csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    """
+    Re-ingest when the source CSV is newer than the columnar store. A store
+    built from that CSV alone is rebuilt; one that also holds appended rows
+    only takes the CSV's new ids, so a pull or a touch of the CSV never drops
+    them. Rebuilding such a store takes an explicit --rebuild.
+    """
+    if not store_is_stale(csv_path, store_path):
+        return store_path
+    with ingest_lock(store_path):
+        # Another process may have brought the store up to date while we waited
+        if not store_is_stale(csv_path, store_path):
+            return store_path
+        others = other_sources(csv_path, store_path)
+        if store_is_current(store_path) and others:
+            append_to_store(csv_path, store_path)
+            # Nothing may have been added: mark the store as up to date with the CSV all the same
+            os.utime(store_path)
+        elif not others or others == [UNKNOWN_SOURCE]:
+            # An outdated store from before sources were recorded is rebuilt, as it always was
+            ingest_dataset(csv_path, store_path)
+        else:
+            raise ValueError(
+                f"{store_path} was written by an older ingest and holds rows appended from "
+                f"{', '.join(others)}; rebuild it with python data_store.py --rebuild "
+                f"and append those sources again"
+            )
+    return store_path
+
+
+def load_dataset(csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    return pd.read_parquet(ensure_store(csv_path, store_path))
+
+
+# -----------------------
+# Assignment windows
+# -----------------------
+def load_rows(start=0, end=None, csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    """
+    Rows start:end of the dataset, indexed by their position. Only the row
+    groups overlapping the range are read and decoded.
+    """
+    parquet = pq.ParquetFile(ensure_store(csv_path, store_path))
+    metadata = parquet.metadata
+    end = metadata.num_rows if end is None else min(end, metadata.num_rows)
+    start = max(0, min(start, end))
+
+    groups, first_row, offset = [], None, 0
+    for i in range(metadata.num_row_groups):
+        n = metadata.row_group(i).num_rows
+        if offset < end and offset + n > start:
+            groups.append(i)
+            if first_row is None:
+                first_row = offset
+        offset += n
+
+    if not groups:
+        data = parquet.schema_arrow.empty_table().to_pandas()
+    else:
+        table = parquet.read_row_groups(groups)
+        data = table.slice(start - first_row, end - start).to_pandas()
+    data.index = pd.RangeIndex(start, start + len(data))
+    return data
+
+
+def load_ids(ids, csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    # Rows with the given ids, in the given order; row groups whose id range
+    # can't contain any of them are skipped using the Parquet statistics
+    ids = list(ids)
+    data = pq.read_table(
+        ensure_store(csv_path, store_path), filters=[("id", "in", ids)]
+    ).to_pandas()
+    order = {example_id: i for i, example_id in enumerate(ids)}
+    return data.sort_values("id", key=lambda column: column.map(order)).reset_index(drop=True)
+
+
+def load_window(window, csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    # window: ("range", start, end) or ("ids", ids), see assignments.py
+    kind, *args = window
+    if kind == "range":
+        return load_rows(*args, csv_path=csv_path, store_path=store_path)
+    if kind == "ids":
+        return load_ids(*args, csv_path=csv_path, store_path=store_path)
+    raise ValueError(f"Unknown assignment window {window!r}")
+
+
+# -----------------------
+# Example index
+# -----------------------
+def build_example_index(data):
+    # id -> row position, so navigation is a dict lookup instead of a column scan
+    return {example_id: position for position, example_id in enumerate(data["id"].tolist())}
+
+
+# -----------------------
+# Display-ready examples
+# -----------------------
+def text_value(row, column, default=""):
+    value = row.get(column, default)
+    if value is None or value == "" or (not isinstance(value, str) and pd.isna(value)):
+        return default
+    return str(value)
+
+
+def entity_string(row, column, entity_type):
+    return ", ".join(row[entity_column(column, entity_type)]) or "N/A"
+
+
+def prepare_example(row):
+    # Everything the claim panel and both tasks display; text was normalized at ingest
+    return {
+        "id": row["id"],
+        "drug_pub": entity_string(row, "shared_entities", "Chemical"),
+        "disease_pub": entity_string(row, "shared_entities", "Disease"),
+        "drug_text": entity_string(row, "shared_text", "Chemical"),
+        "disease_text": entity_string(row, "shared_text", "Disease"),
+        "claim_1_dd_relation": text_value(row, "claim_1_dd_relation", "N/A"),
+        "claim_2_dd_relation": text_value(row, "claim_2_dd_relation", "N/A"),
+        "claim_1": text_value(row, "claim_1"),
+        "claim_2": text_value(row, "claim_2"),
+        "pmid_1": text_value(row, "pmid_1"),
+        "pmid_2": text_value(row, "pmid_2"),
+        "claims_abs_1": text_value(row, "claims_abs_1"),
+        "claims_abs_2": text_value(row, "claims_abs_2"),
+        "reasoning": text_value(row, "reasoning"),
+        "reasoning_html": text_value(row, "reasoning_html"),
+        "prediction": text_value(row, "prediction", "N/A"),
+        "contextual_factor": text_value(row, "contextual_factor", "N/A"),
+        "contextual_factor_explanation": text_value(row, "contextual_factor_explanation"),
+        "contextual_factor_explanation_html": text_value(row, "contextual_factor_explanation_html"),
+    }
+
+
+class PreparedExamples:
+    """
+    LRU of prepare_example() results by row position, filled ahead of time:
+    prefetch() prepares the neighbours on a background thread while the
+    annotator reads, so Previous/Next find their example already prepared.
+    """
+
+    def __init__(self, data, size=PREPARED_CACHE_SIZE):
+        self.data = data
+        self.size = size
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.futures = {}
+        self.closed = False
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+    def store(self, position, prepared):
+        with self.lock:
+            self.cache[position] = prepared
+            self.cache.move_to_end(position)
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+            self.futures.pop(position, None)
+        return prepared
+
+    def prepare(self, position):
+        return self.store(position, prepare_example(self.data.iloc[position]))
+
+    def get(self, position):
+        # Returns (prepared example, whether it was ready before the call)
+        with self.lock:
+            if position in self.cache:
+                self.cache.move_to_end(position)
+                return self.cache[position], True
+            future = self.futures.get(position)
+        if future is not None:
+            try:
+                return future.result(), True
+            except CancelledError:
+                pass
+        return self.prepare(position), False
+
+    def prefetch(self, positions):
+        with self.lock:
+            if self.closed:
+                return
+            for position in positions:
+                if not 0 <= position < len(self.data):
+                    continue
+                if position in self.cache or position in self.futures:
+                    continue
+                self.futures[position] = self.executor.submit(self.prepare, position)
+
+    def close(self):
+        # Stops the prefetch thread; get() still prepares examples, just not ahead
+        with self.lock:
+            self.closed = True
+            self.futures.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+
+class AbstractStore:
+    """
+    Full abstracts by PMID, read from the abstracts table only when one is shown.
+    Keeps a pmid -> (row group, row) index and an LRU of resolved abstracts;
+    both are rebuilt when a new ingest replaces the file.
+    """
+
+    def __init__(self, path, size=ABSTRACT_CACHE_SIZE):
+        self.path = Path(path)
+        self.size = size
+        self.lock = threading.Lock()
+        self.signature = None
+        self.positions = {}
+        self.cache = OrderedDict()
+
+    def refresh(self):
+        # Call with self.lock held
+        stat = self.path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return
+        parquet = pq.ParquetFile(self.path)
+        positions = {}
+        for group in range(parquet.num_row_groups):
+            pmids = parquet.read_row_group(group, columns=["pmid"])["pmid"].to_pylist()
+            for row, pmid in enumerate(pmids):
+                positions.setdefault(pmid, (group, row))
+        self.positions = positions
+        self.cache.clear()
+        self.signature = signature
+
+    def get(self, pmid):
+        pmid = str(pmid)
+        with self.lock:
+            try:
+                self.refresh()
+            except FileNotFoundError:
+                return ""
+            if pmid in self.cache:
+                self.cache.move_to_end(pmid)
+                return self.cache[pmid]
+            if pmid not in self.positions:
+                return ""
+            group, row = self.positions[pmid]
+            column = pq.ParquetFile(self.path).read_row_group(group, columns=["abstract"])["abstract"]
+            abstract = column[row].as_py()
+            self.cache[pmid] = abstract
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+            return abstract
+
+    def resolve(self, pmid, inline=""):
+        # Pairs without a PMID keep their abstract inline
+        return inline or self.get(pmid)
+
+
+if __name__ == "__main__":
+    #   python data_store.py [csv_path] [store_path]
+    #       bring the store up to date with the CSV (what the app does when DATA_PATH changes)
+    #   python data_store.py --rebuild [csv_path] [store_path]
+    #       replace the store with the CSV alone, dropping rows appended from other sources
+    #   python data_store.py --append source.jsonl [source.csv ...] [--store store_path]
+    #       stream pipeline output into the store, skipping ids it already has
+    args = sys.argv[1:]
+    if args and args[0] == "--append":
+        args = args[1:]
+        store_path = DATA_STORE_PATH
+        if "--store" in args:
+            i = args.index("--store")
+            store_path = args[i + 1]
+            args = args[:i] + args[i + 2:]
+        for source_path in args:
+            counts = append_to_store(source_path, store_path)
+            print(
+                f"{source_path}: added {counts['added']} ({counts['abstracts']} new abstracts), "
+                f"skipped {counts['skipped']} known id(s), dropped {counts['invalid']} row(s) without a valid id"
+            )
+    elif args and args[0] == "--rebuild":
+        csv_path = args[1] if len(args) > 1 else DATA_PATH
+        store_path = args[2] if len(args) > 2 else DATA_STORE_PATH
+        n = ingest_dataset(csv_path, store_path)
+        print(f"Ingested {n} rows from {csv_path} into {store_path}")
+    else:
+        csv_path = args[0] if len(args) > 0 else DATA_PATH
+        store_path = args[1] if len(args) > 1 else DATA_STORE_PATH
+        ensure_store(csv_path, store_path)
+        print(f"{store_path}: {pq.read_metadata(store_path).num_rows} rows from {', '.join(store_sources(store_path))}")
@@ -0,0 +1,385 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse, unquote
+
+from github_sync import blob_sha
+
+# Local stand-in for the parts of the GitHub REST API the annotation tool uses
+# (repository lookup, the contents API and the Git Data API), so pushes can be
+# exercised offline:
+#
+#   server = FakeGitHub().start()
+#   GitHubFiles("token", "owner/repo", base_url=server.url)
+#
+# or run `python fake_github.py [port]` and set GITHUB_API_URL in .streamlit/secrets.toml.
+#
+# branch is the one branch the fake keeps; contents reads and writes that name no
+# ref/branch go to default_branch and find nothing unless the two are the same.
+#
+# latency (seconds added to every request) and rate_limit (requests allowed per
+# rate_window seconds, answered like GitHub's rate limiter once exceeded) make it
+# behave more like the real API under load.
+
+
+def object_sha(*parts):
+    return hashlib.sha1("\0".join(parts).encode()).hexdigest()
+
+
+class FakeGitHub:
+
+    def __init__(self, host="127.0.0.1", port=0, branch="main", latency=0.0, rate_limit=None, rate_window=60.0,
+                 default_branch=None):
+        self.host = host
+        self.port = port
+        self.branch = branch
+        self.default_branch = default_branch or branch
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.files = {}         # (repo, path) -> bytes at the head of the branch
+        self.heads = {}         # repo -> head commit sha
+        self.git_commits = {}   # sha -> {"tree", "parents", "message"}
+        self.trees = {}         # sha -> {path: bytes}
+        self.blobs = {}         # sha -> bytes
+        self.commits = []       # (repo, message, [paths]) for every commit that reached the branch
+        self.calls = []         # (method, path) of every request served
+        self.rate_limited = 0   # requests answered with a rate limit error
+        self.window_started = time.time()
+        self.window_calls = 0
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.server.server_address[1]}"
+
+    def start(self):
+        fake = self
+
+        class Handler(FakeGitHubHandler):
+            github = fake
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def read(self, repo, path):
+        with self.lock:
+            return self.files.get((repo, path))
+
+    def count(self, method, pattern=""):
+        with self.lock:
+            return sum(1 for m, p in self.calls if m == method and pattern in p)
+
+    def take_request(self):
+        # Fixed-window limiter: (allowed, seconds until the window resets, remaining)
+        with self.lock:
+            now = time.time()
+            if now >= self.window_started + self.rate_window:
+                self.window_started = now
+                self.window_calls = 0
+            reset_in = self.window_started + self.rate_window - now
+            if self.rate_limit is None:
+                return True, reset_in, None
+            if self.window_calls >= self.rate_limit:
+                self.rate_limited += 1
+                return False, reset_in, 0
+            self.window_calls += 1
+            return True, reset_in, self.rate_limit - self.window_calls
+
+    # -----------------------
+    # Object model (call with self.lock held)
+    # -----------------------
+    def repo_tree(self, repo):
+        return {path: content for (r, path), content in self.files.items() if r == repo}
+
+    def make_tree(self, files):
+        sha = object_sha("tree", *sorted(f"{p}:{blob_sha(c)}" for p, c in files.items()))
+        self.trees[sha] = dict(files)
+        return sha
+
+    def make_commit(self, tree_sha, parents, message):
+        sha = object_sha("commit", tree_sha, *parents, message, str(len(self.git_commits)))
+        self.git_commits[sha] = {"tree": tree_sha, "parents": list(parents), "message": message}
+        return sha
+
+    def head(self, repo):
+        if repo not in self.heads:
+            self.heads[repo] = self.make_commit(self.make_tree(self.repo_tree(repo)), [], "Initial commit")
+        return self.heads[repo]
+
+    def advance(self, repo, commit_sha):
+        old_tree = self.repo_tree(repo)
+        new_tree = self.trees[self.git_commits[commit_sha]["tree"]]
+        for path in old_tree:
+            if path not in new_tree:
+                del self.files[(repo, path)]
+        for path, content in new_tree.items():
+            self.files[(repo, path)] = content
+        self.heads[repo] = commit_sha
+        changed = [p for p in new_tree if old_tree.get(p) != new_tree[p]]
+        self.commits.append((repo, self.git_commits[commit_sha]["message"], changed))
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    github = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # -----------------------
+    # Responses
+    # -----------------------
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def not_found(self):
+        self.send_json(404, {"message": "Not Found"})
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def repo_url(self, repo):
+        return f"{self.github.url}/repos/{repo}"
+
+    def repo_json(self, repo):
+        owner, name = repo.split("/", 1)
+        return {
+            "id": 1,
+            "name": name,
+            "full_name": repo,
+            "owner": {"login": owner},
+            "default_branch": self.github.default_branch,
+            "url": self.repo_url(repo),
+        }
+
+    def content_json(self, repo, path, content):
+        return {
+            "type": "file",
+            "encoding": "base64",
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "sha": blob_sha(content),
+            "size": len(content),
+            "content": base64.b64encode(content).decode(),
+            "url": f"{self.repo_url(repo)}/contents/{path}",
+        }
+
+    def commit_json(self, repo, sha):
+        commit = self.github.git_commits[sha]
+        return {
+            "sha": sha,
+            "url": f"{self.repo_url(repo)}/git/commits/{sha}",
+            "message": commit["message"],
+            "tree": {"sha": commit["tree"], "url": f"{self.repo_url(repo)}/git/trees/{commit['tree']}"},
+            "parents": [{"sha": p, "url": f"{self.repo_url(repo)}/git/commits/{p}"} for p in commit["parents"]],
+        }
+
+    def ref_json(self, repo, sha):
+        ref = f"refs/heads/{self.github.branch}"
+        return {
+            "ref": ref,
+            "url": f"{self.repo_url(repo)}/git/{ref}",
+            "object": {"sha": sha, "type": "commit", "url": f"{self.repo_url(repo)}/git/commits/{sha}"},
+        }
+
+    # -----------------------
+    # Routing
+    # -----------------------
+    def rate_limit_headers(self, reset_in, remaining):
+        return {
+            "X-RateLimit-Limit": str(self.github.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(math.ceil(time.time() + reset_in)),
+        }
+
+    def throttled(self):
+        # Simulated network latency, then the rate limiter; True if the request was refused
+        if self.github.latency:
+            time.sleep(self.github.latency)
+        allowed, reset_in, remaining = self.github.take_request()
+        if allowed:
+            return False
+        # What GitHub sends once the limit is used up; PyGithub waits out Retry-After
+        headers = self.rate_limit_headers(reset_in, remaining)
+        headers["Retry-After"] = str(math.ceil(reset_in))
+        self.send_json(403, {"message": "API rate limit exceeded for user."}, headers)
+        return True
+
+    def route(self):
+        path = unquote(urlparse(self.path).path)
+        with self.github.lock:
+            self.github.calls.append((self.command, path))
+        m = re.match(r"^/repos/([^/]+/[^/]+)(?:/(.*))?$", path)
+        if not m:
+            return None, None
+        return m.group(1), m.group(2) or ""
+
+    def is_branch_ref(self, rest):
+        m = re.match(r"^git/refs?/heads/(.+)$", rest)
+        return m is not None and m.group(1) == self.github.branch
+
+    def do_GET(self):
+        if self.throttled():
+            return
+        repo, rest = self.route()
+        if repo is None:
+            return self.not_found()
+        if rest == "":
+            return self.send_json(200, self.repo_json(repo))
+        if rest.startswith("contents/"):
+            file_path = rest[len("contents/"):]
+            ref = parse_qs(urlparse(self.path).query).get("ref", [self.github.default_branch])[0]
+            content = self.github.read(repo, file_path) if ref == self.github.branch else None
+            if content is None:
+                return self.not_found()
+            etag = f'"{blob_sha(content)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            return self.send_json(200, self.content_json(repo, file_path, content), {"ETag": etag})
+        if self.is_branch_ref(rest):
+            with self.github.lock:
+                head = self.github.head(repo)
+            return self.send_json(200, self.ref_json(repo, head))
+        if rest.startswith("git/commits/"):
+            sha = rest[len("git/commits/"):]
+            with self.github.lock:
+                if sha not in self.github.git_commits:
+                    return self.not_found()
+                return self.send_json(200, self.commit_json(repo, sha))
+        self.not_found()
+
+    def do_PUT(self):
+        if self.throttled():
+            return
+        repo, rest = self.route()
+        if repo is None or not rest.startswith("contents/"):
+            return self.not_found()
+        file_path = rest[len("contents/"):]
+        body = self.read_body()
+        content = base64.b64decode(body.get("content", ""))
+        if body.get("branch", self.github.default_branch) != self.github.branch:
+            return self.send_json(404, {"message": "Branch not found"})
+
+        with self.github.lock:
+            current = self.github.files.get((repo, file_path))
+            if current is not None and "sha" not in body:
+                return self.send_json(422, {"message": "Invalid request.\n\n\"sha\" wasn't supplied."})
+            if current is not None and body["sha"] != blob_sha(current):
+                return self.send_json(409, {"message": f"{file_path} does not match {body['sha']}"})
+            files = self.github.repo_tree(repo)
+            files[file_path] = content
+            commit_sha = self.github.make_commit(
+                self.github.make_tree(files), [self.github.head(repo)], body.get("message", "")
+            )
+            self.github.advance(repo, commit_sha)
+            commit = self.commit_json(repo, commit_sha)
+
+        self.send_json(201 if current is None else 200, {
+            "content": self.content_json(repo, file_path, content),
+            "commit": commit,
+        })
+
+    def do_POST(self):
+        if self.throttled():
+            return
+        repo, rest = self.route()
+        if repo is None:
+            return self.not_found()
+        body = self.read_body()
+
+        with self.github.lock:
+            if rest == "git/blobs":
+                content = body.get("content", "")
+                if body.get("encoding") == "base64":
+                    content = base64.b64decode(content)
+                else:
+                    content = content.encode("utf-8")
+                sha = blob_sha(content)
+                self.github.blobs[sha] = content
+                return self.send_json(201, {"sha": sha, "url": f"{self.repo_url(repo)}/git/blobs/{sha}"})
+
+            if rest == "git/trees":
+                files = dict(self.github.trees.get(body.get("base_tree"), {}))
+                for element in body.get("tree", []):
+                    if "content" in element:
+                        files[element["path"]] = element["content"].encode("utf-8")
+                    elif element.get("sha") is None:
+                        files.pop(element["path"], None)
+                    else:
+                        files[element["path"]] = self.github.blobs[element["sha"]]
+                sha = self.github.make_tree(files)
+                return self.send_json(201, {
+                    "sha": sha,
+                    "url": f"{self.repo_url(repo)}/git/trees/{sha}",
+                    "tree": [
+                        {"path": p, "mode": "100644", "type": "blob", "sha": blob_sha(c)}
+                        for p, c in sorted(files.items())
+                    ],
+                })
+
+            if rest == "git/commits":
+                if body.get("tree") not in self.github.trees:
+                    return self.send_json(422, {"message": "Tree SHA does not exist"})
+                sha = self.github.make_commit(body["tree"], body.get("parents", []), body.get("message", ""))
+                return self.send_json(201, self.commit_json(repo, sha))
+
+        self.not_found()
+
+    def do_PATCH(self):
+        if self.throttled():
+            return
+        repo, rest = self.route()
+        if repo is None or not self.is_branch_ref(rest):
+            return self.not_found()
+        body = self.read_body()
+
+        with self.github.lock:
+            commit = self.github.git_commits.get(body.get("sha"))
+            if commit is None:
+                return self.send_json(422, {"message": "Object does not exist"})
+            if not body.get("force") and self.github.head(repo) not in commit["parents"]:
+                return self.send_json(422, {"message": "Update is not a fast forward"})
+            self.github.advance(repo, body["sha"])
+            return self.send_json(200, self.ref_json(repo, body["sha"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("port", nargs="?", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--rate-limit", type=int, help="requests allowed per --rate-window")
+    parser.add_argument("--rate-window", type=float, default=60.0, help="seconds")
+    args = parser.parse_args()
+    server = FakeGitHub(
+        port=args.port, latency=args.latency, rate_limit=args.rate_limit, rate_window=args.rate_window,
+    ).start()
+    print(f"Fake GitHub API listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,356 @@
+import atexit
+import base64
+import hashlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from github import Auth, Github, GithubException, InputGitTreeElement
+
+# -----------------------
+# Configuration
+# -----------------------
+PUSH_INTERVAL = 30      # seconds a save may wait before it is pushed
+PUSH_EVERY = 10         # push immediately once this many saves are waiting
+PUSH_RETRIES = 4
+PUSH_BACKOFF = 2.0      # seconds, doubled after each failed attempt
+PUSH_SHUTDOWN_TIMEOUT = 60  # seconds a stopping server waits for pending pushes
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_BRANCH = "main"
+
+# Parsed remote CSVs kept in memory, keyed by (path, blob sha)
+FRAME_CACHE_SIZE = 32
+
+# Statuses meaning the SHA we sent no longer matches the file on GitHub
+STALE_SHA_STATUSES = (404, 409, 422)
+
+log = logging.getLogger(__name__)
+
+# Every PushQueue of the process, flushed when the process exits
+QUEUES = weakref.WeakSet()
+
+
+def blob_sha(content):
+    # The object id git assigns to a file, so unchanged files can be skipped locally
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+# -----------------------
+# Pooled client with cached file SHAs
+# -----------------------
+class GitHubFiles:
+    """
+    One GitHub client and repository handle for the whole server process.
+    The blob SHA of every file we write is remembered from the commit response,
+    so an update is a single PUT instead of get_repo + get_contents + PUT.
+    """
+
+    def __init__(self, token, repo_name, base_url=GITHUB_API_URL, branch=GITHUB_BRANCH):
+        # lazy: no request until the first real call
+        self.github = Github(auth=Auth.Token(token), base_url=base_url, lazy=True)
+        self.repo = self.github.get_repo(repo_name)
+        self.branch = branch
+        self.lock = threading.Lock()
+        self.shas = {}
+        self.etags = {}                 # path -> (etag, sha) of the last full response
+        self.frames = OrderedDict()     # (path, sha) -> DataFrame, least recently used first
+
+    def fetch_sha(self, path):
+        try:
+            return self.repo.get_contents(path, ref=self.branch).sha
+        except GithubException as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def sha(self, path):
+        with self.lock:
+            if path in self.shas:
+                return self.shas[path]
+        sha = self.fetch_sha(path)
+        with self.lock:
+            self.shas[path] = sha
+        return sha
+
+    def remember(self, path, sha):
+        with self.lock:
+            self.shas[path] = sha
+
+    def forget(self, path):
+        with self.lock:
+            self.shas.pop(path, None)
+
+    def put(self, path, content, commit_msg, sha):
+        if sha is None:
+            result = self.repo.create_file(path, commit_msg, content, branch=self.branch)
+        else:
+            result = self.repo.update_file(path, commit_msg, content, sha, branch=self.branch)
+        return result["content"].sha
+
+    def unchanged(self, path, content):
+        with self.lock:
+            return self.shas.get(path) == blob_sha(content)
+
+    def write(self, path, content, commit_msg="Update annotations"):
+        if self.unchanged(path, content):
+            return self.shas[path]
+        try:
+            new_sha = self.put(path, content, commit_msg, self.sha(path))
+        except GithubException as e:
+            if e.status not in STALE_SHA_STATUSES:
+                raise
+            # Someone else changed (or created/deleted) the file: refetch its SHA once
+            self.forget(path)
+            new_sha = self.put(path, content, commit_msg, self.sha(path))
+        self.remember(path, new_sha)
+        return new_sha
+
+    def write_many(self, files, commit_msg="Update annotations"):
+        """
+        Commit several files at once through the Git Data API
+        (ref -> commit -> tree -> new commit -> ref), whatever the number of files.
+        """
+        changed = {
+            path: content for path, content in files.items()
+            if not self.unchanged(path, content)
+        }
+        if not changed:
+            return None
+
+        elements = [
+            InputGitTreeElement(path, "100644", "blob", content=content)
+            for path, content in sorted(changed.items())
+        ]
+        for attempt in range(2):
+            ref = self.repo.get_git_ref(f"heads/{self.branch}")
+            head = self.repo.get_git_commit(ref.object.sha)
+            tree = self.repo.create_git_tree(elements, base_tree=head.tree)
+            commit = self.repo.create_git_commit(commit_msg, tree, [head])
+            try:
+                ref.edit(commit.sha)
+                break
+            except GithubException as e:
+                # 422: not a fast-forward, the branch moved; rebuild on the new head once
+                if e.status != 422 or attempt:
+                    raise
+
+        for path, content in changed.items():
+            self.remember(path, blob_sha(content))
+        return commit.sha
+
+    # -----------------------
+    # Cached remote reads
+    # -----------------------
+    def cached_frame(self, path, sha):
+        with self.lock:
+            frame = self.frames.get((path, sha))
+            if frame is not None:
+                self.frames.move_to_end((path, sha))
+            return frame
+
+    def cache_frame(self, path, sha, frame):
+        with self.lock:
+            self.frames[(path, sha)] = frame
+            self.frames.move_to_end((path, sha))
+            while len(self.frames) > FRAME_CACHE_SIZE:
+                self.frames.popitem(last=False)
+
+    def read_csv(self, path):
+        """
+        The CSV at path on GitHub as a DataFrame. Sends If-None-Match with the last
+        ETag, so an unchanged file costs a 304 and no download or parsing.
+        The returned frame is shared with the cache: treat it as read-only.
+        """
+        with self.lock:
+            etag, sha = self.etags.get(path, (None, None))
+        headers = {"If-None-Match": etag} if etag else {}
+
+        response_headers, data = self.github.requester.requestJsonAndCheck(
+            "GET", f"{self.repo.url}/contents/{path}", parameters={"ref": self.branch}, headers=headers
+        )
+        if data is not None:
+            sha = data["sha"]
+            with self.lock:
+                self.etags[path] = (response_headers.get("etag"), sha)
+        self.remember(path, sha)
+
+        frame = self.cached_frame(path, sha)
+        if frame is None:
+            if data is None:
+                # 304, but the parsed frame was evicted: ask again without the ETag
+                with self.lock:
+                    self.etags.pop(path, None)
+                return self.read_csv(path)
+            if data.get("encoding") == "base64":
+                content = base64.b64decode(data["content"])
+            else:
+                # Files over 1 MB come back without inline content
+                content = base64.b64decode(self.repo.get_git_blob(sha).content)
+            frame = pd.read_csv(io.StringIO(content.decode("utf-8")))
+            self.cache_frame(path, sha, frame)
+        return frame
+
+    def write_files(self, files, commit_msg="Update annotations", batch=True):
+        if batch:
+            return self.write_many(files, commit_msg)
+        for path, content in files.items():
+            self.write(path, content, commit_msg)
+
+
+# -----------------------
+# Background push queue
+# -----------------------
+class PushQueue:
+    """
+    Coalesces saves into one pending item per key (e.g. one annotator file) and
+    hands everything pending to push(items) on a background thread, so the
+    annotator never waits on GitHub and one flush can become one commit.
+    """
+
+    def __init__(self, push, interval=PUSH_INTERVAL, max_pending=PUSH_EVERY,
+                 retries=PUSH_RETRIES, backoff=PUSH_BACKOFF, sleep=time.sleep):
+        self.push = push
+        self.interval = interval
+        self.max_pending = max_pending
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+
+        self.cond = threading.Condition()
+        self.pending = {}          # key -> (item, number of saves coalesced into it)
+        self.first_pending_at = None
+        self.in_flight = 0
+        self.flush_requested = False
+        self.last_error = None
+        self.pushed = 0
+        self.worker = None
+        QUEUES.add(self)
+
+    def submit(self, key, item):
+        with self.cond:
+            _, count = self.pending.get(key, (None, 0))
+            self.pending[key] = (item, count + 1)
+            if self.first_pending_at is None:
+                self.first_pending_at = time.monotonic()
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.run, name="github-push", daemon=True)
+                self.worker.start()
+            self.cond.notify_all()
+
+    def depth(self):
+        with self.cond:
+            return sum(count for _, count in self.pending.values()) + self.in_flight
+
+    def flush(self, timeout=None):
+        # Push everything now and wait for it; used on shutdown (flush_all) and by tools
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.flush_requested = True
+            self.cond.notify_all()
+            while self.pending or self.in_flight:
+                if not self.flush_requested:
+                    # The worker gave up on this round (GitHub unreachable)
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(timeout=remaining)
+            self.flush_requested = False
+        return True
+
+    def due(self):
+        if self.flush_requested:
+            return True
+        if sum(count for _, count in self.pending.values()) >= self.max_pending:
+            return True
+        return time.monotonic() >= self.first_pending_at + self.interval
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending or not self.due():
+                    if self.pending:
+                        self.cond.wait(timeout=max(
+                            0.0, self.first_pending_at + self.interval - time.monotonic()
+                        ))
+                    else:
+                        self.cond.wait()
+                batch = self.pending
+                self.pending = {}
+                self.first_pending_at = None
+                self.in_flight = sum(count for _, count in batch.values())
+
+            ok = self.push_with_retry({key: item for key, (item, _) in batch.items()})
+            failed = {} if ok else batch
+
+            with self.cond:
+                self.in_flight = 0
+                if ok:
+                    self.pushed += sum(count for _, count in batch.values())
+                # Put failures back; a newer item for the same key supersedes the failed one
+                for key, (item, count) in failed.items():
+                    newer_item, newer_count = self.pending.get(key, (item, 0))
+                    self.pending[key] = (newer_item, count + newer_count)
+                if failed and self.first_pending_at is None:
+                    self.first_pending_at = time.monotonic()
+                if failed:
+                    # Don't spin on a flush while GitHub is down
+                    self.flush_requested = False
+                self.cond.notify_all()
+
+    def push_with_retry(self, items):
+        for attempt in range(self.retries):
+            try:
+                self.push(items)
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.last_error = e
+                # last_error is what the sidebar shows; the log keeps every attempt
+                log.warning("GitHub push failed (attempt %d/%d): %s", attempt + 1, self.retries, e)
+                if attempt + 1 < self.retries:
+                    self.sleep(self.backoff * 2 ** attempt)
+        return False
+
+
+def flush_all(timeout=PUSH_SHUTDOWN_TIMEOUT):
+    # Saves still waiting in any queue are pushed before the process exits;
+    # anything left after that stays in its journal for the next start
+    for queue in list(QUEUES):
+        queue.flush(timeout)
+
+
+atexit.register(flush_all)
+
+
+if __name__ == "__main__":
+    # Flush job: commit the given annotation files in a single commit, e.g.
+    #   GITHUB_TOKEN=... REPO_NAME=owner/repo python github_sync.py annotations/*.csv
+    from annotation_store import AnnotationJournal
+
+    paths = sys.argv[1:]
+    files = {}
+    for path in paths:
+        journal = AnnotationJournal(path)
+        journal.compact()
+        with open(journal.csv_path, "r", encoding="utf-8") as f:
+            files[journal.csv_path.as_posix()] = f.read()
+
+    github_files = GitHubFiles(
+        os.environ["GITHUB_TOKEN"],
+        os.environ["REPO_NAME"],
+        os.environ.get("GITHUB_API_URL", GITHUB_API_URL),
+        os.environ.get("GITHUB_BRANCH", GITHUB_BRANCH),
+    )
+    sha = github_files.write_many(files, f"Sync {len(files)} annotation file(s)")
+    print(f"Committed {sha}" if sha else "Nothing changed")
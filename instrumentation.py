@@ -0,0 +1,151 @@
+import bisect
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# -----------------------
+# Configuration
+# -----------------------
+TIMINGS_WINDOW = 500                # most recent samples kept per phase
+TIMINGS_PATH = "timings.jsonl"      # JSON lines export, one sample per line
+TIMINGS_FLUSH_EVERY = 200           # samples buffered before they are appended to TIMINGS_PATH
+TIMINGS_MAX_BYTES = 10_000_000      # past this size TIMINGS_PATH is moved to TIMINGS_PATH.1 and restarted
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def bucket_label(i):
+    if i == 0:
+        return f"<{HISTOGRAM_BOUNDS_MS[0]} ms"
+    if i == len(HISTOGRAM_BOUNDS_MS):
+        return f">={HISTOGRAM_BOUNDS_MS[-1]} ms"
+    return f"{HISTOGRAM_BOUNDS_MS[i - 1]}-{HISTOGRAM_BOUNDS_MS[i]} ms"
+
+
+class PhaseTimings:
+    """
+    Rolling per-phase timings for one server process, shared by all sessions
+    and the background push worker. Each phase keeps its last `window` samples;
+    every sample is also appended (in batches) to a JSON lines file, which
+    is rotated once it reaches max_bytes so only the latest two files are kept.
+    """
+
+    def __init__(self, path=TIMINGS_PATH, window=TIMINGS_WINDOW, flush_every=TIMINGS_FLUSH_EVERY,
+                 max_bytes=TIMINGS_MAX_BYTES):
+        self.path = Path(path) if path else None
+        self.rotated_path = self.path.with_name(self.path.name + ".1") if self.path else None
+        self.window = window
+        self.flush_every = flush_every
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.samples = {}       # phase -> deque of durations in ms
+        self.pending = []       # records not yet written to self.path
+
+    def record(self, phase, seconds, **context):
+        ms = seconds * 1000
+        record = {"ts": round(time.time(), 3), "phase": phase, "ms": round(ms, 3), **context}
+        with self.lock:
+            if phase not in self.samples:
+                self.samples[phase] = deque(maxlen=self.window)
+            self.samples[phase].append(ms)
+            self.pending.append(record)
+            if len(self.pending) >= self.flush_every:
+                self.flush_locked()
+
+    @contextmanager
+    def phase(self, name, **context):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            # Failed attempts (e.g. a push GitHub refused) are tagged in the export
+            self.record(name, time.perf_counter() - started, error=type(e).__name__, **context)
+            raise
+        except BaseException:
+            # st.rerun() / st.stop() end a block early; that is not a failure
+            self.record(name, time.perf_counter() - started, **context)
+            raise
+        else:
+            self.record(name, time.perf_counter() - started, **context)
+
+    def timed(self, name):
+        # Decorator form of phase()
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # -----------------------
+    # Reading
+    # -----------------------
+    def summary(self):
+        # [{"phase", "count", "p50_ms", "p95_ms", "max_ms"}] over the rolling window
+        with self.lock:
+            samples = {phase: sorted(values) for phase, values in self.samples.items()}
+        return [
+            {
+                "phase": phase,
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "max_ms": round(values[-1], 2),
+            }
+            for phase, values in sorted(samples.items())
+        ]
+
+    def histogram(self, phase):
+        # {bucket label: count} over the rolling window of one phase
+        with self.lock:
+            values = list(self.samples.get(phase, ()))
+        counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for ms in values:
+            counts[bisect.bisect_right(HISTOGRAM_BOUNDS_MS, ms)] += 1
+        return {bucket_label(i): n for i, n in enumerate(counts)}
+
+    # -----------------------
+    # Export
+    # -----------------------
+    def flush_locked(self):
+        if self.path is None or not self.pending:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in self.pending:
+                f.write(json.dumps(record) + "\n")
+            size = f.tell()
+        self.pending = []
+        if self.max_bytes and size >= self.max_bytes:
+            # The previous rotated file is dropped
+            self.path.replace(self.rotated_path)
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def export(self):
+        # The rotated and current files as JSON lines, oldest first (flushes the
+        # buffer first). Reads up to twice max_bytes: hand the download button
+        # the method, not its result, so it only runs when someone downloads.
+        self.flush()
+        if self.path is None:
+            return ""
+        return "".join(
+            path.read_text(encoding="utf-8")
+            for path in (self.rotated_path, self.path)
+            if path.exists()
+        )
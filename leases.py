@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+
+# -----------------------
+# Configuration
+# -----------------------
+LEASE_PATH = "item_leases.sqlite"
+LEASE_SECONDS = 120         # a lease lapses this long after its session's last heartbeat
+HEARTBEAT_SECONDS = 30      # how often an open page renews its lease
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    scope   TEXT NOT NULL,              -- an annotator, or a round whose window annotators split
+    item    INTEGER NOT NULL,
+    session TEXT NOT NULL,              -- the browser session holding the item open
+    holder  TEXT NOT NULL,              -- that session's annotator
+    expires REAL NOT NULL,
+    done    INTEGER NOT NULL DEFAULT 0, -- saved in a split round: nobody else takes it up
+    PRIMARY KEY (scope, item)
+);
+CREATE INDEX IF NOT EXISTS leases_by_expiry ON leases (scope, expires);
+CREATE INDEX IF NOT EXISTS leases_by_session ON leases (session);
+CREATE INDEX IF NOT EXISTS leases_done ON leases (scope, done);
+"""
+
+
+class LeaseStore:
+    """
+    Short-lived claims on dataset items, shared by every session and server
+    process through one SQLite file. A session holds one item at a time:
+    opening an item takes its lease and gives up the session's previous one.
+    Leases lapse LEASE_SECONDS after the last heartbeat, so a closed tab
+    frees its item without anyone releasing it.
+    """
+
+    def __init__(self, path=LEASE_PATH, ttl=LEASE_SECONDS):
+        self.path = str(path)
+        self.ttl = ttl
+        self.local = threading.local()
+        self.connect().executescript(SCHEMA)
+
+    def connect(self):
+        # sqlite3 connections stay on the thread that opened them
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+        return db
+
+    def acquire(self, scope, item, session, holder):
+        """
+        Take or renew the lease on item; the session's other open leases are
+        given up. -> the annotator holding item afterwards and whether it is
+        this session.
+        """
+        now, item = time.time(), int(item)
+        db = self.connect()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT INTO leases (scope, item, session, holder, expires) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (scope, item) DO UPDATE SET "
+                "session = excluded.session, holder = excluded.holder, expires = excluded.expires "
+                "WHERE leases.session = excluded.session "
+                "OR (leases.expires < ? AND (leases.done = 0 OR leases.holder = excluded.holder))",
+                (scope, item, session, holder, now + self.ttl, now),
+            )
+            session_held, item_holder = db.execute(
+                "SELECT session, holder FROM leases WHERE scope = ? AND item = ?", (scope, item)
+            ).fetchone()
+            self.release_others(db, session, scope, item)
+        return item_holder, session_held == session
+
+    def release_others(self, db, session, scope, item):
+        # Open leases go; a finished item only stops being open in this session
+        db.execute(
+            "DELETE FROM leases WHERE session = ? AND done = 0 AND NOT (scope = ? AND item = ?)",
+            (session, scope, item),
+        )
+        db.execute(
+            "UPDATE leases SET expires = 0 WHERE session = ? AND done = 1 AND NOT (scope = ? AND item = ?)",
+            (session, scope, item),
+        )
+
+    def heartbeat(self, session):
+        """
+        Renews what the session still holds. -> False when it holds nothing:
+        its lease lapsed or another session took the item over. A lapsed lease
+        is only taken back by acquire().
+        """
+        now = time.time()
+        with self.connect() as db:
+            renewed = db.execute(
+                "UPDATE leases SET expires = ? WHERE session = ? AND expires >= ?",
+                (now + self.ttl, session, now),
+            ).rowcount
+        return renewed > 0
+
+    def complete(self, scope, item, session, holder):
+        # Saved in a split round: the item stays with holder once the session moves on
+        with self.connect() as db:
+            db.execute(
+                "INSERT INTO leases (scope, item, session, holder, expires, done) VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (scope, item) DO UPDATE SET "
+                "session = excluded.session, holder = excluded.holder, expires = excluded.expires, done = 1",
+                (scope, int(item), session, holder, time.time() + self.ttl),
+            )
+
+    def taken(self, scope, session, holder):
+        """
+        Items in scope another session holds open, plus those another
+        annotator finished in a split round. Both are index range reads, so the
+        cost grows with the items taken, not with the dataset.
+        """
+        rows = self.connect().execute(
+            "SELECT item FROM leases WHERE scope = ? AND expires >= ? AND session != ? "
+            "UNION SELECT item FROM leases WHERE scope = ? AND done = 1 AND holder != ?",
+            (scope, time.time(), session, scope, holder),
+        )
+        return {item for (item,) in rows}
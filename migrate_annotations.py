@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from taxonomy import (
+    FACTOR_BY_CODE,
+    AMBIGUOUS_REFERENT_BY_CODE,
+    decode_factors,
+    decode_ambiguous_referents,
+    encode_factors,
+    encode_ambiguous_referents,
+)
+
+# One-off rewrite of annotation CSVs from full factor texts to stored codes:
+#   python migrate_annotations.py [dir_or_csv ...]
+# Defaults to annotations/ and previous_annotations/annotations/. Safe to re-run.
+DEFAULT_TARGETS = ["annotations", "previous_annotations/annotations"]
+
+
+def migrate_file(path):
+    # Read everything as text so untouched columns are written back unchanged
+    data = pd.read_csv(path, dtype=str, keep_default_na=False)
+    unknown = set()
+
+    if "contextual_factors" in data.columns:
+        for value in data["contextual_factors"]:
+            unknown.update(c for c in decode_factors(value) if c not in FACTOR_BY_CODE)
+        data["contextual_factors"] = data["contextual_factors"].apply(encode_factors)
+
+    if "ambiguous_referent_type" in data.columns:
+        for value in data["ambiguous_referent_type"]:
+            unknown.update(
+                c for c in decode_ambiguous_referents(value) if c not in AMBIGUOUS_REFERENT_BY_CODE
+            )
+        data["ambiguous_referent_type"] = data["ambiguous_referent_type"].apply(
+            encode_ambiguous_referents
+        )
+
+    tmp_path = path.with_suffix(".csv.tmp")
+    data.to_csv(tmp_path, index=False)
+    tmp_path.replace(path)
+    return unknown
+
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or DEFAULT_TARGETS
+    for target in map(Path, targets):
+        paths = sorted(target.glob("*.csv")) if target.is_dir() else [target]
+        for path in paths:
+            before = path.stat().st_size
+            unknown = migrate_file(path)
+            print(f"{path}: {before} -> {path.stat().st_size} bytes")
+            for value in sorted(unknown):
+                print(f"  kept as text (no current code): {value}")
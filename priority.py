@@ -0,0 +1,230 @@
+import heapq
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from data_store import DATA_PATH, DATA_STORE_PATH, entity_column, ensure_store
+
+# -----------------------
+# Configuration
+# -----------------------
+# How much each signal adds to an item's priority; each signal lies in [0, 1]
+PRIORITY_WEIGHTS = {
+    "disagreement": 1.0,        # existing annotators disagree on the label or entity reflection
+    "undersampled": 0.5,        # few annotated items share its prediction / contextual_factor
+    "error_similarity": 0.5,    # items like it (same combination, drug or disease) were LLM errors
+}
+
+# The features an item is grouped by; the first is the combination sampling is counted over
+FEATURE_COLUMNS = {
+    "combination": ["prediction", "contextual_factor"],
+    "drug": [entity_column("shared_entities", "Chemical")],
+    "disease": [entity_column("shared_entities", "Disease")],
+}
+
+ERROR_LABEL = "incorrect"
+
+# A window's heap is rebuilt once stale entries make it this many times the window's size
+HEAP_SLACK = 2
+
+
+def feature_value(value):
+    # Entity lists are joined in sorted order, so the same entities are the same category
+    if value is None or isinstance(value, str):
+        return value or ""
+    return ", ".join(sorted(value))
+
+
+def read_features(csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    # id plus one string per feature, read from the Parquet store
+    columns = ["id", *dict.fromkeys(c for group in FEATURE_COLUMNS.values() for c in group)]
+    table = pq.read_table(ensure_store(csv_path, store_path), columns=columns)
+    values = {c: [feature_value(v) for v in table[c].to_pylist()] for c in columns[1:]}
+    features = pd.DataFrame({"id": table["id"].to_numpy()})
+    for feature, group in FEATURE_COLUMNS.items():
+        features[feature] = [" | ".join(parts) for parts in zip(*(values[c] for c in group))]
+    return features
+
+
+def plurality(ratings):
+    # The value a strict plurality of ratings agree on, or None
+    top = Counter(ratings.values()).most_common(2)
+    if not top or (len(top) == 2 and top[0][1] == top[1][1]):
+        return None
+    return top[0][0]
+
+
+def disagreement(ratings):
+    # 0 when everyone agrees (or only one annotator rated), 1 at an even binary split
+    if len(ratings) < 2:
+        return 0.0
+    top = Counter(ratings.values()).most_common(1)[0][1]
+    return min(1.0, 2 * (1 - top / len(ratings)))
+
+
+class PriorityIndex:
+    """
+    Expected information gain of annotating each dataset item, behind the
+    priority mode of the Next button. Follows an AgreementTracker: each change
+    of an item's ratings updates that item's disagreement and moves its counts
+    between the per-feature tallies (items sampled, items judged, LLM errors).
+    Only the items whose score that can move (the changed items and those
+    sharing a category whose counts moved) are scored again, and each
+    annotator's window keeps its items in a heap by score.
+    """
+
+    def __init__(self, features, weights=None):
+        self.lock = threading.Lock()
+        self.weights = weights or PRIORITY_WEIGHTS
+        self.ids = features["id"].to_numpy()
+        self.id_list = self.ids.tolist()
+        self.position = {example_id: i for i, example_id in enumerate(self.id_list)}
+        self.codes = {}             # feature -> category code per item
+        self.members = {}           # feature -> positions of the items in each category
+        self.sampled = {}           # feature -> items with any rating, per category
+        self.judged = {}            # feature -> items with a majority label, per category
+        self.errors = {}            # feature -> items the majority called an LLM error, per category
+        for feature in FEATURE_COLUMNS:
+            codes, categories = pd.factorize(features[feature])
+            self.codes[feature] = codes
+            by_code = np.argsort(codes, kind="stable")
+            self.members[feature] = np.split(by_code, np.cumsum(np.bincount(codes, minlength=len(categories)))[:-1])
+            self.sampled[feature] = np.zeros(len(categories), dtype=np.int64)
+            self.judged[feature] = np.zeros(len(categories), dtype=np.int64)
+            self.errors[feature] = np.zeros(len(categories), dtype=np.int64)
+        self.disagreement = np.zeros(len(self.ids))
+        self.state = {}             # position -> (sampled, judged, error) currently counted
+        self.score = self.scores(np.arange(len(self.ids)))
+        self.queues = {}            # key -> WindowQueue, e.g. per (window, annotator)
+
+    # -----------------------
+    # Following the annotations
+    # -----------------------
+    def attach(self, tracker):
+        # Take in everything the tracker holds now, then every change it applies
+        with tracker.lock:
+            tracker.listeners.append(self.update)
+            self.update(tracker, list(tracker.raters))
+
+    def update(self, tracker, ids):
+        # Called by the tracker with the ids whose ratings changed
+        labels = tracker.fields["label"].values
+        entities = tracker.fields["entity_reflection"].values
+        with self.lock:
+            changed = []
+            touched = {feature: set() for feature in FEATURE_COLUMNS}
+            for example_id in set(ids):
+                i = self.position.get(example_id)
+                if i is None:
+                    continue
+                label = labels.get(example_id, {})
+                self.disagreement[i] = max(disagreement(label), disagreement(entities.get(example_id, {})))
+                changed.append(i)
+                verdict = plurality(label)
+                new = (tracker.raters.get(example_id, 0) > 0, verdict is not None, verdict == ERROR_LABEL)
+                old = self.state.get(i, (False, False, False))
+                if new == old:
+                    continue
+                for feature, codes in self.codes.items():
+                    code = codes[i]
+                    touched[feature].add(code)
+                    for counts, was, now in zip((self.sampled, self.judged, self.errors), old, new):
+                        counts[feature][code] += int(now) - int(was)
+                if any(new):
+                    self.state[i] = new
+                else:
+                    self.state.pop(i, None)
+            if changed:
+                self.rescore(changed, touched)
+
+    def rescore(self, changed, touched):
+        # Score again the changed items and every item in a category whose counts
+        # moved, and hand the new scores to the window heaps (lock held)
+        affected = [np.array(changed, dtype=np.int64)]
+        for feature, codes in touched.items():
+            affected.extend(self.members[feature][code] for code in codes)
+        affected = np.unique(np.concatenate(affected))
+        scores = self.scores(affected)
+        moved = affected[scores != self.score[affected]]
+        self.score[affected] = scores
+        if len(moved):
+            for queue in self.queues.values():
+                queue.push(moved, self.score)
+
+    # -----------------------
+    # Picking
+    # -----------------------
+    def positions(self, ids):
+        # Dataset positions of ids (e.g. an assignment window), unknown ids left out
+        return np.array([self.position[i] for i in ids if i in self.position], dtype=np.int64)
+
+    def scores(self, positions):
+        # Smoothed LLM error rate: 0.5 until items like it have been judged
+        error_rates = [
+            (self.errors[f][self.codes[f][positions]] + 1) / (self.judged[f][self.codes[f][positions]] + 2)
+            for f in FEATURE_COLUMNS
+        ]
+        combination = next(iter(FEATURE_COLUMNS))
+        sampled = self.sampled[combination][self.codes[combination][positions]]
+        return (
+            self.weights["disagreement"] * self.disagreement[positions]
+            + self.weights["undersampled"] / np.sqrt(1 + sampled)
+            + self.weights["error_similarity"] * np.maximum.reduce(error_rates)
+        )
+
+    def next_item(self, key, positions, done=(), skip=()):
+        """
+        The highest-priority id among positions, ties in window order. key names
+        the heap kept for positions (one per window and annotator); ids in done
+        leave that heap for good, ids in skip are only passed over this time.
+        """
+        with self.lock:
+            queue = self.queues.get(key)
+            if queue is None:
+                queue = self.queues[key] = WindowQueue(positions, self.score)
+            i = queue.top(self.score, self.id_list, done, skip)
+            return None if i is None else self.id_list[i]
+
+
+class WindowQueue:
+    """
+    Max-heap of a window's positions by score, ties in window order. A moved
+    score pushes a new entry; the old one is dropped once it reaches the top.
+    """
+
+    def __init__(self, positions, score):
+        self.rank = np.full(len(score), -1, dtype=np.int64)
+        self.rank[positions] = np.arange(len(positions))
+        self.size = len(positions)
+        self.rebuild(score)
+
+    def rebuild(self, score):
+        members = np.flatnonzero(self.rank >= 0)
+        self.heap = list(zip((-score[members]).tolist(), self.rank[members].tolist(), members.tolist()))
+        heapq.heapify(self.heap)
+
+    def push(self, positions, score):
+        positions = positions[self.rank[positions] >= 0]
+        for i, value, rank in zip(positions.tolist(), score[positions].tolist(), self.rank[positions].tolist()):
+            heapq.heappush(self.heap, (-value, rank, i))
+        if len(self.heap) > HEAP_SLACK * max(self.size, 1):
+            self.rebuild(score)
+
+    def top(self, score, ids, done, skip):
+        skipped = []
+        best = None
+        while self.heap:
+            value, _, i = self.heap[0]
+            if -value != score[i] or ids[i] in done:
+                heapq.heappop(self.heap)
+            elif ids[i] in skip:
+                skipped.append(heapq.heappop(self.heap))
+            else:
+                best = i
+                break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return best
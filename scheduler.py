@@ -0,0 +1,236 @@
+import argparse
+import math
+import random
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from agreement import annotator_files, item_id
+from annotation_store import AnnotationJournal
+from data_store import DATA_PATH, DATA_STORE_PATH, ENTITY_TYPES, entity_column, ensure_store
+
+# Distributes dataset rows over annotators for one round, instead of giving
+# everyone the same slice:
+#
+#   python scheduler.py <round> --annotators halil,mengfei,shiwei=150
+#       [--capacity 200] [--redundancy 2] [--triple 0.1] [--start 0 --end 1000]
+#       [--dir annotations] [--seed 0]
+#
+# Every scheduled item gets --redundancy annotators, and a --triple share of
+# them one more, for agreement. Items are ordered so that every drug/disease
+# stratum is spread evenly over the schedule; each item then goes to the
+# annotators with the most capacity left, preferring pairs that have shared the
+# fewest items so far. Existing annotations in --dir count towards an item's
+# redundancy. The result is written to schedules/<round>.csv (id, annotator),
+# which assignments.toml points the round at:
+#
+#   [rounds.<round>]
+#   schedule = "schedules/<round>.csv"
+
+# -----------------------
+# Configuration
+# -----------------------
+SCHEDULE_DIR = "schedules"
+ANNOTATION_DIR = "annotations"
+REDUNDANCY = 2
+TRIPLE_FRACTION = 0.1
+SCHEDULE_COLUMNS = ["id", "annotator"]
+
+
+# -----------------------
+# Reading
+# -----------------------
+def read_strata(start=0, end=None, csv_path=DATA_PATH, store_path=DATA_STORE_PATH):
+    # [(id, stratum)] for rows start:end; an item's stratum is its (drugs, diseases)
+    columns = ["id", *(entity_column("shared_entities", t) for t in ENTITY_TYPES)]
+    table = pq.read_table(ensure_store(csv_path, store_path), columns=columns)
+    end = table.num_rows if end is None else min(end, table.num_rows)
+    table = table.slice(start, max(0, end - start))
+    entities = [table[column].to_pylist() for column in columns[1:]]
+    return [
+        (example_id, tuple(", ".join(sorted(values)) for values in stratum))
+        for example_id, *stratum in zip(table["id"].to_pylist(), *entities)
+    ]
+
+
+def read_annotated(annotation_dir=ANNOTATION_DIR):
+    # id -> set of annotators who already saved it (snapshot and journal)
+    annotated = {}
+    for path in annotator_files(annotation_dir):
+        index = AnnotationJournal(path).load()
+        for annotator, ids in index.ids_by_annotator.items():
+            for value in ids:
+                annotated.setdefault(item_id(value), set()).add(annotator)
+    return annotated
+
+
+# -----------------------
+# Scheduling
+# -----------------------
+def stratified_order(items, rng):
+    """
+    Item ids ordered so that each stratum is spread evenly over the order: the
+    k-th of a stratum's n items sits at about k/n of the way through. Any prefix
+    of the schedule (what gets annotated first) is then balanced as well.
+    """
+    strata = {}
+    for example_id, stratum in items:
+        strata.setdefault(stratum, []).append(example_id)
+    keyed = []
+    for ids in strata.values():
+        rng.shuffle(ids)
+        keyed.extend(((k + rng.random()) / len(ids), example_id) for k, example_id in enumerate(ids))
+    keyed.sort()
+    return [example_id for _, example_id in keyed]
+
+
+def item_target(position, redundancy=REDUNDANCY, triple=TRIPLE_FRACTION):
+    # redundancy, plus one for every 1/triple-th position, so triples follow the strata too
+    return redundancy + (math.floor((position + 1) * triple) > math.floor(position * triple))
+
+
+def schedule_items(order, capacities, redundancy=REDUNDANCY, triple=TRIPLE_FRACTION, annotated=None, rng=None):
+    """
+    Greedy assignment in the given order. An item gets item_target()
+    annotators, fewer by the annotators who already saved it. Among annotators with capacity
+    left, the least loaded relative to their capacity goes first, then the one
+    who shared the fewest items with the annotators already on the item.
+    An item that can't get all its annotators is left out rather than
+    half-scheduled. Returns ([(id, annotator)], unscheduled ids).
+    """
+    rng = rng or random.Random(0)
+    annotated = annotated or {}
+    load = Counter()
+    overlap = Counter()        # (annotator, annotator) sorted pair -> items shared
+    assignments, unscheduled = [], []
+
+    for position, example_id in enumerate(order):
+        chosen = sorted(annotated.get(example_id, ()))
+        need = item_target(position, redundancy, triple) - len(chosen)
+        if need <= 0:
+            continue
+        candidates = [a for a in capacities if a not in chosen and load[a] < capacities[a]]
+        if len(candidates) < need:
+            unscheduled.append(example_id)
+            continue
+
+        ties = {a: rng.random() for a in candidates}
+        new = []
+        for _ in range(need):
+            best = min(
+                candidates,
+                key=lambda a: (
+                    load[a] / capacities[a],
+                    sum(overlap[tuple(sorted((a, b)))] for b in chosen),
+                    ties[a],
+                ),
+            )
+            candidates.remove(best)
+            chosen.append(best)
+            new.append(best)
+
+        for annotator in new:
+            load[annotator] += 1
+            assignments.append((example_id, annotator))
+        for i, a in enumerate(chosen):
+            for b in chosen[i + 1:]:
+                if a in new or b in new:
+                    overlap[tuple(sorted((a, b)))] += 1
+    return assignments, unscheduled
+
+
+def default_capacity(order, capacities, redundancy, triple, annotated):
+    # Annotations still needed beyond the set capacities, split evenly over the rest
+    needed = sum(
+        max(0, item_target(p, redundancy, triple) - len(annotated.get(i, ())))
+        for p, i in enumerate(order)
+    )
+    fixed = sum(c for c in capacities.values() if c is not None)
+    open_ended = sum(1 for c in capacities.values() if c is None)
+    return max(0, math.ceil((needed - fixed) / max(1, open_ended)))
+
+
+def parse_annotators(value, capacity=None):
+    # "halil,mengfei=150" -> {"halil": capacity, "mengfei": 150}
+    annotators = {}
+    for entry in value.split(","):
+        name, _, limit = entry.strip().partition("=")
+        if name:
+            annotators[name] = int(limit) if limit else capacity
+    return annotators
+
+
+# -----------------------
+# Report
+# -----------------------
+def report(assignments, unscheduled, capacities, strata):
+    by_item = {}
+    for example_id, annotator in assignments:
+        by_item.setdefault(example_id, []).append(annotator)
+    load = Counter(annotator for _, annotator in assignments)
+    print(f"Scheduled {len(by_item)} items, {len(assignments)} annotations; {len(unscheduled)} items left out (no capacity)")
+
+    print(f"{'annotator':16} {'items':>6} {'capacity':>9}")
+    for annotator, capacity in capacities.items():
+        print(f"{annotator:16} {load[annotator]:6} {capacity:9}")
+
+    copies = Counter(len(annotators) for annotators in by_item.values())
+    print("New annotators per item: " + ", ".join(f"{k}: {n}" for k, n in sorted(copies.items())))
+
+    pairs = Counter()
+    for annotators in by_item.values():
+        annotators = sorted(annotators)
+        for i, a in enumerate(annotators):
+            for b in annotators[i + 1:]:
+                pairs[(a, b)] += 1
+    if pairs:
+        print("Items shared per pair: " + ", ".join(f"{a}+{b}: {n}" for (a, b), n in sorted(pairs.items())))
+
+    stratum_of = dict(strata)
+    covered = {stratum_of[i] for i in by_item}
+    print(f"Strata covered: {len(covered)} / {len(set(stratum_of.values()))}")
+
+
+# -----------------------
+# CLI
+# -----------------------
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("round", help="writes schedules/<round>.csv")
+    parser.add_argument("--annotators", required=True, help="comma separated, name=capacity to set one")
+    parser.add_argument("--capacity", type=int, help="items per annotator (default: an even split)")
+    parser.add_argument("--redundancy", type=int, default=REDUNDANCY)
+    parser.add_argument("--triple", type=float, default=TRIPLE_FRACTION, help="share of items with one more annotator")
+    parser.add_argument("--start", type=int, default=0, help="first dataset row")
+    parser.add_argument("--end", type=int, help="last dataset row, exclusive")
+    parser.add_argument("--dir", default=ANNOTATION_DIR, help="existing annotations, counted towards redundancy")
+    parser.add_argument("--out", help=f"default: {SCHEDULE_DIR}/<round>.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    strata = read_strata(args.start, args.end)
+    annotated = read_annotated(args.dir)
+    order = stratified_order(strata, rng)
+
+    capacities = parse_annotators(args.annotators, args.capacity)
+    open_ended = [a for a, c in capacities.items() if c is None]
+    if open_ended:
+        capacity = default_capacity(order, capacities, args.redundancy, args.triple, annotated)
+        capacities.update({a: capacity for a in open_ended})
+
+    assignments, unscheduled = schedule_items(
+        order, capacities, args.redundancy, args.triple, annotated, rng
+    )
+
+    out = Path(args.out or Path(SCHEDULE_DIR) / f"{args.round}.csv")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(assignments, columns=SCHEDULE_COLUMNS).to_csv(out, index=False)
+    report(assignments, unscheduled, capacities, strata)
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import re
+
+# -----------------------
+# Contextual factor taxonomy
+# -----------------------
+CONTEXTUAL_FACTORS = [
+    "a. Species: The claims are based on different species that one claim is based on animal while another is based on another kind of animal or human.",
+    "b. Population: The claims target different human subpopulations, such as differences in age, sex, genetic background, comorbidities, ethnicity, or risk profiles.",
+    "c. Physiological context: The intervention is evaluated under different transient physiological or environmental conditions (e.g., exertion state, hypoxia, fasting status, or acute stress), even within the same species and population.",
+    "d. Dosage or exposure duration: The same intervention is administered at different doses, frequencies, or durations.",
+    "e. Route or mode of administration: The intervention is delivered via different routes (e.g., oral, intravenous, topical, sublingual, localized).",
+    "f. Combined drug effects: The reported effect of a drug depends on its use in combination with other drugs or therapies.",
+    "g. Evolving scientific evidence: The claims reflect different stages of scientific understanding.",
+    "h. Known controversy or self-qualified claims: One or both claims explicitly acknowledge uncertainty.",
+    "i. Study design: contradictions may arise from differences in trial methodology, such as parallel vs. crossover design, superiority vs. non-inferiority frameworks, blinding status, comparator type (placebo vs. active control), or randomization procedures.",
+    "j. Outcome measures: contradictions may arise because the studies measure different outcomes.",
+    "k. Ambiguous referent: One claim lacks a clear specification of species, population, dosage and exposure duration, or route of administration, resulting in uncertainty about the basis of comparison.",
+    "l. Other: None of the listed factors explain the contradiction.",
+]
+
+AMBIGUOUS_REFERENT_OPTIONS = [
+    "One or both abstracts lack species information",
+    "One or both abstracts lack population information",
+    "One or both abstracts lack dosage and exposure duration information",
+    "One or both abstracts lack route of administration information",
+    "Other"
+]
+
+# -----------------------
+# Stored codes
+# -----------------------
+# Annotation files store "b;d" instead of the full factor texts, and
+# "dosage;other" instead of the full ambiguous-referent texts.
+CODE_SEPARATOR = ";"
+
+# "a" -> "a. Species: ..."
+FACTOR_BY_CODE = {factor.split(".", 1)[0]: factor for factor in CONTEXTUAL_FACTORS}
+
+AMBIGUOUS_REFERENT_BY_CODE = {
+    "species": AMBIGUOUS_REFERENT_OPTIONS[0],
+    "population": AMBIGUOUS_REFERENT_OPTIONS[1],
+    "dosage": AMBIGUOUS_REFERENT_OPTIONS[2],
+    "route": AMBIGUOUS_REFERENT_OPTIONS[3],
+    "other": AMBIGUOUS_REFERENT_OPTIONS[4],
+}
+
+
+def factor_name(text):
+    # "b. Population: The claims ..." -> "population"
+    m = re.match(r"^\s*[a-z]\.\s*([^:]+)", text)
+    return (m.group(1) if m else text).strip().lower()
+
+
+# Factor names -> code; also resolves texts from earlier rounds where the letters differed
+# (e.g. "i. Ambiguous referent" / "j. Other" before Study design and Outcome measures were added)
+FACTOR_CODE_BY_NAME = {factor_name(text): code for code, text in FACTOR_BY_CODE.items()}
+
+
+def factor_label(code):
+    # "b" -> "b. Population"
+    text = FACTOR_BY_CODE.get(code)
+    return text.split(":", 1)[0] if text else code
+
+
+def split_stored(value):
+    if not isinstance(value, str) or not value.strip():
+        return []
+    # Legacy prose values were joined with "; ", codes with ";"
+    return [token.strip() for token in value.split(CODE_SEPARATOR) if token.strip()]
+
+
+def factor_code(token):
+    if token in FACTOR_BY_CODE:
+        return token
+    # Unknown legacy factors (e.g. "i. Ambiguous expression") are kept verbatim
+    return FACTOR_CODE_BY_NAME.get(factor_name(token), token)
+
+
+def ambiguous_referent_code(token):
+    if token in AMBIGUOUS_REFERENT_BY_CODE:
+        return token
+    lowered = token.lower()
+    for code in AMBIGUOUS_REFERENT_BY_CODE:
+        if code in lowered:
+            return code
+    return token
+
+
+# -----------------------
+# Encode / decode
+# -----------------------
+def encode_factors(factors):
+    # "Agree" is a sentinel, not a factor
+    if factors == "Agree":
+        return factors
+    if isinstance(factors, str):
+        factors = split_stored(factors)
+    return CODE_SEPARATOR.join(factor_code(f) for f in factors)
+
+
+def decode_factors(value):
+    # Stored value -> list of codes (legacy prose is translated on the way)
+    if value == "Agree":
+        return []
+    return [factor_code(token) for token in split_stored(value)]
+
+
+def encode_ambiguous_referents(types):
+    if isinstance(types, str):
+        types = split_stored(types)
+    return CODE_SEPARATOR.join(ambiguous_referent_code(t) for t in types)
+
+
+def decode_ambiguous_referents(value):
+    return [ambiguous_referent_code(token) for token in split_stored(value)]
+
+
+def factor_texts(value):
+    # For the multiselect: only codes that map onto a current option
+    return [FACTOR_BY_CODE[code] for code in decode_factors(value) if code in FACTOR_BY_CODE]
+
+
+def ambiguous_referent_texts(value):
+    return [
+        AMBIGUOUS_REFERENT_BY_CODE[code] for code in decode_ambiguous_referents(value)
+        if code in AMBIGUOUS_REFERENT_BY_CODE
+    ]
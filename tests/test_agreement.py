@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pytest
+
+from agreement import AgreementTracker, agreement_report, annotation_paths, load_annotations
+from annotation_store import AnnotationJournal, AnnotationRepository
+from synthetic import make_annotation, write_histories
+
+IDS = range(1, 201)
+
+
+@pytest.fixture
+def annotations(tmp_path):
+    return write_histories(IDS, tmp_path / "annotations", fraction=0.5)
+
+
+def tracker(annotations):
+    return AgreementTracker(annotations, snapshot_path=annotations.parent / "agreement_tallies.json")
+
+
+def assert_matches_batch(tracker, annotations):
+    # The running tallies agree with the report computed from scratch over the same files
+    tracker.refresh()
+    batch = {r["field"]: r for r in agreement_report(load_annotations(annotation_paths([annotations])))}
+    summary = tracker.summary()
+    fields = summary["fields"].set_index("field")
+    for field in ["label", "entity_reflection"]:
+        assert fields.loc[field, "items"] == batch[field]["items"]
+        assert fields.loc[field, "fleiss_kappa"] == pytest.approx(batch[field]["fleiss_kappa"], nan_ok=True)
+        assert fields.loc[field, "krippendorff_alpha"] == pytest.approx(batch[field]["krippendorff_alpha"], nan_ok=True)
+        pairs = summary["pairs"][field]
+        assert pairs["items"].tolist() == batch[field]["pairs"]["items"].tolist()
+        assert pairs["kappa"].to_numpy() == pytest.approx(batch[field]["pairs"]["kappa"].to_numpy(), nan_ok=True)
+    factors = batch["contextual_factors"]
+    assert fields.loc["contextual_factors", "items"] == factors["items"]
+    assert fields.loc["contextual_factors", "krippendorff_alpha"] == pytest.approx(
+        factors["krippendorff_alpha_masi"], nan_ok=True
+    )
+
+
+def test_first_refresh_matches_batch(annotations):
+    assert_matches_batch(tracker(annotations), annotations)
+
+
+def test_saves_match_batch(annotations):
+    repository = AnnotationRepository(annotations)
+    running = tracker(annotations)
+    running.refresh()
+    rng = random.Random(1)
+    for _ in range(150):
+        # New ratings and changed ones, on items others rated too
+        record = make_annotation(rng, rng.choice(IDS), rng.choice(["halil", "mengfei", "shiwei"]))
+        repository.save(record)
+        running.record_save(record, repository.csv_path(record["annotator"]))
+    assert_matches_batch(running, annotations)
+
+
+def test_snapshot_round_trip(annotations):
+    running = tracker(annotations)
+    running.refresh()
+    running.save_snapshot()
+
+    restored = tracker(annotations)
+    restored.refresh()
+    for field, tally in running.fields.items():
+        assert restored.fields[field].state() == tally.state()
+        assert restored.fields[field].values == tally.values
+
+    # Files changed while the server was down are re-read on top of the snapshot
+    AnnotationJournal(annotations / "joe.csv").append(make_annotation(random.Random(2), 1, "joe"))
+    (annotations / "shiwei.csv").unlink()
+    assert_matches_batch(tracker(annotations), annotations)
+
+
+def test_removed_file_is_taken_out(annotations):
+    running = tracker(annotations)
+    running.refresh()
+    (annotations / "halil.csv").unlink()
+    assert_matches_batch(running, annotations)
+    assert "halil" not in running.summary()["progress"]["annotator"].tolist()
+    assert np.isfinite(running.fields["label"].fleiss_kappa())
@@ -0,0 +1,89 @@
+import json
+
+import pandas as pd
+
+from annotation_store import ANNOTATION_COLUMNS, AnnotationJournal, AnnotationRepository
+
+
+def record(example_id, annotator="halil", label="correct"):
+    return {"id": example_id, "annotator": annotator, "label": label, "entity_reflection": "Yes"}
+
+
+def labels(index, annotator="halil"):
+    return {example_id: index.get(example_id, annotator)["label"] for example_id in index.annotated_ids(annotator)}
+
+
+def test_replay_is_last_writer_wins(tmp_path):
+    journal = AnnotationJournal(tmp_path / "halil.csv")
+    journal.append(record(1, label="correct"))
+    journal.append(record(2, label="incorrect"))
+    journal.append(record(1, label="incorrect"))
+    assert labels(journal.load()) == {1: "incorrect", 2: "incorrect"}
+
+
+def test_compaction_folds_the_journal_into_the_csv(tmp_path):
+    journal = AnnotationJournal(tmp_path / "halil.csv")
+    pd.DataFrame([record(1), record(2)], columns=ANNOTATION_COLUMNS).to_csv(journal.csv_path, index=False)
+    journal.append(record(2, label="incorrect"))
+    journal.append(record(3))
+
+    journal.compact()
+    assert not journal.journal_path.exists()
+    assert not journal.compacting_path.exists()
+    snapshot = pd.read_csv(journal.csv_path)
+    assert dict(zip(snapshot["id"], snapshot["label"])) == {1: "correct", 2: "incorrect", 3: "correct"}
+    assert labels(journal.load()) == {1: "correct", 2: "incorrect", 3: "correct"}
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    journal = AnnotationJournal(tmp_path / "halil.csv")
+    journal.append(record(1))
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record(2))[:20])
+    assert labels(journal.load()) == {1: "correct"}
+
+
+def test_crashed_compaction_is_replayed_and_finished(tmp_path):
+    journal = AnnotationJournal(tmp_path / "halil.csv")
+    journal.append(record(1, label="correct"))
+    # A compaction moved the journal aside and died before writing the snapshot
+    journal.journal_path.replace(journal.compacting_path)
+    # Saves after the crash go to a fresh journal and win over the older ones
+    journal.append(record(1, label="incorrect"))
+    journal.append(record(2))
+    assert labels(journal.load()) == {1: "incorrect", 2: "correct"}
+
+    journal.compact()
+    assert not journal.compacting_path.exists()
+    # The live journal is not part of this compaction; it is replayed on top
+    assert labels(journal.load()) == {1: "incorrect", 2: "correct"}
+    journal.compact()
+    assert labels(AnnotationJournal(journal.csv_path).load()) == {1: "incorrect", 2: "correct"}
+
+
+def test_repository_picks_up_changes_behind_its_back(tmp_path):
+    repository = AnnotationRepository(tmp_path)
+    repository.save(record(1))
+    assert repository.index("halil").annotated_ids("halil") == [1]
+
+    # Another server process saves to the same files
+    AnnotationJournal(repository.csv_path("halil")).append(record(2))
+    assert repository.index("halil").annotated_ids("halil") == [1, 2]
+
+    # Compaction rewrites the files but keeps the in-memory index
+    index = repository.index("halil")
+    repository.compact("halil")
+    assert repository.index("halil") is index
+
+
+def test_pending_annotators_are_those_with_unpushed_saves(tmp_path):
+    repository = AnnotationRepository(tmp_path)
+    repository.save(record(1, annotator="halil"))
+    repository.save(record(1, annotator="mengfei"))
+    repository.compact("mengfei")
+    # A compaction that died part way still has saves to push
+    AnnotationJournal(repository.csv_path("joe")).append(record(1, annotator="joe"))
+    journal = AnnotationJournal(repository.csv_path("joe"))
+    journal.journal_path.replace(journal.compacting_path)
+
+    assert AnnotationRepository(tmp_path).pending_annotators() == ["halil", "joe"]
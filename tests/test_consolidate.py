@@ -0,0 +1,126 @@
+import random
+
+import pandas as pd
+import pytest
+
+from annotation_store import AnnotationJournal
+from consolidate import DEFAULT_RULES, RATING_COLUMNS, conflict_index, consolidate, describe, load_state, resolve_item
+from synthetic import make_annotation, write_histories
+
+IDS = range(1, 201)
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    write_histories(IDS, tmp_path / "annotations", fraction=0.5)
+    (tmp_path / "adjudications").mkdir()
+    return tmp_path
+
+
+def run(workdir, name, full=False, rules=None):
+    # -> (stats, gold, queue) of a run writing <name>.csv, <name>_queue.csv and <name>.json
+    stats, _ = consolidate(
+        workdir / "annotations",
+        workdir / f"{name}.csv",
+        workdir / f"{name}_queue.csv",
+        workdir / f"{name}.json",
+        rules=rules,
+        full=full,
+        adjudication_dir=workdir / "adjudications",
+    )
+    read = lambda path: pd.read_csv(path, dtype=str, keep_default_na=False)
+    return stats, read(workdir / f"{name}.csv"), read(workdir / f"{name}_queue.csv")
+
+
+def assert_same_as_full(workdir):
+    _, gold, queue = run(workdir, "incremental")
+    _, full_gold, full_queue = run(workdir, "full", full=True)
+    pd.testing.assert_frame_equal(gold, full_gold)
+    pd.testing.assert_frame_equal(queue, full_queue)
+    return gold, queue
+
+
+def test_unchanged_files_are_not_read_again(workdir):
+    stats, gold, queue = run(workdir, "incremental")
+    assert stats["files_reread"] == 4
+    assert len(gold) and len(queue)
+    stats, _, _ = run(workdir, "incremental")
+    assert stats["files_reread"] == 0
+    assert stats["items_resolved"] == 0
+
+
+def test_incremental_runs_match_full(workdir):
+    annotations = workdir / "annotations"
+    assert_same_as_full(workdir)
+
+    # Saves not yet compacted, changing and adding ratings
+    rng = random.Random(1)
+    journal = AnnotationJournal(annotations / "halil.csv")
+    for _ in range(40):
+        journal.append(make_annotation(rng, rng.choice(IDS), "halil"))
+    assert_same_as_full(workdir)
+
+    # A compaction changes the file but none of its rows
+    journal.compact()
+    stats, _, _ = run(workdir, "incremental")
+    assert stats["files_reread"] == 1
+    assert stats["items_resolved"] == 0
+
+    # An annotator's file goes away, and a new one appears
+    (annotations / "joe.csv").unlink()
+    AnnotationJournal(annotations / "new.csv").append(make_annotation(rng, 5, "new"))
+    assert_same_as_full(workdir)
+
+
+def test_adjudication_overrides_the_vote(workdir):
+    _, queue = assert_same_as_full(workdir)
+    example_id = int(queue["id"].iloc[0])
+    AnnotationJournal(workdir / "adjudications" / "boss.csv").append(
+        make_annotation(random.Random(3), example_id, "boss")
+    )
+
+    gold, queue = assert_same_as_full(workdir)
+    assert str(example_id) not in queue["id"].tolist()
+    row = gold[gold["id"] == str(example_id)].iloc[0]
+    assert row["adjudicator"] == "boss"
+
+
+def test_changed_rules_resolve_everything_again(workdir):
+    run(workdir, "incremental")
+    stats, _, _ = run(workdir, "incremental", rules={"min_votes": 3})
+    assert stats["files_reread"] == 4
+    _, _, full_queue = run(workdir, "full", full=True, rules={"min_votes": 3})
+    _, _, queue = run(workdir, "incremental", rules={"min_votes": 3})
+    pd.testing.assert_frame_equal(queue, full_queue)
+
+
+def test_conflict_index_reads_the_saved_state(workdir):
+    _, _, queue = run(workdir, "incremental")
+    index = conflict_index(load_state(workdir / "incremental.json"))
+    assert [str(i) for i in index] == queue["id"].tolist()
+    for example_id, item in index.items():
+        row = queue[queue["id"] == str(example_id)].iloc[0]
+        assert ";".join(item["conflicts"]) == row["conflicts"]
+        assert ";".join(sorted(item["ratings"])) == row["annotators"]
+
+
+def test_votes_keep_factor_codes_apart():
+    assert describe({"joe": "a;k", "halil": "b"}) == "halil=b | joe=a;k"
+    assert describe({"halil": ""}) == "halil=-"
+
+
+def rating(**values):
+    return {**{col: "" for col in RATING_COLUMNS}, **values}
+
+
+def test_unanswered_task2_is_not_a_conflict():
+    # As in files from before Task 2: both agree on Task 1 and left Task 2 blank
+    ratings = {a: rating(entity_reflection="Yes", label="correct") for a in ("halil", "joe")}
+    status, gold = resolve_item(1, ratings, DEFAULT_RULES)
+    assert status == "gold"
+    assert gold["label"] == "correct" and gold["contextual_agreement"] == ""
+
+    ratings["joe"]["contextual_agreement"] = "Agree"
+    ratings["halil"]["contextual_agreement"] = "Disagree"
+    status, row = resolve_item(1, ratings, DEFAULT_RULES)
+    assert status == "queue" and row["conflicts"] == "contextual_agreement"
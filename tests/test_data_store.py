@@ -0,0 +1,115 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from data_store import PreparedExamples, abstracts_path, append_to_store, ensure_store, ingest_dataset, load_window, store_sources
+from synthetic import make_dataset, make_rows
+
+
+def write_rows(path, n, start_id, seed=0):
+    pd.DataFrame(make_rows(n, seed, start_id=start_id)).to_csv(path, index=False)
+    return path
+
+
+def ids(store_path):
+    return sorted(pq.read_table(store_path, columns=["id"])["id"].to_pylist())
+
+
+def make_stale(store_path):
+    # As after a pull or checkout: the CSV is newer than the store
+    stat = os.stat(store_path)
+    os.utime(store_path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9 * 60))
+
+
+def test_rebuild_records_the_csv(tmp_path):
+    csv_path, store_path = make_dataset(20, tmp_path / "data.csv"), tmp_path / "store.parquet"
+    ingest_dataset(csv_path, store_path)
+    assert store_sources(store_path) == [csv_path.as_posix()]
+    assert ids(store_path) == list(range(1, 21))
+
+
+def test_touched_csv_keeps_appended_rows(tmp_path):
+    csv_path, store_path = make_dataset(20, tmp_path / "data.csv"), tmp_path / "store.parquet"
+    ensure_store(csv_path, store_path)
+    extra = write_rows(tmp_path / "extra.csv", 5, start_id=100)
+    append_to_store(extra, store_path)
+
+    make_stale(store_path)
+    ensure_store(csv_path, store_path)
+    assert ids(store_path) == [*range(1, 21), *range(100, 105)]
+    assert sorted(store_sources(store_path)) == sorted([csv_path.as_posix(), extra.as_posix()])
+
+    # New rows in the CSV are still picked up
+    write_rows(csv_path, 25, start_id=1)
+    make_stale(store_path)
+    ensure_store(csv_path, store_path)
+    assert ids(store_path) == [*range(1, 26), *range(100, 105)]
+    # ...and the store counts as up to date afterwards
+    mtime = os.stat(store_path).st_mtime_ns
+    ensure_store(csv_path, store_path)
+    assert os.stat(store_path).st_mtime_ns == mtime
+
+
+def test_store_from_the_csv_alone_is_rebuilt(tmp_path):
+    csv_path, store_path = make_dataset(20, tmp_path / "data.csv"), tmp_path / "store.parquet"
+    ensure_store(csv_path, store_path)
+    # Rows removed from the CSV leave the store too
+    write_rows(csv_path, 10, start_id=1)
+    make_stale(store_path)
+    ensure_store(csv_path, store_path)
+    assert ids(store_path) == list(range(1, 11))
+
+
+def test_outdated_store_with_appended_rows_is_not_rebuilt(tmp_path, monkeypatch):
+    csv_path, store_path = make_dataset(20, tmp_path / "data.csv"), tmp_path / "store.parquet"
+    ensure_store(csv_path, store_path)
+    append_to_store(write_rows(tmp_path / "extra.csv", 5, start_id=100), store_path)
+    monkeypatch.setattr("data_store.STORE_VERSION", "older")
+    with pytest.raises(ValueError, match="--rebuild"):
+        ensure_store(csv_path, store_path)
+    assert len(ids(store_path)) == 25
+
+
+def test_null_pmid_in_jsonl_keeps_pmids_integer(tmp_path):
+    rows = list(make_rows(20))
+    rows[0]["pmid_1"] = None
+    jsonl_path, store_path = tmp_path / "data.jsonl", tmp_path / "store.parquet"
+    pd.DataFrame(rows).to_json(jsonl_path, orient="records", lines=True)
+    append_to_store(jsonl_path, store_path, chunksize=8)
+
+    pairs = pq.read_table(store_path, columns=["id", "pmid_1", "pmid_2"]).to_pandas()
+    abstracts = pq.read_table(abstracts_path(store_path), columns=["pmid"])["pmid"].to_pylist()
+    assert pairs.loc[pairs["id"] == 1, "pmid_1"].item() == ""
+    assert pairs.loc[pairs["id"] == 2, "pmid_1"].item() == str(rows[1]["pmid_1"])
+    assert all(pmid.isdigit() for pmid in abstracts)
+    assert len(abstracts) == len(set(abstracts))
+    referenced = set(pairs["pmid_1"]) | set(pairs["pmid_2"])
+    assert referenced - {""} <= set(abstracts)
+
+
+def test_closed_prepared_examples_still_serve_examples(tmp_path):
+    # A window evicted from the app's cache may still be in use by a running session
+    csv_path = make_dataset(5, tmp_path / "data.csv")
+    prepared = PreparedExamples(load_window(("range", 0, None), csv_path, tmp_path / "store.parquet"))
+    prepared.prefetch([1, 2])
+    prepared.close()
+    prepared.prefetch([3, 4])
+    assert not prepared.futures
+    assert prepared.get(4)[0]["id"] == 5
+    assert prepared.executor._shutdown
+
+
+def test_concurrent_appends_keep_each_others_rows(tmp_path):
+    # Both start from the same store; without the ingest lock the later swap drops the other's rows
+    csv_path, store_path = make_dataset(20, tmp_path / "data.csv"), tmp_path / "store.parquet"
+    ensure_store(csv_path, store_path)
+    sources = [write_rows(tmp_path / f"extra_{n}.csv", 50, start_id=100 * (n + 1), seed=n) for n in range(4)]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda source: append_to_store(source, store_path, chunksize=10), sources))
+
+    expected = [*range(1, 21), *(i for n in range(4) for i in range(100 * (n + 1), 100 * (n + 1) + 50))]
+    assert ids(store_path) == sorted(expected)
+    assert sorted(store_sources(store_path)[1:]) == sorted(s.as_posix() for s in sources)
@@ -0,0 +1,149 @@
+import pytest
+
+from fake_github import FakeGitHub
+from github_sync import GitHubFiles, PushQueue, flush_all
+
+REPO = "owner/repo"
+
+
+@pytest.fixture
+def server():
+    server = FakeGitHub().start()
+    yield server
+    server.stop()
+
+
+def client(server):
+    return GitHubFiles("token", REPO, base_url=server.url)
+
+
+def queue(push, **kwargs):
+    # Nothing is pushed until flush() unless a test asks for it
+    kwargs.setdefault("interval", 3600)
+    kwargs.setdefault("max_pending", 1000)
+    return PushQueue(push, **kwargs)
+
+
+def test_write_retries_once_on_a_stale_sha(server):
+    files = client(server)
+    files.write("annotations/halil.csv", "id\n1\n")
+    # Another server process updates the file, so our remembered SHA is stale
+    client(server).write("annotations/halil.csv", "id\n1\n2\n")
+
+    files.write("annotations/halil.csv", "id\n1\n2\n3\n")
+    assert server.read(REPO, "annotations/halil.csv") == b"id\n1\n2\n3\n"
+    assert len(server.commits) == 3
+
+
+def test_unchanged_file_is_not_written_again(server):
+    files = client(server)
+    files.write("annotations/halil.csv", "id\n1\n")
+    puts = server.count("PUT")
+    files.write("annotations/halil.csv", "id\n1\n")
+    assert server.count("PUT") == puts
+
+
+def test_write_many_is_one_commit(server):
+    files = client(server)
+    files.write_many({"annotations/halil.csv": "id\n1\n", "annotations/mengfei.csv": "id\n2\n"}, "Flush")
+    assert server.commits == [(REPO, "Flush", ["annotations/halil.csv", "annotations/mengfei.csv"])]
+    assert files.write_many({"annotations/halil.csv": "id\n1\n"}) is None
+
+
+def test_queue_coalesces_saves_per_key():
+    pushes = []
+    push_queue = queue(pushes.append)
+    for n in range(3):
+        push_queue.submit("halil", f"halil {n}")
+    push_queue.submit("mengfei", "mengfei 0")
+    assert push_queue.depth() == 4
+
+    assert push_queue.flush(timeout=5)
+    assert pushes == [{"halil": "halil 2", "mengfei": "mengfei 0"}]
+    assert push_queue.pushed == 4
+    assert push_queue.depth() == 0
+
+
+def test_queue_pushes_once_max_pending_saves_wait():
+    pushes = []
+    push_queue = queue(pushes.append, max_pending=2)
+    push_queue.submit("halil", 1)
+    push_queue.submit("mengfei", 2)
+    assert push_queue.flush(timeout=5)
+    assert pushes == [{"halil": 1, "mengfei": 2}]
+
+
+def test_queue_retries_with_backoff():
+    pushes, sleeps = [], []
+
+    def push(items):
+        pushes.append(items)
+        if len(pushes) < 3:
+            raise RuntimeError("GitHub unavailable")
+
+    push_queue = queue(push, retries=4, backoff=1.0, sleep=sleeps.append)
+    push_queue.submit("halil", 1)
+    assert push_queue.flush(timeout=5)
+    assert len(pushes) == 3
+    assert sleeps == [1.0, 2.0]
+    assert push_queue.last_error is None
+
+
+def test_queue_keeps_failed_items_for_the_next_flush():
+    down = True
+    pushes = []
+
+    def push(items):
+        if down:
+            raise RuntimeError("GitHub unavailable")
+        pushes.append(items)
+
+    push_queue = queue(push, retries=2, sleep=lambda seconds: None)
+    push_queue.submit("halil", 1)
+    assert not push_queue.flush(timeout=5)
+    assert isinstance(push_queue.last_error, RuntimeError)
+    assert push_queue.depth() == 1
+
+    down = False
+    push_queue.submit("halil", 2)
+    assert push_queue.flush(timeout=5)
+    assert pushes == [{"halil": 2}]
+    assert push_queue.pushed == 2
+
+
+def test_queue_flush_commits_through_github(server):
+    files = client(server)
+    push_queue = queue(lambda items: files.write_many(items, "Flush"))
+    push_queue.submit("annotations/halil.csv", "id\n1\n")
+    push_queue.submit("annotations/halil.csv", "id\n1\n2\n")
+    push_queue.submit("annotations/mengfei.csv", "id\n3\n")
+
+    assert push_queue.flush(timeout=5)
+    assert len(server.commits) == 1
+    assert server.read(REPO, "annotations/halil.csv") == b"id\n1\n2\n"
+
+
+def test_every_path_uses_the_configured_branch():
+    # Contents calls without a ref would land on "main" and find nothing
+    server = FakeGitHub(branch="annotations", default_branch="main").start()
+    try:
+        files = GitHubFiles("token", REPO, base_url=server.url, branch="annotations")
+        files.write("annotations/halil.csv", "id\n1\n")
+        client_on_branch = GitHubFiles("token", REPO, base_url=server.url, branch="annotations")
+        client_on_branch.write("annotations/halil.csv", "id\n1\n2\n")
+        files.write("annotations/halil.csv", "id\n1\n2\n3\n")
+        files.write_many({"annotations/mengfei.csv": "id\n4\n"})
+        assert files.read_csv("annotations/halil.csv")["id"].tolist() == [1, 2, 3]
+        assert len(server.commits) == 4
+    finally:
+        server.stop()
+
+
+def test_flush_all_pushes_every_queue():
+    # Registered with atexit, so saves made just before shutdown still reach GitHub
+    pushes = []
+    queues = [queue(pushes.append), queue(pushes.append)]
+    queues[0].submit("halil", 1)
+    queues[1].submit("mengfei", 2)
+    flush_all(timeout=5)
+    assert sorted(pushes, key=str) == [{"halil": 1}, {"mengfei": 2}]
@@ -0,0 +1,28 @@
+import json
+
+from instrumentation import PhaseTimings
+
+
+def phases(text):
+    return [json.loads(line)["phase"] for line in text.splitlines()]
+
+
+def test_export_flushes_buffered_samples(tmp_path):
+    timings = PhaseTimings(tmp_path / "timings.jsonl", flush_every=100)
+    timings.record("save", 0.01)
+    timings.record("push", 0.5)
+    assert not timings.path.exists()
+    assert phases(timings.export()) == ["save", "push"]
+
+
+def test_log_is_rotated_at_max_bytes(tmp_path):
+    timings = PhaseTimings(tmp_path / "timings.jsonl", flush_every=1, max_bytes=500)
+    for n in range(40):
+        timings.record(f"phase {n}", 0.001)
+
+    assert timings.rotated_path.stat().st_size < 500 + 100
+    assert not timings.path.exists() or timings.path.stat().st_size < 500
+    # Only the last two files are kept; the export is their samples in order
+    exported = phases(timings.export())
+    assert exported == [f"phase {n}" for n in range(40 - len(exported), 40)]
+    assert len(exported) < 40
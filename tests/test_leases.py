@@ -0,0 +1,72 @@
+import pytest
+
+import leases
+from leases import LeaseStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(leases.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return LeaseStore(tmp_path / "leases.sqlite", ttl=120)
+
+
+def test_second_session_is_locked_out(store):
+    assert store.acquire("halil", 1, "tab-a", "halil") == ("halil", True)
+    assert store.acquire("halil", 1, "tab-b", "halil") == ("halil", False)
+    assert store.taken("halil", "tab-b", "halil") == {1}
+    assert store.taken("halil", "tab-a", "halil") == set()
+
+
+def test_lease_lapses_after_the_ttl(store, clock):
+    store.acquire("halil", 1, "tab-a", "halil")
+    clock.now += 121
+    assert store.taken("halil", "tab-b", "halil") == set()
+    assert store.acquire("halil", 1, "tab-b", "halil") == ("halil", True)
+    # The session that went quiet finds out instead of writing over tab-b
+    assert not store.heartbeat("tab-a")
+    assert store.acquire("halil", 1, "tab-a", "halil") == ("halil", False)
+
+
+def test_heartbeat_keeps_the_lease(store, clock):
+    store.acquire("halil", 1, "tab-a", "halil")
+    for _ in range(5):
+        clock.now += 60
+        assert store.heartbeat("tab-a")
+    assert store.acquire("halil", 1, "tab-b", "halil") == ("halil", False)
+    clock.now += 121
+    assert not store.heartbeat("tab-a")
+
+
+def test_opening_another_item_releases_the_previous_one(store):
+    store.acquire("halil", 1, "tab-a", "halil")
+    store.acquire("halil", 2, "tab-a", "halil")
+    assert store.taken("halil", "tab-b", "halil") == {2}
+    assert store.acquire("halil", 1, "tab-b", "halil") == ("halil", True)
+
+
+def test_split_round_keeps_finished_items_with_their_annotator(store, clock):
+    store.acquire("round_2", 1, "tab-a", "halil")
+    store.complete("round_2", 1, "tab-a", "halil")
+    store.acquire("round_2", 2, "tab-a", "halil")
+
+    # Finished by halil: mengfei never gets it, even after halil's lease lapses
+    clock.now += 121
+    assert store.taken("round_2", "tab-m", "mengfei") == {1}
+    assert store.acquire("round_2", 1, "tab-m", "mengfei") == ("halil", False)
+    # halil can reopen it from a new session
+    assert store.taken("round_2", "tab-h", "halil") == set()
+    assert store.acquire("round_2", 1, "tab-h", "halil") == ("halil", True)
@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agreement import AgreementTracker
+from annotation_store import AnnotationRepository
+from priority import PriorityIndex
+from synthetic import make_annotation, write_histories
+
+IDS = list(range(1, 301))
+
+
+@pytest.fixture
+def features():
+    rng = random.Random(0)
+    return pd.DataFrame({
+        "id": IDS,
+        "combination": [f"combination {rng.randrange(12)}" for _ in IDS],
+        "drug": [f"drug {rng.randrange(8)}" for _ in IDS],
+        "disease": [f"disease {rng.randrange(6)}" for _ in IDS],
+    })
+
+
+@pytest.fixture
+def annotations(tmp_path):
+    return write_histories(IDS, tmp_path / "annotations", fraction=0.3)
+
+
+def brute_force(index, positions, skip):
+    # The pick from scratch: every score in the window computed again
+    keep = np.array([index.ids[p] not in skip for p in positions], dtype=bool)
+    positions = positions[keep]
+    if not len(positions):
+        return None
+    return index.ids[positions[np.argmax(index.scores(positions))]].item()
+
+
+def test_heap_picks_match_a_full_rescore(features, annotations):
+    tracker = AgreementTracker(annotations, snapshot_path=None)
+    tracker.refresh()
+    index = PriorityIndex(features)
+    index.attach(tracker)
+    repository = AnnotationRepository(annotations)
+
+    rng = random.Random(1)
+    window = index.positions(IDS[50:250])
+    done = set()
+    for step in range(200):
+        # Everyone's saves move scores; "newbie" works through the window by priority
+        annotator = rng.choice(["halil", "mengfei", "shiwei", "joe"])
+        record = make_annotation(rng, rng.choice(IDS), annotator)
+        repository.save(record)
+        tracker.record_save(record, repository.csv_path(annotator))
+
+        taken = set(rng.sample(IDS, 5))
+        picked = index.next_item(("window", "newbie"), window, done=done, skip=taken)
+        assert picked == brute_force(index, window, done | taken)
+        if step % 2:
+            done.add(picked)
+
+    assert index.score == pytest.approx(index.scores(np.arange(len(IDS))))
+
+
+def test_window_order_breaks_ties(features):
+    index = PriorityIndex(features, weights={"disagreement": 0.0, "undersampled": 0.0, "error_similarity": 0.0})
+    window = index.positions([30, 10, 20])
+    assert index.next_item("window", window) == 30
+    assert index.next_item("window", window, done={30}) == 10
+    assert index.next_item("window", window, skip={10}) == 20
+    # Skipped items stay in the heap, done ones leave it
+    assert index.next_item("window", window) == 10
+    assert index.next_item("window", window, done={10, 20}) is None
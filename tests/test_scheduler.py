@@ -0,0 +1,86 @@
+import random
+from collections import Counter
+
+from scheduler import default_capacity, schedule_items, stratified_order
+
+
+def strata(sizes):
+    # [(id, stratum)]: sizes[s] items in stratum s, listed stratum by stratum
+    items, next_id = [], 1
+    for stratum, size in enumerate(sizes):
+        for _ in range(size):
+            items.append((next_id, stratum))
+            next_id += 1
+    return items
+
+
+def annotators_by_item(assignments):
+    by_item = {}
+    for example_id, annotator in assignments:
+        by_item.setdefault(example_id, []).append(annotator)
+    return by_item
+
+
+def test_every_item_gets_its_redundancy_within_capacity():
+    order = list(range(1, 101))
+    capacities = {"halil": 80, "mengfei": 80, "shiwei": 60}
+    assignments, unscheduled = schedule_items(order, capacities, redundancy=2, triple=0.1)
+
+    assert not unscheduled
+    by_item = annotators_by_item(assignments)
+    assert sorted(by_item) == order
+    assert all(len(set(annotators)) == len(annotators) for annotators in by_item.values())
+    copies = Counter(len(annotators) for annotators in by_item.values())
+    assert copies == {2: 90, 3: 10}
+    load = Counter(annotator for _, annotator in assignments)
+    assert all(load[a] <= capacities[a] for a in capacities)
+
+
+def test_items_without_capacity_are_left_out_whole():
+    order = list(range(1, 11))
+    assignments, unscheduled = schedule_items(order, {"halil": 4, "mengfei": 10}, redundancy=2, triple=0)
+
+    assert sorted(annotators_by_item(assignments)) == [1, 2, 3, 4]
+    assert unscheduled == [5, 6, 7, 8, 9, 10]
+    assert Counter(annotator for _, annotator in assignments) == {"halil": 4, "mengfei": 4}
+
+
+def test_existing_annotations_count_towards_redundancy():
+    order = [1, 2, 3]
+    annotated = {1: {"halil", "mengfei"}, 2: {"halil"}}
+    assignments, unscheduled = schedule_items(
+        order, {"halil": 5, "mengfei": 5, "shiwei": 5}, redundancy=2, triple=0, annotated=annotated
+    )
+
+    by_item = annotators_by_item(assignments)
+    assert 1 not in by_item
+    assert len(by_item[2]) == 1 and "halil" not in by_item[2]
+    assert len(by_item[3]) == 2
+    assert not unscheduled
+
+
+def test_default_capacity_splits_what_is_left():
+    order = list(range(1, 101))
+    capacities = {"halil": 60, "mengfei": None, "shiwei": None}
+    # 100 items * 2 + 10 triples = 210 annotations, 60 of them halil's
+    assert default_capacity(order, capacities, 2, 0.1, {}) == 75
+
+
+def test_stratified_order_interleaves_strata():
+    items = strata([60, 30, 10])
+    order = stratified_order(items, random.Random(0))
+    stratum_of = dict(items)
+
+    assert sorted(order) == [example_id for example_id, _ in items]
+    # Every tenth of the order holds about a tenth of each stratum
+    for start in range(0, 100, 10):
+        counts = Counter(stratum_of[i] for i in order[start:start + 10])
+        assert abs(counts[0] - 6) <= 1
+        assert abs(counts[1] - 3) <= 1
+        assert counts[2] <= 2
+
+
+def test_stratified_order_is_deterministic_for_a_seed():
+    items = strata([20, 15, 5])
+    assert stratified_order(items, random.Random(7)) == stratified_order(items, random.Random(7))
+    assert stratified_order(items, random.Random(7)) != stratified_order(items, random.Random(8))
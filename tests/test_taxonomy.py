@@ -0,0 +1,96 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from taxonomy import (
+    AMBIGUOUS_REFERENT_OPTIONS,
+    CONTEXTUAL_FACTORS,
+    decode_ambiguous_referents,
+    decode_factors,
+    encode_ambiguous_referents,
+    encode_factors,
+    factor_texts,
+)
+
+MIGRATE = Path(__file__).resolve().parent.parent / "migrate_annotations.py"
+
+# Texts as the first round stored them, when Ambiguous referent was "i"
+LEGACY_REFERENT = (
+    "i. Ambiguous referent: One or both claims lack clear specification of species, population, "
+    "dosage, or route of administration, resulting in uncertainty about the basis of comparison."
+)
+LEGACY_EXPRESSION = "i. Ambiguous expression: One or both claims contain grammatical errors or unclear referents."
+
+
+def test_factors_round_trip_through_codes():
+    selected = [CONTEXTUAL_FACTORS[1], CONTEXTUAL_FACTORS[3], CONTEXTUAL_FACTORS[10]]
+    stored = encode_factors(selected)
+    assert stored == "b;d;k"
+    assert decode_factors(stored) == ["b", "d", "k"]
+    assert factor_texts(stored) == selected
+    assert encode_factors(decode_factors(stored)) == stored
+
+
+def test_agree_is_not_a_factor():
+    assert encode_factors("Agree") == "Agree"
+    assert decode_factors("Agree") == []
+    assert encode_factors("") == "" and decode_factors("") == []
+
+
+def test_ambiguous_referents_round_trip_including_other():
+    stored = encode_ambiguous_referents([AMBIGUOUS_REFERENT_OPTIONS[2], "Other"])
+    assert stored == "dosage;other"
+    assert decode_ambiguous_referents(stored) == ["dosage", "other"]
+    # Earlier wording of an option still maps onto its code
+    assert encode_ambiguous_referents("One or both abstracts lack dosage information") == "dosage"
+
+
+def test_legacy_prose_is_translated_by_factor_name():
+    legacy = "; ".join([CONTEXTUAL_FACTORS[1], LEGACY_REFERENT])
+    assert encode_factors(legacy) == "b;k"
+
+
+def test_unknown_legacy_factor_survives_verbatim():
+    legacy = "; ".join([CONTEXTUAL_FACTORS[2], LEGACY_EXPRESSION])
+    assert decode_factors(legacy) == ["c", LEGACY_EXPRESSION]
+    assert encode_factors(legacy) == f"c;{LEGACY_EXPRESSION}"
+    # Not offered in the multiselect, but not lost either
+    assert factor_texts(encode_factors(legacy)) == [CONTEXTUAL_FACTORS[2]]
+
+
+def test_migrate_annotations_rewrites_a_legacy_csv(tmp_path):
+    path = tmp_path / "joe.csv"
+    pd.DataFrame([
+        {"annotator": "joe", "id": "1", "label": "correct", "contextual_agreement": "Agree",
+         "contextual_factors": "Agree", "ambiguous_referent_type": "", "contextual_explanation": ""},
+        {"annotator": "joe", "id": "2", "label": "correct", "contextual_agreement": "Disagree",
+         "contextual_factors": "; ".join([CONTEXTUAL_FACTORS[1], LEGACY_REFERENT]),
+         "ambiguous_referent_type": "One or both abstracts lack route of administration information; Other",
+         "contextual_explanation": "Different cohorts; see abstract"},
+        {"annotator": "joe", "id": "4", "label": "correct", "contextual_agreement": "Disagree",
+         "contextual_factors": "; ".join([CONTEXTUAL_FACTORS[2], LEGACY_EXPRESSION]),
+         "ambiguous_referent_type": "", "contextual_explanation": ""},
+        {"annotator": "joe", "id": "7", "label": "incorrect", "contextual_agreement": "",
+         "contextual_factors": "", "ambiguous_referent_type": "", "contextual_explanation": ""},
+    ]).to_csv(path, index=False)
+
+    def migrate():
+        result = subprocess.run(
+            [sys.executable, str(MIGRATE), str(tmp_path)],
+            cwd=tmp_path, capture_output=True, text=True, check=True,
+        )
+        return result.stdout, pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    stdout, migrated = migrate()
+    assert migrated["contextual_factors"].tolist() == ["Agree", "b;k", f"c;{LEGACY_EXPRESSION}", ""]
+    assert migrated["ambiguous_referent_type"].tolist() == ["", "route;other", "", ""]
+    # Columns the migration doesn't touch are written back unchanged
+    assert migrated["id"].tolist() == ["1", "2", "4", "7"]
+    assert migrated["contextual_explanation"].tolist()[1] == "Different cohorts; see abstract"
+    assert f"kept as text (no current code): {LEGACY_EXPRESSION}" in stdout
+
+    # Safe to re-run
+    _, again = migrate()
+    pd.testing.assert_frame_equal(again, migrated)